@@ -0,0 +1,92 @@
+# app/admission.py
+"""
+Admission control for /api-endpoint.
+
+A request is admitted only while fewer than ADMIT_MAX_IN_FLIGHT jobs are
+queued or running overall and fewer than ADMIT_MAX_PER_EMAIL for its email
+(0 disables a limit). Rejected requests get 429 with a Retry-After computed
+from the recent mean job duration and the worker count; admitted ones get an
+ETA. Admitted work therefore keeps a bounded queue in front of it instead of
+slowing down with every burst.
+"""
+import os
+import math
+from app import config  # noqa: F401  (loads .env)
+from app.metrics import Counter
+from app.job_queue import QueueFull, active_counts, jobs_ahead
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+ADMIT_MAX_IN_FLIGHT = int(os.getenv("ADMIT_MAX_IN_FLIGHT", "50"))
+ADMIT_MAX_PER_EMAIL = int(os.getenv("ADMIT_MAX_PER_EMAIL", "3"))
+# Assumed job duration (seconds) until the worker pool has finished a job
+ADMIT_DEFAULT_JOB_SECONDS = float(os.getenv("ADMIT_DEFAULT_JOB_SECONDS", "90"))
+ADMIT_MAX_RETRY_AFTER = int(os.getenv("ADMIT_MAX_RETRY_AFTER", "3600"))
+
+rejections_total = Counter("admission_rejections_total", "Requests refused with 429 by limit", ["scope"])
+
+def job_seconds(pool) -> float:
+    return pool.mean_job_seconds() or ADMIT_DEFAULT_JOB_SECONDS
+
+def estimate_seconds(ahead: int, pool) -> float:
+    """
+    Rough time until a job with `ahead` running/queued jobs in front of it is
+    done: it starts once enough of those have finished to free a worker.
+    """
+    workers = max(pool.size, 1)
+    waves = max(0, ahead - workers + 1) / workers
+    return job_seconds(pool) * (waves + 1)
+
+def retry_after(error: QueueFull, pool) -> int:
+    """Seconds until the limit that refused a request should have room again"""
+    if error.scope == "per_email" and error.oldest_job_id:
+        # Room opens when that email's oldest job finishes
+        seconds = estimate_seconds(jobs_ahead(error.oldest_job_id), pool)
+    else:
+        # Room opens after (active - limit + 1) jobs finish across all workers
+        excess = error.active - error.limit + 1
+        seconds = job_seconds(pool) * excess / max(pool.size, 1)
+    return max(1, min(ADMIT_MAX_RETRY_AFTER, math.ceil(seconds)))
+
+def reject(error: QueueFull, pool) -> dict:
+    """Body and Retry-After for a 429 response"""
+    rejections_total.inc(scope=error.scope)
+    seconds = retry_after(error, pool)
+    log.warning(f"🚦 Rejected request; retry after {seconds}s", extra={"error": str(error), "scope": error.scope})
+    return {
+        "retry_after": seconds,
+        "body": {
+            "error": "Too many requests in flight",
+            "scope": error.scope,
+            "in_flight": error.active,
+            "limit": error.limit,
+            "retry_after_seconds": seconds,
+        },
+    }
+
+def eta_seconds(job_id: str, pool) -> int:
+    """Estimated seconds until an admitted job is finished"""
+    return math.ceil(estimate_seconds(jobs_ahead(job_id), pool))
+
+def capacity(pool, email: str = None) -> dict:
+    """Limits, current load and remaining room, optionally for one email"""
+    counts = active_counts(email)
+    in_flight = counts["queued"] + counts["running"]
+    view = {
+        "limits": {"in_flight": ADMIT_MAX_IN_FLIGHT, "per_email": ADMIT_MAX_PER_EMAIL},
+        "in_flight": in_flight,
+        "queued": counts["queued"],
+        "running": counts["running"],
+        "available": max(0, ADMIT_MAX_IN_FLIGHT - in_flight) if ADMIT_MAX_IN_FLIGHT else None,
+        "workers": pool.size,
+        "busy_workers": pool.busy,
+        "mean_job_seconds": round(job_seconds(pool), 1),
+        "eta_seconds_for_new_job": math.ceil(estimate_seconds(in_flight, pool)),
+    }
+    if email is not None:
+        view["email"] = {
+            "in_flight": counts["email"],
+            "available": max(0, ADMIT_MAX_PER_EMAIL - counts["email"]) if ADMIT_MAX_PER_EMAIL else None,
+        }
+    return view
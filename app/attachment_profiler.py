@@ -0,0 +1,527 @@
+# app/attachment_profiler.py
+"""
+Streaming profiler for request attachments.
+
+Each attachment is read once, front to back, and reduced to a bounded
+profile: row count, columns with inferred types, numeric sum/min/max and
+distinct values for low-cardinality columns (CSV, JSON, JSON Lines), or
+structure counts (Markdown, plain text). format_profile turns it into a few
+prompt lines whose size does not depend on the size of the file.
+"""
+import os
+import re
+import csv
+import json
+import threading
+from collections import OrderedDict
+
+# Values remembered per column before it counts as high-cardinality
+DISTINCT_LIMIT = int(os.getenv("PROFILE_DISTINCT_LIMIT", "12"))
+MAX_COLUMNS = int(os.getenv("PROFILE_MAX_COLUMNS", "40"))
+# Longest single line and whole summary (characters) emitted per attachment
+LINE_MAX_CHARS = 240
+PROFILE_MAX_CHARS = int(os.getenv("PROFILE_MAX_CHARS", "2000"))
+READ_CHUNK_CHARS = 256 * 1024
+SNIFF_CHARS = 16 * 1024
+MAX_HEADINGS = 12
+# Arrays inside a top-level JSON object that get a per-column profile
+MAX_NESTED_TABLES = 4
+
+TABLE_EXTENSIONS = (".csv", ".tsv")
+JSON_EXTENSIONS = (".json",)
+JSON_LINES_EXTENSIONS = (".jsonl", ".ndjson")
+MARKDOWN_EXTENSIONS = (".md", ".markdown")
+TEXT_EXTENSIONS = (".txt", ".html", ".htm", ".xml", ".svg", ".js", ".css", ".py")
+
+_INT = re.compile(r"^[+-]?\d+$")
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?)?$")
+_BOOLS = {"true", "false", "yes", "no"}
+_NULLS = {"", "null", "none", "na", "n/a", "nan"}
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+CACHE_ITEMS = 256
+
+def _clip(text, limit: int = 60) -> str:
+    text = str(text).replace("\n", " ").replace("\r", " ")
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+def _number(value: float):
+    return int(value) if float(value).is_integer() and abs(value) < 1e15 else round(value, 4)
+
+def _value_order(value: str):
+    """Sort key for distinct values: numbers by value, then text"""
+    try:
+        return 0, float(value), ""
+    except ValueError:
+        return 1, 0.0, value
+
+class ColumnStats:
+    """Running statistics for one column, O(DISTINCT_LIMIT) memory"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        self.types = {}
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self.numeric = 0
+        self.text_min = None
+        self.text_max = None
+        self.distinct = set()
+        self.high_cardinality = False
+
+    def _remember(self, value):
+        if self.high_cardinality:
+            return
+        self.distinct.add(value if isinstance(value, str) and len(value) <= 40 else _clip(value, 40))
+        if len(self.distinct) > DISTINCT_LIMIT:
+            self.high_cardinality = True
+            self.distinct = set()
+
+    def _add_number(self, value: float):
+        self.numeric += 1
+        self.sum += value
+        self.min = value if self.min is None or value < self.min else self.min
+        self.max = value if self.max is None or value > self.max else self.max
+
+    def add_text(self, raw: str):
+        """A CSV cell: infer int/float/bool/date/string from the text"""
+        self.count += 1
+        value = raw.strip()
+        if not value or (len(value) <= 4 and value.lower() in _NULLS):
+            self.nulls += 1
+            return
+        # float() runs in C, so numeric cells (the bulk of large files) stay cheap
+        try:
+            number = float(value)
+        except ValueError:
+            number = None
+        if number is not None:
+            kind = "int" if _INT.match(value) else "float"
+            self._add_number(number)
+        elif value.lower() in _BOOLS:
+            kind = "bool"
+        elif _DATE.match(value):
+            kind = "date"
+            self.text_min = value if self.text_min is None or value < self.text_min else self.text_min
+            self.text_max = value if self.text_max is None or value > self.text_max else self.text_max
+        else:
+            kind = "string"
+        self.types[kind] = self.types.get(kind, 0) + 1
+        self._remember(value)
+
+    def add_value(self, value):
+        """A decoded JSON value"""
+        self.count += 1
+        if value is None:
+            self.nulls += 1
+            return
+        if isinstance(value, bool):
+            kind = "bool"
+        elif isinstance(value, int):
+            kind = "int"
+        elif isinstance(value, float):
+            kind = "float"
+        elif isinstance(value, str):
+            kind = "date" if _DATE.match(value) else "string"
+        elif isinstance(value, list):
+            kind = "array"
+        else:
+            kind = "object"
+        self.types[kind] = self.types.get(kind, 0) + 1
+        if kind in ("int", "float"):
+            self._add_number(float(value))
+        elif kind == "date":
+            self.text_min = value if self.text_min is None or value < self.text_min else self.text_min
+            self.text_max = value if self.text_max is None or value > self.text_max else self.text_max
+        if kind not in ("array", "object"):
+            self._remember(value)
+
+    def inferred_type(self) -> str:
+        kinds = set(self.types)
+        if not kinds:
+            return "empty"
+        if kinds <= {"int"}:
+            return "int"
+        if kinds <= {"int", "float"}:
+            return "float"
+        if len(kinds) == 1:
+            return kinds.pop()
+        # Mostly one type with a few stray values still reads as that type
+        main, n = max(self.types.items(), key=lambda kv: kv[1])
+        return main if n >= 0.95 * sum(self.types.values()) else "mixed(" + "/".join(sorted(kinds)) + ")"
+
+    def to_dict(self) -> dict:
+        info = {"name": self.name, "type": self.inferred_type(), "count": self.count, "nulls": self.nulls}
+        if self.numeric:
+            info.update(sum=_number(self.sum), min=_number(self.min), max=_number(self.max))
+        if self.text_min is not None:
+            info.update(min=self.text_min, max=self.text_max)
+        if not self.high_cardinality:
+            info["distinct"] = len(self.distinct)
+            info["values"] = sorted(self.distinct, key=_value_order)
+        else:
+            info["distinct"] = f">{DISTINCT_LIMIT}"
+        return info
+
+class _Table:
+    """Column statistics keyed by column name, capped at MAX_COLUMNS"""
+
+    def __init__(self, names=()):
+        self.columns = OrderedDict()
+        self.extra_columns = 0
+        for name in names:
+            self.column(name)
+
+    def column(self, name):
+        col = self.columns.get(name)
+        if col is None:
+            if len(self.columns) >= MAX_COLUMNS:
+                self.extra_columns += 1
+                return None
+            col = self.columns[name] = ColumnStats(name)
+        return col
+
+    def to_list(self) -> list:
+        return [c.to_dict() for c in self.columns.values()]
+
+def _profile_csv(f, name: str) -> dict:
+    sample = f.read(SNIFF_CHARS)
+    f.seek(0)
+    if not sample.strip():
+        return {"kind": "csv", "rows": 0, "columns": []}
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel_tab if name.lower().endswith(".tsv") else csv.excel
+    reader = csv.reader(f, dialect)
+    header = next(reader, None) or []
+    names = [h.strip() or f"column_{i + 1}" for i, h in enumerate(header)]
+    table = _Table(names)
+    cols = list(table.columns.values())
+    rows = ragged = 0
+    first_row = None
+    for row in reader:
+        if not row:
+            continue
+        rows += 1
+        if first_row is None:
+            first_row = row
+        if len(row) != len(names):
+            ragged += 1
+        for col, cell in zip(cols, row):
+            col.add_text(cell)
+    profile = {"kind": "csv", "rows": rows, "columns": table.to_list(), "extra_columns": max(0, len(names) - len(cols))}
+    if ragged:
+        profile["ragged_rows"] = ragged
+    if first_row is not None:
+        profile["sample"] = _clip(dialect.delimiter.join(first_row), LINE_MAX_CHARS)
+    return profile
+
+class _JsonStream:
+    """
+    Incremental reader over a file holding one JSON document. Array elements
+    and object members are decoded one at a time, at any depth the caller
+    walks into, so memory is bounded by the largest single element rather
+    than the whole file.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size: int = READ_CHUNK_CHARS):
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ""
+            self._fill()
+
+    def take(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number ending exactly at the buffer edge may continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # raw_decode cannot resume, so read as much again as is buffered:
+            # a large element is re-scanned O(log n) times, not once per chunk
+            self._fill(max(READ_CHUNK_CHARS, len(self.buf) - self.pos))
+
+    def elements(self):
+        """Yield the elements of the array at the current position"""
+        self.take("[")
+        if self.peek() == "]":
+            self.take("]")
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self.take(",")
+                continue
+            self.take("]")
+            return
+
+    def members(self):
+        """
+        Walk the object at the current position. Yields each key with the
+        stream positioned at its value, which the caller must consume with
+        value() or elements() before asking for the next key.
+        """
+        self.take("{")
+        if self.peek() == "}":
+            self.take("}")
+            return
+        while True:
+            key = self.value()
+            self.take(":")
+            yield key
+            if self.peek() == ",":
+                self.take(",")
+                continue
+            self.take("}")
+            return
+
+def _profile_records(records) -> dict:
+    """Profile an iterable of JSON values as a table (objects) or a single column"""
+    table = _Table()
+    rows = 0
+    first = None
+    for record in records:
+        rows += 1
+        if first is None:
+            first = record
+        if isinstance(record, dict):
+            for key, value in record.items():
+                col = table.column(key)
+                if col is not None:
+                    col.add_value(value)
+        else:
+            col = table.column("value")
+            col.add_value(record)
+    profile = {"rows": rows, "columns": table.to_list(), "extra_columns": table.extra_columns}
+    if first is not None:
+        profile["sample"] = _clip(json.dumps(first, ensure_ascii=False), LINE_MAX_CHARS)
+    return profile
+
+def _profile_json(f) -> dict:
+    stream = _JsonStream(f)
+    opener = stream.peek()
+    if opener == "[":
+        return {"kind": "json array", **_profile_records(stream.elements())}
+    if opener == "{":
+        members = OrderedDict()
+        tables = OrderedDict()
+        count = 0
+        for key in stream.members():
+            count += 1
+            if stream.peek() == "[":
+                # Wrapped record arrays ({"data": [...]}) are streamed like top-level ones
+                table = _profile_records(stream.elements())
+                if len(members) < MAX_COLUMNS:
+                    members[key] = f"array[{table['rows']}]"
+                    if len(tables) < MAX_NESTED_TABLES:
+                        tables[key] = table
+            else:
+                value = stream.value()
+                if len(members) < MAX_COLUMNS:
+                    members[key] = _describe_json(value)
+        return {"kind": "json object", "keys": count, "members": members, "tables": tables}
+    value = stream.value() if opener else None
+    return {"kind": "json value", "sample": _clip(json.dumps(value), LINE_MAX_CHARS)}
+
+def _describe_json(value) -> str:
+    if isinstance(value, list):
+        inner = sorted({type(v).__name__ for v in value[:100]})
+        return f"array[{len(value)}] of {'/'.join(inner) or 'nothing'}"
+    if isinstance(value, dict):
+        return f"object with keys {_clip(', '.join(map(str, value)), 80)}"
+    return f"{type(value).__name__} {_clip(json.dumps(value), 40)}"
+
+def _profile_json_lines(f) -> dict:
+    def records():
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    return {"kind": "json lines", **_profile_records(records())}
+
+def _profile_markdown(f) -> dict:
+    lines = words = code_blocks = links = table_lines = 0
+    headings = []
+    first_paragraph = None
+    in_code = False
+    for line in f:
+        lines += 1
+        stripped = line.strip()
+        if stripped.startswith("```") or stripped.startswith("~~~"):
+            in_code = not in_code
+            code_blocks += not in_code
+            continue
+        if in_code:
+            continue
+        words += len(stripped.split())
+        links += stripped.count("](")
+        if stripped.startswith("|"):
+            table_lines += 1
+        if stripped.startswith("#"):
+            if len(headings) < MAX_HEADINGS:
+                headings.append(_clip(stripped, 80))
+        elif first_paragraph is None and stripped:
+            first_paragraph = _clip(stripped, 200)
+    return {
+        "kind": "markdown", "lines": lines, "words": words, "headings": headings,
+        "code_blocks": code_blocks, "links": links, "table_lines": table_lines, "intro": first_paragraph,
+    }
+
+def _profile_text(f) -> dict:
+    lines = words = 0
+    head = None
+    for line in f:
+        lines += 1
+        words += len(line.split())
+        if head is None and line.strip():
+            head = _clip(line.strip(), 200)
+    return {"kind": "text", "lines": lines, "words": words, "first_line": head}
+
+def profile_attachment(attachment: dict) -> dict:
+    """
+    Profile one decode_attachments entry ({name, path, mime, size, sha256}).
+    Results are cached by content hash.
+    """
+    name = attachment["name"]
+    lower = name.lower()
+    mime = attachment.get("mime") or ""
+    cache_key = (attachment.get("sha256"), lower)
+    if cache_key[0]:
+        with _cache_lock:
+            if cache_key in _cache:
+                _cache.move_to_end(cache_key)
+                return _cache[cache_key]
+
+    base = {"name": name, "mime": mime, "size": attachment.get("size")}
+    with open(attachment["path"], "r", encoding="utf-8", errors="replace", newline="") as f:
+        if lower.endswith(TABLE_EXTENSIONS) or mime in ("text/csv", "text/tab-separated-values"):
+            profile = _profile_csv(f, name)
+        elif lower.endswith(JSON_LINES_EXTENSIONS):
+            profile = _profile_json_lines(f)
+        elif lower.endswith(JSON_EXTENSIONS) or mime == "application/json":
+            profile = _profile_json(f)
+        elif lower.endswith(MARKDOWN_EXTENSIONS) or mime == "text/markdown":
+            profile = _profile_markdown(f)
+        elif lower.endswith(TEXT_EXTENSIONS) or mime.startswith("text"):
+            profile = _profile_text(f)
+        else:
+            profile = {"kind": "binary"}
+    profile = {**base, **profile}
+
+    if cache_key[0]:
+        with _cache_lock:
+            _cache[cache_key] = profile
+            while len(_cache) > CACHE_ITEMS:
+                _cache.popitem(last=False)
+    return profile
+
+def _human_size(size) -> str:
+    if size is None:
+        return "unknown size"
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def _column_line(col: dict, indent: str = "  ") -> str:
+    parts = [f"{col['name']}: {col['type']}"]
+    if col["nulls"]:
+        parts.append(f"{col['nulls']} empty")
+    if "sum" in col:
+        parts.append(f"sum={col['sum']} min={col['min']} max={col['max']}")
+    elif "min" in col:
+        parts.append(f"min={col['min']} max={col['max']}")
+    if not isinstance(col["distinct"], int):
+        if col["type"] not in ("int", "float", "date"):
+            parts.append(f"{col['distinct']} distinct")
+    elif not col["values"]:
+        pass
+    elif col["type"] not in ("int", "float"):
+        parts.append(f"{col['distinct']} distinct: {', '.join(col['values'])}")
+    elif col["distinct"] <= 5:
+        parts.append(f"values: {', '.join(col['values'])}")
+    return _clip(f"{indent}- " + ", ".join(parts), LINE_MAX_CHARS)
+
+def format_profile(profile: dict) -> str:
+    """Compact prompt text for a profile, at most PROFILE_MAX_CHARS long"""
+    head = f"- {profile['name']} ({profile['mime'] or 'unknown type'}, {_human_size(profile['size'])})"
+    kind = profile["kind"]
+    lines = []
+    if "columns" in profile:
+        extra = profile.get("extra_columns") or 0
+        n_cols = len(profile["columns"]) + extra
+        lines.append(f"{head}: {kind}, {profile['rows']} rows, {n_cols} columns")
+        lines.extend(_column_line(c) for c in profile["columns"])
+        if extra:
+            lines.append(f"  - … {extra} more columns")
+        if profile.get("ragged_rows"):
+            lines.append(f"  - {profile['ragged_rows']} rows with a different number of fields")
+        if profile.get("sample"):
+            lines.append(f"  first row: {profile['sample']}")
+    elif kind == "json object":
+        lines.append(f"{head}: JSON object with {profile['keys']} keys")
+        tables = profile.get("tables") or {}
+        for k, v in profile["members"].items():
+            lines.append(_clip(f"  - {k}: {v}", LINE_MAX_CHARS))
+            table = tables.get(k)
+            if table:
+                lines.extend(_column_line(c, "    ") for c in table["columns"])
+                if table.get("extra_columns"):
+                    lines.append(f"    - … {table['extra_columns']} more columns")
+                if table.get("sample"):
+                    lines.append(f"    first row: {table['sample']}")
+    elif kind == "json value":
+        lines.append(f"{head}: JSON value {profile['sample']}")
+    elif kind == "markdown":
+        lines.append(
+            f"{head}: Markdown, {profile['lines']} lines, {profile['words']} words, "
+            f"{profile['code_blocks']} code blocks, {profile['links']} links, {profile['table_lines']} table lines"
+        )
+        if profile["headings"]:
+            lines.append(_clip("  headings: " + " | ".join(profile["headings"]), LINE_MAX_CHARS * 2))
+        if profile["intro"]:
+            lines.append(f"  intro: {profile['intro']}")
+    elif kind == "text":
+        lines.append(f"{head}: text, {profile['lines']} lines, {profile['words']} words")
+        if profile["first_line"]:
+            lines.append(f"  starts: {profile['first_line']}")
+    else:
+        lines.append(f"{head}: binary file")
+
+    text = "\n".join(lines)
+    if len(text) > PROFILE_MAX_CHARS:
+        text = text[: PROFILE_MAX_CHARS - 1].rsplit("\n", 1)[0] + "\n  …"
+    return text
@@ -0,0 +1,136 @@
+# app/checkpoints.py
+"""
+Checkpoint store for staged pipeline runs.
+
+Each run keeps a JSON state (request, next stage, stage outputs) plus a short
+lease so only one invocation advances it at a time. With KV_REST_API_URL and
+KV_REST_API_TOKEN set (Vercel KV / Upstash Redis REST API) state is shared by
+every function instance; otherwise it lives in the SQLite state database,
+which is enough for local runs and single-instance deployments.
+"""
+import os
+import json
+import time
+from app import config  # noqa: F401  (loads .env)
+from app.storage import connect
+from app.http_clients import get_client
+
+KV_REST_API_URL = os.getenv("KV_REST_API_URL")
+KV_REST_API_TOKEN = os.getenv("KV_REST_API_TOKEN")
+# Finished and abandoned runs are forgotten after this many seconds
+CHECKPOINT_TTL = int(os.getenv("CHECKPOINT_TTL", str(7 * 86400)))
+
+class SQLiteCheckpoints:
+    """Checkpoints in the local state database"""
+
+    def __init__(self):
+        conn = connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,     -- JSON run state
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("DELETE FROM checkpoints WHERE updated_at < ?", (time.time() - CHECKPOINT_TTL,))
+        finally:
+            conn.close()
+
+    def get(self, run_id: str):
+        conn = connect()
+        try:
+            row = conn.execute("SELECT state FROM checkpoints WHERE id = ?", (run_id,)).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row["state"]) if row else None
+
+    def put(self, run_id: str, state: dict):
+        conn = connect()
+        try:
+            conn.execute(
+                "INSERT INTO checkpoints (id, state, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                (run_id, json.dumps(state), time.time()),
+            )
+        finally:
+            conn.close()
+
+    def acquire(self, run_id: str, owner: str, seconds: float) -> bool:
+        """Take the run's lease unless another invocation holds a live one"""
+        now = time.time()
+        conn = connect()
+        try:
+            conn.execute(
+                "INSERT OR IGNORE INTO checkpoints (id, state, updated_at) VALUES (?, 'null', ?)", (run_id, now)
+            )
+            cur = conn.execute(
+                "UPDATE checkpoints SET lease_owner = ?, lease_expires = ? "
+                "WHERE id = ? AND (lease_owner IS NULL OR lease_owner = ? OR lease_expires < ?)",
+                (owner, now + seconds, run_id, owner, now),
+            )
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def release(self, run_id: str, owner: str):
+        conn = connect()
+        try:
+            conn.execute(
+                "UPDATE checkpoints SET lease_owner = NULL, lease_expires = NULL WHERE id = ? AND lease_owner = ?",
+                (run_id, owner),
+            )
+        finally:
+            conn.close()
+
+RELEASE_SCRIPT = (
+    "if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) else return 0 end"
+)
+
+class KVCheckpoints:
+    """Checkpoints in a Redis-compatible REST store (Vercel KV, Upstash)"""
+
+    def __init__(self, url: str, token: str):
+        self.url = url.rstrip("/")
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def _command(self, *args):
+        r = get_client(self.url).post(self.url, json=[str(a) for a in args], headers=self.headers, timeout=10)
+        r.raise_for_status()
+        return r.json().get("result")
+
+    def get(self, run_id: str):
+        raw = self._command("GET", f"checkpoint:{run_id}")
+        state = json.loads(raw) if raw else None
+        return state or None
+
+    def put(self, run_id: str, state: dict):
+        self._command("SET", f"checkpoint:{run_id}", json.dumps(state), "EX", CHECKPOINT_TTL)
+
+    def acquire(self, run_id: str, owner: str, seconds: float) -> bool:
+        key = f"checkpoint-lease:{run_id}"
+        if self._command("SET", key, owner, "NX", "EX", max(1, int(seconds))) == "OK":
+            return True
+        return self._command("GET", key) == owner
+
+    def release(self, run_id: str, owner: str):
+        # Compare and delete in one step, so a lease that expired and was
+        # taken by another invocation in the meantime is left alone
+        self._command("EVAL", RELEASE_SCRIPT, 1, f"checkpoint-lease:{run_id}", owner)
+
+_store = None
+
+def checkpoint_store():
+    """The configured store, created on first use"""
+    global _store
+    if _store is None:
+        if KV_REST_API_URL and KV_REST_API_TOKEN:
+            _store = KVCheckpoints(KV_REST_API_URL, KV_REST_API_TOKEN)
+        else:
+            _store = SQLiteCheckpoints()
+    return _store
+
+def checkpoint_backend() -> str:
+    return "kv" if KV_REST_API_URL and KV_REST_API_TOKEN else "sqlite"
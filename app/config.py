@@ -0,0 +1,8 @@
+# app/config.py
+"""
+Process configuration. Importing this module reads .env once; modules then
+read their settings with os.getenv at import time as before.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
@@ -0,0 +1,182 @@
+# app/generation_cache.py
+"""
+Content-addressed cache for LLM generations.
+
+Entries are keyed by a digest of everything that determines the output
+(model, round, brief, checks, attachment bytes and previous README/code), held in
+an in-memory LRU and mirrored to disk with size-based eviction.
+"""
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from app import config  # noqa: F401  (loads .env)
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+GEN_CACHE_ENABLED = os.getenv("GEN_CACHE_ENABLED", "1") == "1"
+GEN_CACHE_DIR = os.getenv("GEN_CACHE_DIR", os.path.join(tempfile.gettempdir(), "llm_generation_cache"))
+GEN_CACHE_MEMORY_ITEMS = int(os.getenv("GEN_CACHE_MEMORY_ITEMS", "128"))
+GEN_CACHE_DISK_BYTES = int(os.getenv("GEN_CACHE_DISK_BYTES", str(200 * 1024 * 1024)))
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def generation_key(model: str, round_num, brief: str, checks, saved_attachments, prev_readme, prev_code=None) -> str:
+    """
+    Digest of the generation inputs. Attachments contribute their name, mime
+    type and content hash, so a resent request with a new nonce maps to the
+    same key.
+    """
+    attachments = []
+    for s in saved_attachments or []:
+        digest = s.get("sha256") or _file_digest(s["path"])
+        attachments.append([s["name"], s.get("mime", ""), digest])
+    material = json.dumps({
+        "model": model,
+        "round": round_num,
+        "brief": brief,
+        "checks": list(checks or []),
+        "attachments": attachments,
+        "prev_readme": prev_readme or "",
+        "prev_code": prev_code or "",
+    }, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    Two-tier cache: an OrderedDict LRU in memory and JSON files on disk.
+    The disk tier evicts least recently used entries (by mtime) once it
+    grows past max_disk_bytes.
+    """
+
+    def __init__(self, directory: str, max_memory_items: int, max_disk_bytes: int):
+        self.directory = directory
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_usage = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _remember(self, key: str, files: dict):
+        self._memory[key] = files
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str):
+        """Return the cached files dict for key, or None"""
+        with self._lock:
+            files = self._memory.get(key)
+            if files is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return dict(files)
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                files = json.load(f)
+            os.utime(path)
+        except (OSError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self._remember(key, files)
+            self.disk_hits += 1
+        return dict(files)
+
+    def put(self, key: str, files: dict):
+        """Store files under key in both tiers"""
+        with self._lock:
+            self._remember(key, dict(files))
+
+        path = self._path(key)
+        try:
+            # Size of the entry being overwritten, taken off the usage total below
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(files, f)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            log.warning("⚠ Could not write generation cache entry", extra={"error": str(e)})
+            return
+
+        with self._lock:
+            if self._disk_usage is None:
+                self._disk_usage = self._scan_disk_usage()
+            else:
+                self._disk_usage += size - replaced
+            if self._disk_usage > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _entries(self):
+        entries = []
+        for root, _dirs, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_disk_usage(self) -> int:
+        return sum(size for _mtime, size, _path in self._entries())
+
+    def _evict_disk(self):
+        # Trim to 90% of the budget so eviction does not run on every put
+        target = int(self.max_disk_bytes * 0.9)
+        entries = sorted(self._entries())
+        usage = sum(size for _mtime, size, _path in entries)
+        for _mtime, size, path in entries:
+            if usage <= target:
+                break
+            try:
+                os.remove(path)
+                usage -= size
+            except OSError:
+                pass
+        self._disk_usage = usage
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            hits = self.memory_hits + self.disk_hits
+            return {
+                "enabled": GEN_CACHE_ENABLED,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk_bytes": self._disk_usage,
+            }
+
+
+generation_cache = GenerationCache(GEN_CACHE_DIR, GEN_CACHE_MEMORY_ITEMS, GEN_CACHE_DISK_BYTES)
@@ -0,0 +1,193 @@
+# app/github_rate.py
+"""
+Rate-limit-aware scheduler for GitHub API calls.
+
+Every GitHub request (PyGithub or raw REST) passes through one shared
+GitHubRateScheduler, which
+- paces requests with a token bucket (GITHUB_RATE_PER_SEC, GITHUB_BURST),
+- tracks X-RateLimit-Remaining / X-RateLimit-Reset and holds requests until
+  the reset once the remaining budget drops to GITHUB_MIN_REMAINING,
+- backs off on secondary rate limits (403/429 with Retry-After or the
+  "secondary rate limit" message) and retries instead of failing the job.
+Waits are computed under a lock and slept outside it, so the same scheduler
+serves threadpool callers (time.sleep) and the event loop (asyncio.sleep).
+"""
+import os
+import json
+import time
+import asyncio
+import threading
+from app import config  # noqa: F401  (loads .env)
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+GITHUB_RATE_PER_SEC = float(os.getenv("GITHUB_RATE_PER_SEC", "1.2"))
+GITHUB_BURST = float(os.getenv("GITHUB_BURST", "10"))
+GITHUB_MIN_REMAINING = int(os.getenv("GITHUB_MIN_REMAINING", "50"))
+GITHUB_MAX_RETRIES = int(os.getenv("GITHUB_MAX_RETRIES", "5"))
+# First wait after a secondary limit without Retry-After (GitHub suggests >= 60s)
+GITHUB_SECONDARY_BACKOFF = float(os.getenv("GITHUB_SECONDARY_BACKOFF", "60"))
+GITHUB_MAX_BACKOFF = float(os.getenv("GITHUB_MAX_BACKOFF", "900"))
+
+
+class GitHubRateScheduler:
+    def __init__(self, rate: float = GITHUB_RATE_PER_SEC, burst: float = GITHUB_BURST,
+                 min_remaining: int = GITHUB_MIN_REMAINING):
+        self.rate = rate
+        self.burst = burst
+        self.min_remaining = min_remaining
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._refilled_at = time.monotonic()
+        self.remaining = None
+        self.limit = None
+        self.reset_at = None        # epoch seconds, from X-RateLimit-Reset
+        self.blocked_until = 0.0    # epoch seconds, set by secondary limits
+        self.requests = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self._requester = None
+
+    def track_requester(self, requester):
+        """Read quota from a PyGithub Requester after each call() (no extra API call)"""
+        self._requester = requester
+
+    # === Pacing ===
+    def _reserve(self) -> float:
+        """Take one token and return how long the caller must wait before sending"""
+        with self._lock:
+            now_mono = time.monotonic()
+            now = time.time()
+            self._tokens = min(self.burst, self._tokens + (now_mono - self._refilled_at) * self.rate)
+            self._refilled_at = now_mono
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+            wait = max(wait, self.blocked_until - now)
+            if (self.remaining is not None and self.remaining <= self.min_remaining
+                    and self.reset_at and self.reset_at > now):
+                wait = max(wait, self.reset_at - now + 1)
+            if self.remaining is not None:
+                self.remaining -= 1
+
+            self.requests += 1
+            self.total_wait += wait
+            return wait
+
+    def acquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    # === Quota tracking ===
+    def update_from_headers(self, headers):
+        remaining = headers.get("x-ratelimit-remaining")
+        limit = headers.get("x-ratelimit-limit")
+        reset = headers.get("x-ratelimit-reset")
+        with self._lock:
+            if remaining is not None:
+                self.remaining = int(float(remaining))
+            if limit is not None:
+                self.limit = int(float(limit))
+            if reset is not None:
+                self.reset_at = float(reset)
+
+    def _update_from_requester(self):
+        if self._requester is None:
+            return
+        remaining, limit = self._requester.rate_limiting
+        if remaining >= 0:
+            with self._lock:
+                self.remaining, self.limit = remaining, limit
+                self.reset_at = float(self._requester.rate_limiting_resettime) or self.reset_at
+
+    def retry_delay(self, status: int, headers, body: str, attempt: int):
+        """
+        Seconds to wait before retrying a rate-limited response, or None when
+        the response is not a rate limit (e.g. a genuine 403 permission error).
+        """
+        if status not in (403, 429):
+            return None
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        now = time.time()
+        if headers.get("retry-after"):
+            delay = float(headers["retry-after"])
+        elif headers.get("x-ratelimit-remaining") == "0" and headers.get("x-ratelimit-reset"):
+            delay = max(0.0, float(headers["x-ratelimit-reset"]) - now) + 1
+        elif "rate limit" in (body or "").lower() or status == 429:
+            delay = GITHUB_SECONDARY_BACKOFF * (2 ** attempt)
+        else:
+            return None
+        delay = min(delay, GITHUB_MAX_BACKOFF)
+        with self._lock:
+            # Hold every caller, not just this one, until the limit clears
+            self.blocked_until = max(self.blocked_until, now + delay)
+            self.rate_limited += 1
+        return delay
+
+    # === Call wrappers ===
+    def call(self, fn, *args, **kwargs):
+        """Run a PyGithub call under the scheduler, retrying on rate limits"""
+        from github import GithubException, RateLimitExceededException
+        for attempt in range(GITHUB_MAX_RETRIES + 1):
+            self.acquire()
+            try:
+                result = fn(*args, **kwargs)
+                self._update_from_requester()
+                return result
+            except GithubException as e:
+                self._update_from_requester()
+                if isinstance(e, RateLimitExceededException) and e.status not in (403, 429):
+                    status = 429
+                else:
+                    status = e.status
+                delay = self.retry_delay(status, e.headers, json.dumps(e.data), attempt)
+                if delay is None or attempt == GITHUB_MAX_RETRIES:
+                    raise
+                log.info(f"⏳ GitHub rate limit hit, retrying in {delay:.0f}s (attempt {attempt + 1})")
+
+    def request(self, send, *args, **kwargs):
+        """Send a sync httpx request (send returns a Response) under the scheduler"""
+        for attempt in range(GITHUB_MAX_RETRIES + 1):
+            self.acquire()
+            r = send(*args, **kwargs)
+            self.update_from_headers(r.headers)
+            delay = self.retry_delay(r.status_code, r.headers, r.text, attempt)
+            if delay is None or attempt == GITHUB_MAX_RETRIES:
+                return r
+            log.info(f"⏳ GitHub rate limit hit, retrying in {delay:.0f}s (attempt {attempt + 1})")
+
+    async def request_async(self, send, *args, **kwargs):
+        """Async request(): send is a coroutine function returning an httpx.Response"""
+        for attempt in range(GITHUB_MAX_RETRIES + 1):
+            await self.acquire_async()
+            r = await send(*args, **kwargs)
+            self.update_from_headers(r.headers)
+            delay = self.retry_delay(r.status_code, r.headers, r.text, attempt)
+            if delay is None or attempt == GITHUB_MAX_RETRIES:
+                return r
+            log.info(f"⏳ GitHub rate limit hit, retrying in {delay:.0f}s (attempt {attempt + 1})")
+
+    def snapshot(self) -> dict:
+        """Current budget, reported on /health"""
+        with self._lock:
+            now = time.time()
+            return {
+                "remaining": self.remaining,
+                "limit": self.limit,
+                "reset_in": round(self.reset_at - now) if self.reset_at else None,
+                "blocked_for": round(max(0.0, self.blocked_until - now), 1),
+                "bucket_tokens": round(min(self.burst, self._tokens + (time.monotonic() - self._refilled_at) * self.rate), 2),
+                "requests": self.requests,
+                "rate_limited": self.rate_limited,
+                "total_wait_seconds": round(self.total_wait, 1),
+            }
+
+
+github_scheduler = GitHubRateScheduler()
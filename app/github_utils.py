@@ -1,54 +1,125 @@
 # app/github_utils.py
 import os
-from github import Github
-from github import GithubException
+import time
+import asyncio
+import base64
+import hashlib
+import threading
 import httpx
-from dotenv import load_dotenv
+from app import config  # noqa: F401  (loads .env)
 from datetime import datetime
+from app.http_clients import get_client, get_async_client
+from app.github_rate import github_scheduler
+from app.providers import github_client
+from app.logs import get_logger
 
-load_dotenv()
+log = get_logger(__name__)
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 USERNAME = os.getenv("GITHUB_USERNAME")
-g = Github(GITHUB_TOKEN)
+GITHUB_API = "https://api.github.com"
+
+# Seconds a resolved user/repo handle is reused before it is looked up again
+REPO_CACHE_TTL = float(os.getenv("REPO_CACHE_TTL", "600"))
+
+def github_call(fn, *args, **kwargs):
+    """
+    Run a PyGithub call through the rate-limit scheduler.
+    """
+    return github_scheduler.call(fn, *args, **kwargs)
+
+class _TTLCache:
+    """Small thread-safe key/value cache whose entries expire after ttl seconds"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.ttl)
+
+    def pop(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+# Authenticated user and repo handles (PyGithub objects and REST JSON)
+_handles = _TTLCache(REPO_CACHE_TTL)
+
+def invalidate_repo(repo_name: str):
+    """
+    Forget cached handles for repo_name, e.g. after GitHub answered 404.
+    """
+    _handles.pop(("repo", repo_name))
+    _handles.pop(("repo_json", repo_name))
+
+def _get_user():
+    user = _handles.get("user")
+    if user is None:
+        user = github_client().get_user()
+        _handles.set("user", user)
+    return user
 
 def create_repo(repo_name: str, description: str = ""):
     """
     Create a public repository with the given name.
+    Handles are cached for REPO_CACHE_TTL, so repeated calls within a
+    pipeline make no API request.
     """
-    user = g.get_user()
+    from github import GithubException
+    repo = _handles.get(("repo", repo_name))
+    if repo is not None:
+        return repo
+
+    user = _get_user()
     # if repo exists, return it
     try:
-        repo = user.get_repo(repo_name)
-        print("Repo already exists:", repo.full_name)
+        repo = github_call(user.get_repo, repo_name)
+        log.info(f"Repo already exists: {repo.full_name}")
+        _handles.set(("repo", repo_name), repo)
         return repo
     except GithubException:
         pass
 
-    repo = user.create_repo(
+    repo = github_call(
+        user.create_repo,
         name=repo_name,
         description=description,
         private=False,
         auto_init=False
     )
-    print("Created repo:", repo.full_name)
+    log.info(f"Created repo: {repo.full_name}")
+    _handles.set(("repo", repo_name), repo)
     return repo
 
 def create_or_update_file(repo, path: str, content: str, message: str):
     """
     Create a file or update if it already exists.
     """
+    from github import GithubException
     try:
         # Try to get file to see if exists
-        current = repo.get_contents(path)
+        current = github_call(repo.get_contents, path)
         sha = current.sha
-        repo.update_file(path, message, content, sha)
-        print(f"Updated {path} in {repo.full_name}")
+        github_call(repo.update_file, path, message, content, sha)
+        log.info(f"Updated {path} in {repo.full_name}")
     except GithubException as e:
         # If 404 (not found) then create
         if e.status == 404:
-            repo.create_file(path, message, content)
-            print(f"Created {path} in {repo.full_name}")
+            github_call(repo.create_file, path, message, content)
+            log.info(f"Created {path} in {repo.full_name}")
         else:
             # some other error
             raise
@@ -59,35 +130,144 @@ def create_or_update_binary_file(repo, path: str, binary_content, commit_message
     Create or update a binary file in the repository.
     This function handles binary data like images directly without encoding/decoding.
     """
+    from github import GithubException
     try:
         # Try to get file to see if exists
         try:
-            current = repo.get_contents(path)
+            current = github_call(repo.get_contents, path)
             # Update existing file
-            repo.update_file(
+            github_call(
+                repo.update_file,
                 path=path,
                 message=commit_message,
                 content=binary_content,
                 sha=current.sha
             )
-            print(f"Updated binary file {path} in {repo.full_name}")
+            log.info(f"Updated binary file {path} in {repo.full_name}")
         except GithubException as e:
             # If file doesn't exist, create it
             if e.status == 404:
-                repo.create_file(
+                github_call(
+                    repo.create_file,
                     path=path,
                     message=commit_message,
                     content=binary_content
                 )
-                print(f"Created binary file {path} in {repo.full_name}")
+                log.info(f"Created binary file {path} in {repo.full_name}")
             else:
                 # some other error
                 raise
         return True
     except Exception as e:
-        print(f"Error creating/updating binary file {path}: {e}")
+        log.error(f"❌ Error creating/updating binary file {path}", extra={"error": str(e)})
         return False
 
+TEXT_ATTACHMENT_EXTENSIONS = (".md", ".csv", ".json", ".txt")
+
+def attachment_files(saved_attachments):
+    """
+    Build the repo file map entries for decoded attachments.
+    Text attachments are committed as text; binary ones are committed as bytes
+    together with an attachments/<name>.b64 backup.
+    """
+    files = {}
+    for att in saved_attachments or []:
+        name = att["name"]
+        try:
+            with open(att["path"], "rb") as f:
+                content_bytes = f.read()
+        except OSError as e:
+            log.warning(f"⚠ Could not read attachment {name}", extra={"error": str(e)})
+            continue
+        if att["mime"].startswith("text") or name.endswith(TEXT_ATTACHMENT_EXTENSIONS):
+            files[name] = content_bytes.decode("utf-8", errors="ignore")
+        else:
+            files[name] = content_bytes
+            files[f"attachments/{name}.b64"] = base64.b64encode(content_bytes).decode("utf-8")
+    return files
+
+def git_blob_sha(content) -> str:
+    """
+    SHA git assigns to a blob with this content (text is stored as UTF-8).
+    """
+    data = content if isinstance(content, bytes) else content.encode("utf-8")
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+def drop_unchanged(files: dict, remote_blobs: dict):
+    """
+    Split out files whose local blob SHA equals the remote tree entry.
+    remote_blobs maps path -> blob SHA. Returns (changed_files, skipped_paths).
+    """
+    changed, skipped = {}, []
+    for path, content in files.items():
+        if remote_blobs.get(path) == git_blob_sha(content):
+            skipped.append(path)
+        else:
+            changed[path] = content
+    return changed, skipped
+
+def commit_files(repo, files: dict, message: str, branch: str = "main", stats: dict = None) -> str:
+    """
+    Commit a whole file map in one commit using the Git Data API.
+    files maps repo paths to str (text) or bytes (binary) content.
+    Files identical to the current remote tree are not pushed; when nothing
+    changed no commit is made and the current head SHA is returned.
+    Moves the branch ref once and returns the new commit SHA. If stats is a
+    dict it receives {"pushed": n, "skipped": m}.
+    """
+    from github import GithubException
+    try:
+        return _commit_files(repo, files, message, branch, stats if stats is not None else {})
+    except GithubException as e:
+        if e.status == 404:
+            # The repo vanished (or was renamed) behind a cached handle
+            invalidate_repo(repo.name)
+        raise
+
+def _commit_files(repo, files: dict, message: str, branch: str, stats: dict) -> str:
+    from github import GithubException, InputGitTreeElement
+    files = dict(files)
+    seeded = 0  # file pushed through the contents API into an empty repo
+    stats.update(pushed=len(files), skipped=0)
+    try:
+        ref = github_call(repo.get_git_ref, f"heads/{branch}")
+    except GithubException as e:
+        if e.status not in (404, 409):
+            raise
+        # The Git Data API rejects empty repositories, so seed the branch
+        # with one file through the contents API first.
+        path = "LICENSE" if "LICENSE" in files else next(iter(files))
+        created = github_call(repo.create_file, path, message, files.pop(path), branch=branch)
+        seeded = 1
+        stats.update(pushed=seeded)
+        if not files:
+            return created["commit"].sha
+        ref = github_call(repo.get_git_ref, f"heads/{branch}")
+
+    head_tree = github_call(repo.get_git_tree, ref.object.sha, recursive=True)
+    remote_blobs = {e.path: e.sha for e in head_tree.tree if e.type == "blob"}
+    files, skipped = drop_unchanged(files, remote_blobs)
+    stats.update(pushed=len(files) + seeded, skipped=len(skipped))
+    if skipped:
+        log.info(f"⏭ Skipped {len(skipped)} unchanged files in {repo.full_name}", extra={"files": skipped})
+    if not files:
+        return ref.object.sha
+
+    base_commit = github_call(repo.get_git_commit, ref.object.sha)
+    elements = []
+    for path, content in files.items():
+        if isinstance(content, bytes):
+            blob = github_call(repo.create_git_blob, base64.b64encode(content).decode("ascii"), "base64")
+            elements.append(InputGitTreeElement(path, "100644", "blob", sha=blob.sha))
+        else:
+            elements.append(InputGitTreeElement(path, "100644", "blob", content=content))
+
+    tree = github_call(repo.create_git_tree, elements, base_tree=head_tree)
+    commit = github_call(repo.create_git_commit, message, tree, [base_commit])
+    github_call(ref.edit, commit.sha)
+    log.info(f"Committed {len(elements)} files to {repo.full_name}@{branch}: {commit.sha}")
+    return commit.sha
+
 def enable_pages(repo_name: str, branch: str = "main"):
     """
     Enable GitHub Pages via REST API; expects GITHUB_USERNAME in env.
@@ -96,16 +276,180 @@ def enable_pages(repo_name: str, branch: str = "main"):
     headers = {"Authorization": f"token {GITHUB_TOKEN}", "Accept": "application/vnd.github.v3+json"}
     data = {"source": {"branch": branch, "path": "/"}}
     try:
-        r = httpx.post(url, headers=headers, json=data, timeout=30.0)
+        r = github_scheduler.request(get_client(url).post, url, headers=headers, json=data)
         if r.status_code in (201, 204):
-            print("✅ Pages enabled for", repo_name)
+            log.info(f"✅ Pages enabled for {repo_name}")
+            return True
+        if r.status_code == 409:
+            # Pages is already configured for this repo
+            log.info(f"✅ Pages already enabled for {repo_name}")
             return True
         else:
             # GitHub sometimes returns 202 while building; treat 202 as success to allow polling
-            print("Pages API returned:", r.status_code, r.text)
+            log.warning(f"⚠ Pages API returned {r.status_code}", extra={"response": r.text})
             return False
     except Exception as e:
-        print("Failed to call Pages API:", e)
+        log.error("❌ Failed to call Pages API", extra={"error": str(e)})
+        return False
+
+def github_request(method: str, path: str, **kwargs) -> httpx.Response:
+    """
+    Plain REST call against the GitHub API through the rate-limit scheduler.
+    """
+    headers = {**_github_headers(), **kwargs.pop("headers", {})}
+    client = get_client(GITHUB_API)
+    return github_scheduler.request(client.request, method, f"{GITHUB_API}{path}", headers=headers, **kwargs)
+
+# === Async GitHub REST helpers (used by the async pipeline) ===
+def _github_headers():
+    return {"Authorization": f"token {GITHUB_TOKEN}", "Accept": "application/vnd.github.v3+json"}
+
+async def github_request_async(method: str, path: str, **kwargs) -> httpx.Response:
+    headers = {**_github_headers(), **kwargs.pop("headers", {})}
+    client = get_async_client(GITHUB_API)
+    return await github_scheduler.request_async(client.request, method, f"{GITHUB_API}{path}", headers=headers, **kwargs)
+
+async def create_repo_async(repo_name: str, description: str = "") -> dict:
+    """
+    Async create_repo: returns the repository JSON, creating the repo if missing.
+    Shares the handle cache with create_repo.
+    """
+    repo = _handles.get(("repo_json", repo_name))
+    if repo is not None:
+        return repo
+
+    r = await github_request_async("GET", f"/repos/{USERNAME}/{repo_name}")
+    if r.status_code == 200:
+        repo = r.json()
+        log.info(f"Repo already exists: {repo['full_name']}")
+        _handles.set(("repo_json", repo_name), repo)
+        return repo
+    if r.status_code != 404:
+        r.raise_for_status()
+
+    r = await github_request_async("POST", "/user/repos", json={
+        "name": repo_name,
+        "description": description,
+        "private": False,
+        "auto_init": False,
+    })
+    r.raise_for_status()
+    repo = r.json()
+    log.info(f"Created repo: {repo['full_name']}")
+    _handles.set(("repo_json", repo_name), repo)
+    return repo
+
+async def get_file_text_async(full_name: str, path: str):
+    """
+    Return the decoded text of a file on the default branch, or None if missing.
+    """
+    r = await github_request_async(
+        "GET", f"/repos/{full_name}/contents/{path}",
+        headers={"Accept": "application/vnd.github.raw"},
+    )
+    if r.status_code != 200:
+        return None
+    return r.text
+
+async def _tree_entry_async(full_name: str, path: str, content) -> dict:
+    if isinstance(content, bytes):
+        r = await github_request_async("POST", f"/repos/{full_name}/git/blobs", json={
+            "content": base64.b64encode(content).decode("ascii"),
+            "encoding": "base64",
+        })
+        r.raise_for_status()
+        return {"path": path, "mode": "100644", "type": "blob", "sha": r.json()["sha"]}
+    return {"path": path, "mode": "100644", "type": "blob", "content": content}
+
+async def commit_files_async(full_name: str, files: dict, message: str, branch: str = "main", stats: dict = None) -> str:
+    """
+    Async commit_files: one tree, one commit and one ref update via the REST API.
+    Unchanged files are skipped and binary blobs are uploaded concurrently.
+    Returns the new commit SHA (the current head if nothing changed).
+    """
+    try:
+        return await _commit_files_async(full_name, files, message, branch, stats if stats is not None else {})
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            invalidate_repo(full_name.split("/", 1)[1])
+        raise
+
+async def _commit_files_async(full_name: str, files: dict, message: str, branch: str, stats: dict) -> str:
+    files = dict(files)
+    seeded = 0  # file pushed through the contents API into an empty repo
+    stats.update(pushed=len(files), skipped=0)
+    git = f"/repos/{full_name}/git"
+    r = await github_request_async("GET", f"{git}/ref/heads/{branch}")
+    if r.status_code in (404, 409):
+        # Empty repository: seed the branch through the contents API first
+        path = "LICENSE" if "LICENSE" in files else next(iter(files))
+        content = files.pop(path)
+        raw = content if isinstance(content, bytes) else content.encode("utf-8")
+        r = await github_request_async("PUT", f"/repos/{full_name}/contents/{path}", json={
+            "message": message,
+            "content": base64.b64encode(raw).decode("ascii"),
+            "branch": branch,
+        })
+        r.raise_for_status()
+        seeded = 1
+        stats.update(pushed=seeded)
+        if not files:
+            return r.json()["commit"]["sha"]
+        r = await github_request_async("GET", f"{git}/ref/heads/{branch}")
+    r.raise_for_status()
+    head_sha = r.json()["object"]["sha"]
+
+    # The recursive tree of the head commit gives both the base tree SHA and
+    # the blob SHAs to diff against
+    r = await github_request_async("GET", f"{git}/trees/{head_sha}", params={"recursive": "1"})
+    r.raise_for_status()
+    head_tree = r.json()
+    base_tree = head_tree["sha"]
+    remote_blobs = {e["path"]: e["sha"] for e in head_tree["tree"] if e["type"] == "blob"}
+    files, skipped = drop_unchanged(files, remote_blobs)
+    stats.update(pushed=len(files) + seeded, skipped=len(skipped))
+    if skipped:
+        log.info(f"⏭ Skipped {len(skipped)} unchanged files in {full_name}", extra={"files": skipped})
+    if not files:
+        return head_sha
+
+    elements = await asyncio.gather(*(
+        _tree_entry_async(full_name, path, content) for path, content in files.items()
+    ))
+    r = await github_request_async("POST", f"{git}/trees", json={"base_tree": base_tree, "tree": elements})
+    r.raise_for_status()
+    tree_sha = r.json()["sha"]
+
+    r = await github_request_async("POST", f"{git}/commits", json={
+        "message": message,
+        "tree": tree_sha,
+        "parents": [head_sha],
+    })
+    r.raise_for_status()
+    commit_sha = r.json()["sha"]
+
+    r = await github_request_async("PATCH", f"{git}/refs/heads/{branch}", json={"sha": commit_sha})
+    r.raise_for_status()
+    log.info(f"Committed {len(elements)} files to {full_name}@{branch}: {commit_sha}")
+    return commit_sha
+
+async def enable_pages_async(repo_name: str, branch: str = "main"):
+    """
+    Async enable_pages using the shared AsyncClient.
+    """
+    data = {"source": {"branch": branch, "path": "/"}}
+    try:
+        r = await github_request_async("POST", f"/repos/{USERNAME}/{repo_name}/pages", json=data)
+        if r.status_code in (201, 204):
+            log.info(f"✅ Pages enabled for {repo_name}")
+            return True
+        if r.status_code == 409:
+            log.info(f"✅ Pages already enabled for {repo_name}")
+            return True
+        log.warning(f"⚠ Pages API returned {r.status_code}", extra={"response": r.text})
+        return False
+    except Exception as e:
+        log.error("❌ Failed to call Pages API", extra={"error": str(e)})
         return False
 
 def generate_mit_license(owner_name=None):
@@ -0,0 +1,111 @@
+# app/http_clients.py
+"""
+Process-wide pooled HTTP clients.
+
+Every outbound call goes through a client taken from here, so connections
+(and TLS sessions) are kept alive and reused instead of being opened per
+request. Clients are pooled per host: hosts listed in HOST_LIMITS get their
+own pool with its own connection limit and timeout; everything else shares
+the "default" pool. Set HTTP2=1 to negotiate HTTP/2 when the optional h2
+package is installed (pip install "httpx[http2]").
+"""
+import os
+import json
+import atexit
+import threading
+from urllib.parse import urlsplit
+import httpx
+from app import config  # noqa: F401  (loads .env)
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+HTTP2_REQUESTED = os.getenv("HTTP2", "0") == "1"
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+
+# Per-host pool settings; override or extend with HTTP_HOST_LIMITS as JSON,
+# e.g. {"api.github.com": {"max_connections": 40, "timeout": 30}}
+HOST_LIMITS = {
+    "default": {"max_connections": 50, "max_keepalive": 20, "timeout": 30.0},
+    "api.github.com": {"max_connections": 20, "max_keepalive": 20, "timeout": 30.0},
+    "api.openai.com": {"max_connections": 50, "max_keepalive": 20, "timeout": 120.0},
+}
+HOST_LIMITS.update(json.loads(os.getenv("HTTP_HOST_LIMITS", "{}")))
+
+def _http2_available() -> bool:
+    if not HTTP2_REQUESTED:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        log.warning("⚠ HTTP2=1 but the h2 package is not installed; using HTTP/1.1")
+        return False
+
+HTTP2_ENABLED = _http2_available()
+
+_lock = threading.Lock()
+_clients = {}
+_async_clients = {}
+
+def _pool_name(url_or_host: str = None) -> str:
+    if not url_or_host:
+        return "default"
+    host = urlsplit(url_or_host).hostname if "://" in url_or_host else url_or_host
+    return host if host in HOST_LIMITS else "default"
+
+def _client_kwargs(pool: str) -> dict:
+    cfg = {**HOST_LIMITS["default"], **HOST_LIMITS.get(pool, {})}
+    return {
+        "limits": httpx.Limits(
+            max_connections=cfg["max_connections"],
+            max_keepalive_connections=cfg["max_keepalive"],
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(cfg["timeout"], connect=HTTP_CONNECT_TIMEOUT),
+        "http2": HTTP2_ENABLED,
+        "follow_redirects": True,
+    }
+
+def get_client(url_or_host: str = None) -> httpx.Client:
+    """
+    Return the pooled sync client for the host of url_or_host.
+    """
+    pool = _pool_name(url_or_host)
+    with _lock:
+        client = _clients.get(pool)
+        if client is None or client.is_closed:
+            client = _clients[pool] = httpx.Client(**_client_kwargs(pool))
+        return client
+
+def get_async_client(url_or_host: str = None) -> httpx.AsyncClient:
+    """
+    Return the pooled AsyncClient for the host of url_or_host.
+    Async clients are created on first use so they bind to the running loop.
+    """
+    pool = _pool_name(url_or_host)
+    client = _async_clients.get(pool)
+    if client is None or client.is_closed:
+        client = _async_clients[pool] = httpx.AsyncClient(**_client_kwargs(pool))
+    return client
+
+def close_clients():
+    """Close all sync clients"""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+async def aclose_clients():
+    """
+    Close every pooled client; called on application shutdown.
+    """
+    clients = list(_async_clients.values())
+    _async_clients.clear()
+    for client in clients:
+        await client.aclose()
+    close_clients()
+
+atexit.register(close_clients)
@@ -0,0 +1,411 @@
+# app/job_queue.py
+"""
+Durable job queue backed by SQLite with a bounded asyncio worker pool.
+
+Jobs are claimed with a lease that the worker keeps renewing while it runs.
+If the process dies, the lease expires and another worker (or the restarted
+process) picks the job up again.
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+from collections import deque
+from app import config  # noqa: F401  (loads .env)
+from app.storage import connect
+from app.metrics import Gauge
+from app.job_timeline import JobTimeline, bind_job, unbind_job, current_timeline
+from app.logs import get_logger, bind_correlation, unbind_correlation
+
+log = get_logger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2.0"))
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# Columns added after the first release of the jobs table
+_LATER_COLUMNS = {
+    "email": "TEXT",
+    "task": "TEXT",
+    "round": "INTEGER",
+    "stage": "TEXT",
+    "timeline": "TEXT",   # JSON list of stage entries
+    "result": "TEXT",     # JSON payload sent to the evaluation server
+}
+
+def init_queue():
+    """Create the jobs table if needed"""
+    conn = connect()
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,   -- JSON request data (secret stripped)
+                status TEXT NOT NULL,    -- queued | running | done | failed
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        existing = {r["name"] for r in conn.execute("PRAGMA table_info(jobs)").fetchall()}
+        for column, kind in _LATER_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        if "email" not in existing:
+            conn.execute("""
+                UPDATE jobs SET email = json_extract(payload, '$.email'),
+                                task = json_extract(payload, '$.task'),
+                                round = json_extract(payload, '$.round')
+            """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs(key)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_email_task ON jobs(email, task, created_at)")
+    finally:
+        conn.close()
+
+class QueueFull(Exception):
+    """Raised by enqueue_job when an in-flight limit is reached"""
+
+    def __init__(self, scope: str, active: int, limit: int, oldest_job_id: str = None):
+        super().__init__(f"{scope} limit reached ({active}/{limit} jobs in flight)")
+        self.scope = scope
+        self.active = active
+        self.limit = limit
+        # For the per-email limit: that email's oldest queued/running job
+        self.oldest_job_id = oldest_job_id
+
+def enqueue_job(data: dict, key: str, max_active: int = 0, max_per_email: int = 0) -> str:
+    """
+    Persist a request as a queued job and return its id.
+    If the same key is already queued or running, the existing job id is returned.
+    With max_active / max_per_email (0 = unlimited), raises QueueFull instead of
+    queueing past that many queued + running jobs overall or for data["email"].
+    The limits are checked in the same transaction as the insert.
+    """
+    payload = {k: v for k, v in data.items() if k != "secret"}
+    now = time.time()
+    conn = connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT id FROM jobs WHERE key = ? AND status IN (?, ?)", (key, *ACTIVE_STATUSES)
+        ).fetchone()
+        if row:
+            conn.execute("COMMIT")
+            return row["id"]
+        if max_per_email:
+            rows = conn.execute(
+                "SELECT id FROM jobs WHERE email = ? AND status IN (?, ?) ORDER BY created_at",
+                (data.get("email"), *ACTIVE_STATUSES)
+            ).fetchall()
+            if len(rows) >= max_per_email:
+                raise QueueFull("per_email", len(rows), max_per_email, rows[0]["id"])
+        if max_active:
+            active = conn.execute(
+                "SELECT COUNT(*) AS n FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUSES
+            ).fetchone()["n"]
+            if active >= max_active:
+                raise QueueFull("global", active, max_active)
+        job_id = uuid.uuid4().hex
+        conn.execute(
+            "INSERT INTO jobs (id, key, email, task, round, payload, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?)",
+            (job_id, key, data.get("email"), data.get("task"), data.get("round"), json.dumps(payload), now, now),
+        )
+        conn.execute("COMMIT")
+        return job_id
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def claim_job(worker_id: str):
+    """
+    Claim the oldest queued job, or a running job whose lease has expired.
+    Expired jobs that already used JOB_MAX_ATTEMPTS (the process died or hung
+    on every attempt) are marked failed instead of being claimed again.
+    Returns (job_id, payload dict, attempt number) or None.
+    """
+    now = time.time()
+    conn = connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("""
+            UPDATE jobs
+            SET status = 'failed', lease_owner = NULL, lease_expires = NULL, updated_at = ?,
+                error = COALESCE(error, 'Lease expired on the last attempt')
+            WHERE status = 'running' AND lease_expires < ? AND attempts >= ?
+        """, (now, now, JOB_MAX_ATTEMPTS))
+        row = conn.execute("""
+            SELECT id, payload, attempts FROM jobs
+            WHERE status = 'queued' OR (status = 'running' AND lease_expires < ? AND attempts < ?)
+            ORDER BY created_at
+            LIMIT 1
+        """, (now, JOB_MAX_ATTEMPTS)).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute("""
+            UPDATE jobs
+            SET status = 'running', attempts = attempts + 1, lease_owner = ?, lease_expires = ?, updated_at = ?
+            WHERE id = ?
+        """, (worker_id, now + JOB_LEASE_SECONDS, now, row["id"]))
+        conn.execute("COMMIT")
+        return row["id"], json.loads(row["payload"]), row["attempts"] + 1
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def final_attempt() -> bool:
+    """
+    True unless the current job will be retried if it fails. Pipelines use it
+    to report an error to the evaluator only once; outside the worker pool
+    every run is final.
+    """
+    timeline = current_timeline()
+    return timeline is None or timeline.attempt >= JOB_MAX_ATTEMPTS
+
+def renew_lease(job_id: str, worker_id: str) -> bool:
+    """Extend the lease of a job this worker still owns"""
+    now = time.time()
+    conn = connect()
+    try:
+        cur = conn.execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+            (now + JOB_LEASE_SECONDS, now, job_id, worker_id),
+        )
+        return cur.rowcount == 1
+    finally:
+        conn.close()
+
+def finish_job(job_id: str, worker_id: str, error: str = None):
+    """
+    Mark a job done, or on error requeue it until JOB_MAX_ATTEMPTS is reached.
+    """
+    now = time.time()
+    conn = connect()
+    try:
+        if error is None:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (now, job_id, worker_id),
+            )
+        else:
+            conn.execute("""
+                UPDATE jobs
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                    lease_owner = NULL, lease_expires = NULL, error = ?, updated_at = ?
+                WHERE id = ? AND lease_owner = ?
+            """, (JOB_MAX_ATTEMPTS, error, now, job_id, worker_id))
+    finally:
+        conn.close()
+
+def queue_counts() -> dict:
+    """Number of jobs per status"""
+    conn = connect()
+    try:
+        rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+    finally:
+        conn.close()
+    counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+    counts.update({r["status"]: r["n"] for r in rows})
+    return counts
+
+def active_counts(email: str = None) -> dict:
+    """Queued and running jobs overall, plus queued + running for one email"""
+    conn = connect()
+    try:
+        rows = conn.execute(
+            "SELECT status, COUNT(*) AS n FROM jobs WHERE status IN (?, ?) GROUP BY status", ACTIVE_STATUSES
+        ).fetchall()
+        counts = {"queued": 0, "running": 0}
+        counts.update({r["status"]: r["n"] for r in rows})
+        if email is not None:
+            counts["email"] = conn.execute(
+                "SELECT COUNT(*) AS n FROM jobs WHERE email = ? AND status IN (?, ?)", (email, *ACTIVE_STATUSES)
+            ).fetchone()["n"]
+    finally:
+        conn.close()
+    return counts
+
+def jobs_ahead(job_id: str) -> int:
+    """Other running jobs plus queued jobs created before this one"""
+    conn = connect()
+    try:
+        row = conn.execute("""
+            SELECT COUNT(*) AS n FROM jobs
+            WHERE id != ? AND (status = 'running'
+               OR (status = 'queued' AND created_at < (SELECT created_at FROM jobs WHERE id = ?)))
+        """, (job_id, job_id)).fetchone()
+    finally:
+        conn.close()
+    return row["n"]
+
+def _job_view(row, detail: bool = False) -> dict:
+    timeline = json.loads(row["timeline"]) if row["timeline"] else []
+    view = {
+        "id": row["id"],
+        "email": row["email"],
+        "task": row["task"],
+        "round": row["round"],
+        "status": row["status"],
+        "stage": row["stage"],
+        "attempts": row["attempts"],
+        "retries": max(row["attempts"] - 1, 0),
+        "error": row["error"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+        "started_at": timeline[0]["started_at"] if timeline else None,
+    }
+    if detail:
+        view["timeline"] = timeline
+        view["result"] = json.loads(row["result"]) if row["result"] else None
+    else:
+        view["stage_seconds"] = {e["stage"]: e["seconds"] for e in timeline if e["seconds"] is not None}
+    return view
+
+_VIEW_COLUMNS = "id, email, task, round, status, stage, attempts, error, created_at, updated_at, timeline, result"
+
+def get_job(job_id: str):
+    """Status, stage timeline and final payload of one job, or None"""
+    conn = connect()
+    try:
+        row = conn.execute(f"SELECT {_VIEW_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _job_view(row, detail=True) if row else None
+
+def list_jobs(email: str = None, task: str = None, status: str = None, limit: int = 50) -> list:
+    """Most recent jobs, optionally filtered by email, task and status"""
+    clauses, params = [], []
+    for column, value in (("email", email), ("task", task), ("status", status)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    conn = connect()
+    try:
+        rows = conn.execute(
+            f"SELECT {_VIEW_COLUMNS} FROM jobs {where} ORDER BY created_at DESC LIMIT ?", (*params, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [_job_view(r) for r in rows]
+
+def latest_job_id(key: str):
+    """Id of the most recent job for a request key, or None"""
+    conn = connect()
+    try:
+        row = conn.execute("SELECT id FROM jobs WHERE key = ? ORDER BY created_at DESC LIMIT 1", (key,)).fetchone()
+    finally:
+        conn.close()
+    return row["id"] if row else None
+
+queue_jobs = Gauge("queue_jobs", "Jobs in the durable queue by status", ["status"], fn=queue_counts)
+
+
+class WorkerPool:
+    """
+    Fixed-size pool of asyncio workers draining the jobs table.
+    handler is an async callable receiving the job payload.
+    """
+
+    def __init__(self, handler, size: int = JOB_WORKERS):
+        self.handler = handler
+        self.size = size
+        self.busy = 0
+        self.worker_prefix = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        # Recent handler durations, for admission ETAs
+        self._durations = deque(maxlen=100)
+
+    async def start(self):
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._run(i)) for i in range(self.size)]
+        log.info(f"👷 Started {self.size} job workers")
+
+    async def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers after a job has been enqueued"""
+        self._wakeup.set()
+
+    def mean_job_seconds(self):
+        """Mean duration of recently finished jobs, or None before the first one"""
+        durations = list(self._durations)
+        return sum(durations) / len(durations) if durations else None
+
+    def stats(self) -> dict:
+        counts = queue_counts()
+        return {
+            "workers": self.size,
+            "busy_workers": self.busy,
+            "utilisation": round(self.busy / self.size, 3) if self.size else 0.0,
+            "queue_depth": counts["queued"],
+            "jobs": counts,
+        }
+
+    async def _heartbeat(self, job_id: str, worker_id: str):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            await asyncio.to_thread(renew_lease, job_id, worker_id)
+
+    async def _run(self, index: int):
+        worker_id = f"{self.worker_prefix}-{index}"
+        while not self._stopping:
+            try:
+                claimed = await asyncio.to_thread(claim_job, worker_id)
+            except Exception as e:
+                log.error(f"❌ Worker {worker_id} failed to claim a job", extra={"error": str(e)})
+                claimed = None
+
+            if claimed is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id, payload, attempt = claimed
+            self.busy += 1
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, worker_id))
+            timeline = await asyncio.to_thread(JobTimeline.load, job_id, attempt)
+            token = bind_job(timeline)
+            log_token = bind_correlation(job_id=job_id)
+            error = None
+            started = time.monotonic()
+            try:
+                await self.handler(payload)
+            except asyncio.CancelledError:
+                # Shutdown: leave the lease to expire so the job is resumed later
+                raise
+            except Exception as e:
+                error = str(e)
+                log.error(f"❌ Job {job_id} failed on attempt {attempt}", extra={"error": error})
+            finally:
+                unbind_correlation(log_token)
+                unbind_job(token)
+                heartbeat.cancel()
+                self.busy -= 1
+                self._durations.append(time.monotonic() - started)
+            await asyncio.to_thread(finish_job, job_id, worker_id, error)
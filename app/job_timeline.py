@@ -0,0 +1,112 @@
+# app/job_timeline.py
+"""
+Per-job stage timeline.
+
+The worker pool binds a JobTimeline to the running job through a context
+variable. stage_timer (app/metrics.py) records each stage start/end on it, and
+the pipelines record the final payload. Context variables follow the job into
+asyncio tasks and asyncio.to_thread, so the sync pipeline is covered too.
+Changes are written to the jobs table on a single background thread, in
+order, so recording never blocks the event loop.
+"""
+import json
+import time
+import threading
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+from app.storage import connect
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+_current = ContextVar("current_job", default=None)
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-timeline")
+
+class JobTimeline:
+    """Stage entries of one job, appended across retries"""
+
+    def __init__(self, job_id: str, attempt: int, entries=None):
+        self.job_id = job_id
+        self.attempt = attempt
+        self.entries = list(entries or [])
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, job_id: str, attempt: int):
+        """Timeline of a claimed job, keeping entries from earlier attempts"""
+        conn = connect()
+        try:
+            row = conn.execute("SELECT timeline FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        entries = json.loads(row["timeline"]) if row and row["timeline"] else []
+        return cls(job_id, attempt, entries)
+
+    def begin(self, stage: str) -> dict:
+        entry = {"stage": stage, "attempt": self.attempt, "started_at": time.time(), "ended_at": None, "seconds": None}
+        with self._lock:
+            self.entries.append(entry)
+        self._persist()
+        return entry
+
+    def end(self, entry: dict, error: str = None):
+        with self._lock:
+            entry["ended_at"] = time.time()
+            entry["seconds"] = round(entry["ended_at"] - entry["started_at"], 3)
+            if error:
+                entry["error"] = error
+        self._persist()
+
+    def current_stage(self):
+        with self._lock:
+            running = [e for e in self.entries if e["ended_at"] is None]
+            if running:
+                return running[-1]["stage"]
+            return self.entries[-1]["stage"] if self.entries else None
+
+    def _persist(self, result=None):
+        with self._lock:
+            timeline = json.dumps(self.entries)
+        stage = self.current_stage()
+        _writer.submit(_write, self.job_id, stage, timeline, result)
+
+    def record_result(self, payload: dict):
+        self._persist(result=json.dumps(payload))
+
+def _write(job_id: str, stage, timeline: str, result):
+    conn = connect()
+    try:
+        if result is None:
+            conn.execute("UPDATE jobs SET stage = ?, timeline = ? WHERE id = ?", (stage, timeline, job_id))
+        else:
+            conn.execute(
+                "UPDATE jobs SET stage = ?, timeline = ?, result = ? WHERE id = ?", (stage, timeline, result, job_id)
+            )
+    except Exception as e:
+        log.warning(f"⚠ Could not save timeline for job {job_id}", extra={"error": str(e)})
+    finally:
+        conn.close()
+
+def bind_job(timeline: JobTimeline):
+    """Make timeline current for this task/thread; returns a reset token"""
+    return _current.set(timeline)
+
+def unbind_job(token):
+    _current.reset(token)
+
+def current_timeline():
+    return _current.get()
+
+def current_job_id():
+    timeline = _current.get()
+    return timeline.job_id if timeline else None
+
+def record_result(payload: dict):
+    """Store the payload sent to the evaluator on the current job, if any"""
+    timeline = _current.get()
+    if timeline is not None:
+        timeline.record_result(payload)
+
+def flush():
+    """Wait until queued timeline writes are on disk"""
+    _writer.submit(lambda: None).result()
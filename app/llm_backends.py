@@ -0,0 +1,382 @@
+# app/llm_backends.py
+"""
+OpenAI-compatible LLM backends with hedged requests.
+
+LLM_BACKENDS is a JSON list of backends tried in order, e.g.
+  [{"name": "openai", "base_url": "https://api.openai.com/v1", "model": "gpt-4", "api_key_env": "OPENAI_API_KEY"},
+   {"name": "backup", "base_url": "http://127.0.0.1:8081/v1", "model": "gpt-4o-mini", "api_key": "sk-..."}]
+Without it a single backend is built from OPENAI_API_KEY / OPENAI_BASE_URL.
+
+The primary gets the request first. If it has not finished after a hedge
+delay (LLM_HEDGE_PERCENTILE of its recent completion times, or
+LLM_HEDGE_DELAY until enough samples exist), the same request also goes to
+the next backend. Streamed requests hedge on time to first token instead
+(LLM_HEDGE_FIRST_TOKEN_DELAY until enough samples exist): once the primary
+is streaming it is left to finish rather than paying for a second
+generation. The first completion wins and the other is cancelled. A
+backend that fails hands over to the next one immediately.
+"""
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from app import config  # noqa: F401  (loads .env)
+from app.http_clients import get_client, get_async_client
+from app.providers import openai_client, async_openai_client
+from app.metrics import Counter, Histogram
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_MODEL = "gpt-4"
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "1") == "1"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "90"))
+# Hedge delay (seconds) used until a backend has LLM_HEDGE_MIN_SAMPLES timings
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "45"))
+# Same for streamed requests, which hedge on time to first token
+LLM_HEDGE_FIRST_TOKEN_DELAY = float(os.getenv("LLM_HEDGE_FIRST_TOKEN_DELAY", "10"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "2"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+
+backend_seconds = Histogram("llm_backend_seconds", "Completion time per LLM backend", ["backend"])
+first_token_seconds = Histogram("llm_first_token_seconds", "Time to first streamed token per LLM backend", ["backend"])
+backend_errors_total = Counter("llm_backend_errors_total", "Failed completions per LLM backend", ["backend"])
+hedges_total = Counter("llm_hedges_total", "Requests duplicated to a second backend")
+hedge_wins_total = Counter("llm_hedge_wins_total", "Completions won per backend after hedging", ["backend"])
+
+class Cancelled(Exception):
+    """Raised inside a sync attempt whose competitor already won"""
+
+class LLMBackend:
+    """One OpenAI-compatible endpoint with its own model, key and latency history"""
+
+    def __init__(self, name: str, base_url: str, model: str, api_key: str, timeout: float = LLM_REQUEST_TIMEOUT,
+                 max_retries: int = 2):
+        self.name = name
+        self.base_url = base_url
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._latencies = deque(maxlen=200)
+        self._first_tokens = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self._client = None
+        # Created on first async use so it binds to the running event loop
+        self._async_client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = openai_client(
+                api_key=self.api_key, base_url=self.base_url, timeout=self.timeout, max_retries=self.max_retries,
+                http_client=get_client(self.base_url)
+            )
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            self._async_client = async_openai_client(
+                api_key=self.api_key, base_url=self.base_url, timeout=self.timeout, max_retries=self.max_retries,
+                http_client=get_async_client(self.base_url)
+            )
+        return self._async_client
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+        backend_seconds.observe(seconds, backend=self.name)
+
+    def record_first_token(self, seconds: float):
+        with self._lock:
+            self._first_tokens.append(seconds)
+        first_token_seconds.observe(seconds, backend=self.name)
+
+    def record_cancelled(self, seconds: float, stream: bool = False):
+        """
+        Sample from an attempt cancelled because another backend won: its
+        completion time, or for a stream still waiting on its first token
+        that time, is at least `seconds`. Leaving it out would bias the
+        percentile low. It is only added once it has run past the current
+        hedge delay (the backend was hedged away from), since a hedge
+        cancelled soon after launch says little about its latency. It is
+        kept out of the histograms.
+        """
+        if seconds >= self.hedge_delay(stream):
+            with self._lock:
+                (self._first_tokens if stream else self._latencies).append(seconds)
+
+    def hedge_delay(self, stream: bool = False) -> float:
+        """Seconds to wait for this backend (its first token when streaming) before hedging to the next one"""
+        with self._lock:
+            samples = sorted(self._first_tokens if stream else self._latencies)
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_FIRST_TOKEN_DELAY if stream else LLM_HEDGE_DELAY
+        index = min(len(samples) - 1, int(len(samples) * LLM_HEDGE_PERCENTILE / 100))
+        return max(LLM_HEDGE_MIN_DELAY, samples[index])
+
+    def stats(self) -> dict:
+        with self._lock:
+            n = len(self._latencies)
+        return {
+            "name": self.name,
+            "model": self.model,
+            "samples": n,
+            "hedge_delay": round(self.hedge_delay(), 2),
+            "first_token_hedge_delay": round(self.hedge_delay(stream=True), 2),
+        }
+
+def load_backends() -> list:
+    raw = os.getenv("LLM_BACKENDS")
+    if not raw:
+        return [LLMBackend(
+            "default",
+            os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+            os.getenv("LLM_MODEL", DEFAULT_MODEL),
+            os.getenv("OPENAI_API_KEY"),
+        )]
+    configs = json.loads(raw)
+    # With somewhere to fail over to, SDK retries would only delay the handover
+    default_retries = 0 if len(configs) > 1 else 2
+    backends = []
+    for i, cfg in enumerate(configs):
+        api_key = cfg.get("api_key") or os.getenv(cfg.get("api_key_env", "OPENAI_API_KEY"))
+        backends.append(LLMBackend(
+            cfg.get("name", f"backend{i}"),
+            cfg.get("base_url", "https://api.openai.com/v1"),
+            cfg.get("model", DEFAULT_MODEL),
+            api_key,
+            float(cfg.get("timeout", LLM_REQUEST_TIMEOUT)),
+            int(cfg.get("max_retries", default_retries)),
+        ))
+    return backends
+
+BACKENDS = load_backends()
+PRIMARY_MODEL = BACKENDS[0].model
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_HEDGE_THREADS", "16")), thread_name_prefix="llm")
+
+def fire_once(callback):
+    """Wrap on_html so only the first attempt to reach index.html fires it"""
+    if callback is None:
+        return None
+    fired = threading.Event()
+
+    def wrapper(html):
+        if not fired.is_set():
+            fired.set()
+            callback(html)
+    return wrapper
+
+def _hedge_delay(attempts: dict, pending: set, stream: bool) -> float:
+    """Hedge delay of the most recently launched backend still running"""
+    running = [attempts[a] for a in attempts if a in pending]
+    return running[-1].hedge_delay(stream)
+
+def _streaming(first_tokens: dict, pending: set) -> bool:
+    """Whether the most recently launched attempt still running has produced tokens"""
+    running = [first_tokens[a] for a in first_tokens if a in pending]
+    return running[-1].is_set()
+
+def _first_token(backend: LLMBackend, first_token: threading.Event, started: float, content):
+    """Mark the attempt as streaming on its first content chunk"""
+    if content and not first_token.is_set():
+        first_token.set()
+        backend.record_first_token(time.perf_counter() - started)
+
+def _complete(backend: LLMBackend, messages, stream: bool, make_parser, cancelled: threading.Event,
+              first_token: threading.Event):
+    """One sync attempt. Returns (text, parser or None)."""
+    started = time.perf_counter()
+    try:
+        if stream:
+            parser = make_parser()
+            chunks = backend.client.chat.completions.create(
+                model=backend.model, messages=messages, max_tokens=4000, temperature=0.7, stream=True
+            )
+            try:
+                for chunk in chunks:
+                    if cancelled.is_set():
+                        raise Cancelled()
+                    if chunk.choices:
+                        _first_token(backend, first_token, started, chunk.choices[0].delta.content)
+                        parser.feed(chunk.choices[0].delta.content)
+            finally:
+                chunks.close()
+            result = parser.text, parser
+        else:
+            response = backend.client.chat.completions.create(
+                model=backend.model, messages=messages, max_tokens=4000, temperature=0.7
+            )
+            result = response.choices[0].message.content or "", None
+    except Cancelled:
+        backend.record_cancelled(time.perf_counter() - started, stream and not first_token.is_set())
+        raise
+    except Exception:
+        backend_errors_total.inc(backend=backend.name)
+        raise
+    backend.record(time.perf_counter() - started)
+    return result
+
+async def _complete_async(backend: LLMBackend, messages, stream: bool, make_parser, first_token: threading.Event):
+    """One async attempt. Returns (text, parser or None); cancellation closes the stream."""
+    started = time.perf_counter()
+    try:
+        if stream:
+            parser = make_parser()
+            chunks = await backend.async_client.chat.completions.create(
+                model=backend.model, messages=messages, max_tokens=4000, temperature=0.7, stream=True
+            )
+            try:
+                async for chunk in chunks:
+                    if chunk.choices:
+                        _first_token(backend, first_token, started, chunk.choices[0].delta.content)
+                        parser.feed(chunk.choices[0].delta.content)
+            finally:
+                await chunks.close()
+            result = parser.text, parser
+        else:
+            response = await backend.async_client.chat.completions.create(
+                model=backend.model, messages=messages, max_tokens=4000, temperature=0.7
+            )
+            result = response.choices[0].message.content or "", None
+    except asyncio.CancelledError:
+        backend.record_cancelled(time.perf_counter() - started, stream and not first_token.is_set())
+        raise
+    except Exception:
+        backend_errors_total.inc(backend=backend.name)
+        raise
+    backend.record(time.perf_counter() - started)
+    return result
+
+def hedged_completion(messages, stream: bool = False, make_parser=None, backends=None) -> dict:
+    """
+    Run a chat completion across backends with hedging (sync; attempts run on
+    a thread pool). Returns {"text", "parser", "backend", "hedged"}.
+    Raises the last error if every backend failed.
+    """
+    backends = backends or BACKENDS
+    cancelled = threading.Event()
+    futures = {}
+    first_tokens = {}
+    next_index = 0
+    hedged = False
+    # Set once the running attempt streams tokens: it is left to finish
+    streaming = False
+    last_error = None
+
+    def launch():
+        nonlocal next_index
+        backend = backends[next_index]
+        next_index += 1
+        first_token = threading.Event()
+        future = _executor.submit(_complete, backend, messages, stream, make_parser, cancelled, first_token)
+        futures[future], first_tokens[future] = backend, first_token
+
+    launch()
+    pending = set(futures)
+    try:
+        while pending:
+            can_hedge = LLM_HEDGE_ENABLED and not hedged and not streaming and next_index < len(backends)
+            timeout = _hedge_delay(futures, pending, stream) if can_hedge else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done and stream and _streaming(first_tokens, pending):
+                # Tokens are arriving: let this attempt finish unhedged
+                streaming = True
+                continue
+            if not done:
+                hedged = True
+                hedges_total.inc()
+                log.info(f"⏱ LLM backend {backends[next_index - 1].name} slow, hedging to {backends[next_index].name}")
+                launch()
+                pending = {f for f in futures if not f.done()}
+                continue
+            for future in done:
+                backend = futures[future]
+                try:
+                    text, parser = future.result()
+                except Exception as e:
+                    last_error = e
+                    log.warning(f"⚠ LLM backend {backend.name} failed", extra={"error": str(e)})
+                    continue
+                if hedged:
+                    hedge_wins_total.inc(backend=backend.name)
+                return {"text": text, "parser": parser, "backend": backend.name, "hedged": hedged}
+            # Every finished attempt failed: fail over to the next backend now
+            if not pending and next_index < len(backends):
+                streaming = False
+                launch()
+                pending = {f for f in futures if not f.done()}
+    finally:
+        # Losers stop at their next chunk; non-streamed calls just finish unused
+        cancelled.set()
+    raise last_error or RuntimeError("No LLM backend configured")
+
+async def hedged_completion_async(messages, stream: bool = False, make_parser=None, backends=None) -> dict:
+    """
+    Async hedged_completion: attempts are tasks and the loser is cancelled.
+    """
+    backends = backends or BACKENDS
+    tasks = {}
+    first_tokens = {}
+    next_index = 0
+    hedged = False
+    # Set once the running attempt streams tokens: it is left to finish
+    streaming = False
+    last_error = None
+
+    def launch():
+        nonlocal next_index
+        backend = backends[next_index]
+        next_index += 1
+        first_token = threading.Event()
+        task = asyncio.create_task(_complete_async(backend, messages, stream, make_parser, first_token))
+        tasks[task], first_tokens[task] = backend, first_token
+
+    launch()
+    pending = set(tasks)
+    try:
+        while pending:
+            can_hedge = LLM_HEDGE_ENABLED and not hedged and not streaming and next_index < len(backends)
+            timeout = _hedge_delay(tasks, pending, stream) if can_hedge else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done and stream and _streaming(first_tokens, pending):
+                streaming = True
+                continue
+            if not done:
+                hedged = True
+                hedges_total.inc()
+                log.info(f"⏱ LLM backend {backends[next_index - 1].name} slow, hedging to {backends[next_index].name}")
+                launch()
+                pending = {t for t in tasks if not t.done()}
+                continue
+            for task in done:
+                backend = tasks[task]
+                try:
+                    text, parser = task.result()
+                except Exception as e:
+                    last_error = e
+                    log.warning(f"⚠ LLM backend {backend.name} failed", extra={"error": str(e)})
+                    continue
+                if hedged:
+                    hedge_wins_total.inc(backend=backend.name)
+                return {"text": text, "parser": parser, "backend": backend.name, "hedged": hedged}
+            if not pending and next_index < len(backends):
+                streaming = False
+                launch()
+                pending = {t for t in tasks if not t.done()}
+    finally:
+        losers = [t for t in tasks if not t.done()]
+        for task in losers:
+            task.cancel()
+        await asyncio.gather(*losers, return_exceptions=True)
+    raise last_error or RuntimeError("No LLM backend configured")
+
+def backends_stats() -> list:
+    """Configured backends with their current hedge delay, for /health"""
+    return [b.stats() for b in BACKENDS]
@@ -1,74 +1,147 @@
 import os
+import re
+import time
+import uuid
+import shutil
+import asyncio
 import base64
+import hashlib
 import mimetypes
 import tempfile
 from pathlib import Path
 from datetime import datetime
-from dotenv import load_dotenv
-from openai import OpenAI
+from app import config  # noqa: F401  (loads .env)
+from app.generation_cache import GEN_CACHE_ENABLED, generation_cache, generation_key
+from app.metrics import fallbacks_total, stage_timer
+from app.attachment_profiler import profile_attachment, format_profile
+from app.fast_path import try_fast_path
+from app.llm_backends import PRIMARY_MODEL, hedged_completion, hedged_completion_async, fire_once
+from app.logs import get_logger
 
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
+log = get_logger(__name__)
 
-# Use system temp directory for cross-platform compatibility
+# Use system temp directory for cross-platform compatibility.
+# Each request decodes into its own workspace under this directory.
 TMP_DIR = Path(tempfile.gettempdir()) / "llm_attachments"
-TMP_DIR.mkdir(parents=True, exist_ok=True)
+# Base64 characters decoded per step; a multiple of 4 so chunks stay aligned
+DECODE_CHUNK_CHARS = 256 * 1024
+_WHITESPACE = re.compile(r"\s")
+# Workspaces left behind by crashed jobs are removed after this many seconds
+WORKSPACE_MAX_AGE = int(os.getenv("WORKSPACE_MAX_AGE", "86400"))
 
-def decode_attachments(attachments):
+def create_workspace(job_id: str = None) -> Path:
+    """
+    Create a private directory for one request's attachments.
+    """
+    workspace = TMP_DIR / (job_id or uuid.uuid4().hex)
+    workspace.mkdir(parents=True, exist_ok=True)
+    return workspace
+
+def cleanup_workspace(workspace):
+    """
+    Delete a request workspace and everything decoded into it.
+    """
+    if workspace:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+def gc_workspaces(max_age: int = WORKSPACE_MAX_AGE) -> int:
+    """
+    Remove workspaces older than max_age seconds. Returns how many were removed.
+    """
+    if not TMP_DIR.exists():
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in TMP_DIR.iterdir():
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry, ignore_errors=True)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+def _decode_data_uri_to(url: str, start: int, out) -> tuple:
+    """
+    Base64-decode url[start:] into the binary file out, DECODE_CHUNK_CHARS at a
+    time. Returns (size, sha256 hexdigest) of the decoded bytes.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    pending = ""
+    for i in range(start, len(url), DECODE_CHUNK_CHARS):
+        piece = pending + url[i:i + DECODE_CHUNK_CHARS]
+        if _WHITESPACE.search(piece):
+            piece = _WHITESPACE.sub("", piece)
+        cut = len(piece) - len(piece) % 4
+        pending = piece[cut:]
+        chunk = base64.b64decode(piece[:cut])
+        out.write(chunk)
+        digest.update(chunk)
+        size += len(chunk)
+    if pending:
+        chunk = base64.b64decode(pending)
+        out.write(chunk)
+        digest.update(chunk)
+        size += len(chunk)
+    return size, digest.hexdigest()
+
+def decode_attachments(attachments, workspace=None):
     """
     attachments: list of {name, url: data:<mime>;base64,<b64>}
-    Saves files into /tmp/llm_attachments/<name>
-    Returns list of dicts: {"name": name, "path": "/tmp/..", "mime": mime, "size": n}
+    Streams each data URI into workspace/blobs/<sha256>, so identical payloads
+    are stored once. A new workspace is created when none is given.
+    Returns list of dicts: {"name": name, "path": "/tmp/..", "mime": mime, "size": n, "sha256": hex}
     """
+    workspace = Path(workspace) if workspace else create_workspace()
+    blob_dir = workspace / "blobs"
+    blob_dir.mkdir(parents=True, exist_ok=True)
+
     saved = []
     for att in attachments or []:
         name = att.get("name") or "attachment"
         url = att.get("url", "")
         if not url.startswith("data:"):
             continue
+        tmp_path = None
         try:
-            header, b64data = url.split(",", 1)
-            mime = header.split(";")[0].replace("data:", "")
-            data = base64.b64decode(b64data)
-            path = TMP_DIR / name
-            with open(path, "wb") as f:
-                f.write(data)
+            comma = url.index(",")
+            mime = url[5:comma].split(";")[0]
+            with tempfile.NamedTemporaryFile(dir=blob_dir, delete=False) as tmp:
+                tmp_path = tmp.name
+                size, sha256 = _decode_data_uri_to(url, comma + 1, tmp)
+            path = blob_dir / sha256
+            if path.exists():
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, path)
             saved.append({
                 "name": name,
                 "path": str(path),
                 "mime": mime,
-                "size": len(data)
+                "size": size,
+                "sha256": sha256
             })
         except Exception as e:
-            print("Failed to decode attachment", name, e)
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            log.warning(f"⚠ Failed to decode attachment {name}", extra={"error": str(e)})
     return saved
 
 def summarize_attachment_meta(saved):
     """
     saved is list from decode_attachments.
-    Returns a short human-readable summary string for the prompt.
+    Returns a compact profile of each attachment for the prompt; its size does
+    not grow with the attachments (see app/attachment_profiler.py).
     """
     summaries = []
     for s in saved:
-        nm = s["name"]
-        p = s["path"]
-        mime = s.get("mime", "")
         try:
-            if mime.startswith("text") or nm.endswith((".md", ".txt", ".json", ".csv")):
-                with open(p, "r", encoding="utf-8", errors="ignore") as f:
-                    if nm.endswith(".csv"):
-                        lines = [next(f).strip() for _ in range(3)]
-                        preview = "\\n".join(lines)
-                    else:
-                        data = f.read(1000)
-                        preview = data.replace("\n", "\\n")[:1000]
-                summaries.append(f"- {nm} ({mime}): preview: {preview}")
-            else:
-                summaries.append(f"- {nm} ({mime}): {s['size']} bytes")
+            with stage_timer("profile"):
+                summaries.append(format_profile(profile_attachment(s)))
         except Exception as e:
-            summaries.append(f"- {nm} ({mime}): (could not read preview: {e})")
-    return "\\n".join(summaries)
+            summaries.append(f"- {s['name']} ({s.get('mime', '')}, {s['size']} bytes): (could not profile: {e})")
+    return "\n".join(summaries)
 
 def _strip_code_block(text: str) -> str:
     """
@@ -101,20 +174,26 @@ def generate_readme_fallback(brief: str, checks=None, attachments_meta=None, rou
 This README was generated as a fallback (OpenAI did not return an explicit README).
 """
 
-def generate_app_code(brief: str, attachments=None, checks=None, round_num=1, prev_readme=None):
-    """
-    Generate or revise an app using the OpenAI Responses API.
-    - round_num=1: build from scratch
-    - round_num=2: refactor based on new brief and previous README/code
-    """
-    saved = decode_attachments(attachments or [])
-    attachments_meta = summarize_attachment_meta(saved)
+# Model of the primary backend; part of the generation cache key
+MODEL = PRIMARY_MODEL
+# Stream completions and split index.html / README.md as tokens arrive
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") == "1"
+README_MARKER = "---README.md---"
+SYSTEM_PROMPT = "You are a helpful coding assistant that outputs runnable web apps."
+# Cap on previous index.html included in round-2 prompts
+PREV_CODE_MAX_CHARS = int(os.getenv("PREV_CODE_MAX_CHARS", "12000"))
 
+def build_user_prompt(brief: str, attachments_meta: str, checks=None, round_num=1, prev_readme=None, prev_code=None) -> str:
     context_note = ""
-    if round_num == 2 and prev_readme:
-        context_note = f"\n### Previous README.md:\n{prev_readme}\n\nRevise and enhance this project according to the new brief below.\n"
+    if round_num == 2 and (prev_readme or prev_code):
+        if prev_code:
+            code = prev_code[:PREV_CODE_MAX_CHARS]
+            context_note += f"\n### Previous index.html:\n```html\n{code}\n```\n"
+        if prev_readme:
+            context_note += f"\n### Previous README.md:\n{prev_readme}\n"
+        context_note += "\nRevise and enhance this project according to the new brief below.\n"
 
-    user_prompt = f"""
+    return f"""
 You are a professional web developer assistant.
 
 ### Round
@@ -135,7 +214,7 @@ You are a professional web developer assistant.
 1. Produce a complete web app (HTML/JS/CSS inline if needed) satisfying the brief.
 2. Output must contain **two parts only**:
    - index.html (main code)
-   - README.md (starts after a line containing exactly: ---README.md---)
+   - README.md (starts after a line containing exactly: {README_MARKER})
 3. README.md must include:
    - Overview
    - Setup
@@ -144,21 +223,8 @@ You are a professional web developer assistant.
 4. Do not include any commentary outside code or README.
 """
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful coding assistant that outputs runnable web apps."},
-                {"role": "user", "content": user_prompt}
-            ],
-            max_tokens=4000,
-            temperature=0.7
-        )
-        text = response.choices[0].message.content or ""
-        print("✅ Generated code using OpenAI Chat Completions API.")
-    except Exception as e:
-        print("⚠ OpenAI API failed, using fallback HTML instead:", e)
-        text = f"""
+def _fallback_text(brief: str, checks, attachments_meta: str, round_num: int) -> str:
+    return f"""
 <html>
   <head><title>Fallback App</title></head>
   <body>
@@ -167,17 +233,218 @@ You are a professional web developer assistant.
   </body>
 </html>
 
----README.md---
+{README_MARKER}
 {generate_readme_fallback(brief, checks, attachments_meta, round_num)}
 """
 
-    if "---README.md---" in text:
-        code_part, readme_part = text.split("---README.md---", 1)
+def _split_generation(text: str, brief: str, checks, attachments_meta: str, round_num: int) -> dict:
+    if README_MARKER in text:
+        code_part, readme_part = text.split(README_MARKER, 1)
         code_part = _strip_code_block(code_part)
         readme_part = _strip_code_block(readme_part)
     else:
         code_part = _strip_code_block(text)
         readme_part = generate_readme_fallback(brief, checks, attachments_meta, round_num)
+    return {"index.html": code_part, "README.md": readme_part}
+
+class GenerationStreamParser:
+    """
+    Incrementally splits a streamed completion into index.html and README.md.
+
+    The html section is considered closed as soon as either the README marker
+    or the closing code fence of the first code block has been seen. At that
+    point on_html(html) is called once, while the README is still streaming.
+    The pipelines use it only to resolve the repo early: every file still
+    goes out in the single commit made once generation has finished, so the
+    early html never reaches GitHub on its own.
+
+    Also records time-to-first-token and time-to-html. Pass the time the
+    request started as `started` so a hedged attempt's timings include the
+    wait before it was launched.
+    """
+
+    FENCE = "```"
+
+    def __init__(self, on_html=None, started: float = None):
+        self.on_html = on_html
+        self.text = ""
+        self.html = None
+        self.started = time.perf_counter() if started is None else started
+        self.first_token_at = None
+        self.html_at = None
+        self._scanned = 0
+        self._fences = 0
+        self._fence_resume = 0
+
+    def feed(self, delta: str):
+        if not delta:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.text += delta
+        if self.html is None:
+            self._scan()
+
+    def _scan(self):
+        # Re-check a small overlap so markers split across chunks are found
+        marker_from = max(0, self._scanned - len(README_MARKER))
+        marker_at = self.text.find(README_MARKER, marker_from)
+        if marker_at != -1:
+            self._close_html(self.text[:marker_at])
+            return
+
+        pos = max(self._scanned, self._fence_resume)
+        while True:
+            pos = self.text.find(self.FENCE, pos)
+            if pos == -1:
+                break
+            self._fences += 1
+            pos += len(self.FENCE)
+            self._fence_resume = pos
+            if self._fences == 2:
+                self._close_html(self.text[:pos])
+                return
+        # Leave room for a fence that is split across chunks
+        self._scanned = max(self._fence_resume, len(self.text) - (len(self.FENCE) - 1))
+
+    def _close_html(self, code_part: str):
+        self.html = _strip_code_block(code_part)
+        self.html_at = time.perf_counter()
+        if self.on_html:
+            try:
+                self.on_html(self.html)
+            except Exception as e:
+                log.warning("⚠ on_html callback failed", extra={"error": str(e)})
+
+    def timings(self) -> dict:
+        def since_start(t):
+            return round(t - self.started, 3) if t is not None else None
+        return {
+            "time_to_first_token": since_start(self.first_token_at),
+            "time_to_html": since_start(self.html_at),
+            "total": since_start(time.perf_counter()),
+        }
+
+def _chat_messages(user_prompt: str):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def _cache_lookup(use_cache, brief, checks, round_num, prev_readme, prev_code, saved):
+    """
+    Returns (cache_key, cached_files). cache_key is None when caching is off.
+    """
+    if not (use_cache and GEN_CACHE_ENABLED):
+        return None, None
+    key = generation_key(MODEL, round_num, brief, checks, saved, prev_readme, prev_code)
+    return key, generation_cache.get(key)
+
+def _fast_path_result(fast, saved, on_html) -> dict:
+    name, files = fast
+    log.info(f"⚡ Fast path '{name}' rendered the app, skipping OpenAI call.")
+    if on_html:
+        try:
+            on_html(files["index.html"])
+        except Exception as e:
+            log.warning("⚠ on_html callback failed", extra={"error": str(e)})
+    return {"files": files, "attachments": saved, "timings": None, "fast_path": name}
+
+def generate_app_code(brief: str, attachments=None, checks=None, round_num=1, prev_readme=None, use_cache=True, on_html=None,
+                      saved_attachments=None, prev_code=None):
+    """
+    Generate or revise an app using the OpenAI Responses API.
+    - round_num=1: build from scratch
+    - round_num=2: refactor based on new brief and previous README/code (prev_readme, prev_code)
+    The completion is hedged across the configured LLM backends (app/llm_backends.py).
+    Recognised task families are rendered by app/fast_path.py without the LLM
+    and identical inputs are served from the generation cache, unless
+    use_cache=False (no_cache in the request) forces a real generation.
+    With LLM_STREAMING, on_html(html) is called as soon as index.html is complete.
+    Pass saved_attachments (from decode_attachments) to avoid decoding twice.
+    """
+    saved = saved_attachments if saved_attachments is not None else decode_attachments(attachments or [])
+    fast = try_fast_path(brief, checks, round_num, saved, prev_code) if use_cache else None
+    if fast:
+        return _fast_path_result(fast, saved, on_html)
+    cache_key, cached = _cache_lookup(use_cache, brief, checks, round_num, prev_readme, prev_code, saved)
+    if cached is not None:
+        log.info("⚡ Generation cache hit, skipping OpenAI call.")
+        return {"files": cached, "attachments": saved, "timings": None}
+
+    attachments_meta = summarize_attachment_meta(saved)
+    user_prompt = build_user_prompt(brief, attachments_meta, checks, round_num, prev_readme, prev_code)
+
+    timings = None
+    try:
+        on_html = fire_once(on_html)
+        started = time.perf_counter()
+        result = hedged_completion(
+            _chat_messages(user_prompt),
+            stream=LLM_STREAMING,
+            make_parser=lambda: GenerationStreamParser(on_html=on_html, started=started)
+        )
+        text = result["text"]
+        timings = result["parser"].timings() if result["parser"] else None
+        log.info(f"✅ Generated code using Chat Completions on {result['backend']} (hedged={result['hedged']}).",
+                 extra={"timings": timings})
+    except Exception as e:
+        log.warning("⚠ OpenAI API failed, using fallback HTML instead", extra={"error": str(e)})
+        fallbacks_total.inc()
+        text = _fallback_text(brief, checks, attachments_meta, round_num)
+        cache_key = None  # never cache the fallback page
+
+    files = _split_generation(text, brief, checks, attachments_meta, round_num)
+    if cache_key:
+        generation_cache.put(cache_key, files)
+    return {"files": files, "attachments": saved, "timings": timings}
+
+async def generate_app_code_async(brief: str, attachments=None, checks=None, round_num=1, prev_readme=None, use_cache=True,
+                                  on_html=None, saved_attachments=None, prev_code=None):
+    """
+    Async counterpart of generate_app_code built on AsyncOpenAI and the shared
+    pooled httpx.AsyncClient, so a pending completion does not hold a worker thread.
+    Hedged attempts are tasks; the losing one is cancelled.
+    on_html is called from the event loop, so it may schedule tasks.
+    """
+    if saved_attachments is not None:
+        saved = saved_attachments
+    else:
+        saved = await asyncio.to_thread(decode_attachments, attachments or [])
+    fast = try_fast_path(brief, checks, round_num, saved, prev_code) if use_cache else None
+    if fast:
+        return _fast_path_result(fast, saved, on_html)
+    cache_key, cached = await asyncio.to_thread(
+        _cache_lookup, use_cache, brief, checks, round_num, prev_readme, prev_code, saved
+    )
+    if cached is not None:
+        log.info("⚡ Generation cache hit, skipping OpenAI call.")
+        return {"files": cached, "attachments": saved, "timings": None}
+
+    # Profiling streams whole files; keep it off the event loop
+    attachments_meta = await asyncio.to_thread(summarize_attachment_meta, saved)
+    user_prompt = build_user_prompt(brief, attachments_meta, checks, round_num, prev_readme, prev_code)
+
+    timings = None
+    try:
+        on_html = fire_once(on_html)
+        started = time.perf_counter()
+        result = await hedged_completion_async(
+            _chat_messages(user_prompt),
+            stream=LLM_STREAMING,
+            make_parser=lambda: GenerationStreamParser(on_html=on_html, started=started)
+        )
+        text = result["text"]
+        timings = result["parser"].timings() if result["parser"] else None
+        log.info(f"✅ Generated code using Chat Completions on {result['backend']} (async, hedged={result['hedged']}).",
+                 extra={"timings": timings})
+    except Exception as e:
+        log.warning("⚠ OpenAI API failed, using fallback HTML instead", extra={"error": str(e)})
+        fallbacks_total.inc()
+        text = _fallback_text(brief, checks, attachments_meta, round_num)
+        cache_key = None  # never cache the fallback page
 
-    files = {"index.html": code_part, "README.md": readme_part}
-    return {"files": files, "attachments": saved}
+    files = _split_generation(text, brief, checks, attachments_meta, round_num)
+    if cache_key:
+        await asyncio.to_thread(generation_cache.put, cache_key, files)
+    return {"files": files, "attachments": saved, "timings": timings}
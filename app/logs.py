@@ -0,0 +1,201 @@
+# app/logs.py
+"""
+Structured logging for the app and evaluation packages.
+
+Modules log through get_logger(__name__). Handlers never write from the
+calling thread: records are put on an in-memory queue and a QueueListener
+thread formats and writes them to stdout, so a slow or blocked stdout cannot
+stall the event loop or a worker.
+
+Before a record is queued it is cleaned up:
+- fields whose key looks like a credential (secret, token, password, ...)
+  are replaced by "[redacted]", and inside other string fields configured
+  credentials, `Bearer ...` values and `token=...`-style parameters are too
+- fields whose key ends in "url" are cut to LOG_MAX_URL_CHARS, so attachment
+  data: URIs never reach the log, and other strings to LOG_MAX_FIELD_CHARS
+- the message is cut to LOG_MAX_MESSAGE_CHARS
+- the current correlation ids (job_id, run_id) are attached
+
+Only fields are scrubbed, so messages carry identifiers and counts while
+URLs, payloads and exception text go in `extra`:
+
+    log.info("📩 Received request", extra={"request": task_request.summary()})
+    log.warning(f"⚠ Pages poll failed for {full_name}", extra={"error": str(e)})
+
+LOG_FORMAT=json writes one JSON object per line for log ingestion; the
+default text format keeps the emoji console output, with fields appended as
+key=value.
+"""
+import os
+import re
+import sys
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from contextvars import ContextVar
+from app import config  # noqa: F401  (loads .env)
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "200"))
+LOG_MAX_URL_CHARS = int(os.getenv("LOG_MAX_URL_CHARS", "80"))
+LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "2000"))
+
+# Logger hierarchies routed through the queue; "__main__" covers scripts
+LOGGER_ROOTS = ("app", "evaluation", "__main__")
+# A field is redacted when its lowercased key contains one of these
+REDACT_MARKERS = ("secret", "token", "password", "api_key", "authorization")
+# Credentials whose values are masked wherever they appear in a string field
+SECRET_ENV_VARS = ("USER_SECRET", "GITHUB_TOKEN", "OPENAI_API_KEY", "KV_REST_API_TOKEN")
+_SECRET_VALUES = [v for v in (os.getenv(name) for name in SECRET_ENV_VARS) if v and len(v) >= 8]
+_INLINE_SECRET = re.compile(r"(?i)(bearer\s+|(?:secret|token|password|api_key|key)=)[^\s&\"',]+")
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "correlation"}
+
+_correlation = ContextVar("log_correlation", default={})
+
+# === Correlation ids ===
+def bind_correlation(**ids):
+    """Add correlation ids (job_id=..., run_id=...) for this task/thread; returns a reset token"""
+    merged = dict(_correlation.get())
+    merged.update({k: v for k, v in ids.items() if v is not None})
+    return _correlation.set(merged)
+
+def unbind_correlation(token):
+    _correlation.reset(token)
+
+def correlation_ids() -> dict:
+    return dict(_correlation.get())
+
+# === Redaction and truncation ===
+def truncate(value: str, limit: int) -> str:
+    if len(value) <= limit:
+        return value
+    return f"{value[:limit]}…(+{len(value) - limit} chars)"
+
+def _is_secret(key) -> bool:
+    key = str(key).lower()
+    return any(marker in key for marker in REDACT_MARKERS)
+
+def _mask(text: str) -> str:
+    for secret in _SECRET_VALUES:
+        text = text.replace(secret, "[redacted]")
+    return _INLINE_SECRET.sub(r"\1[redacted]", text)
+
+def scrub(value, key=None, depth=0):
+    """Copy of value with secret fields redacted and long strings cut"""
+    if key is not None and _is_secret(key):
+        return "[redacted]"
+    if isinstance(value, str):
+        limit = LOG_MAX_URL_CHARS if str(key).lower().endswith("url") else LOG_MAX_FIELD_CHARS
+        return _mask(truncate(value, limit))
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    if depth >= 4:
+        return truncate(repr(value), LOG_MAX_FIELD_CHARS)
+    if isinstance(value, dict):
+        return {k: scrub(v, k, depth + 1) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        items = list(value)
+        cleaned = [scrub(v, key, depth + 1) for v in items[:20]]
+        if len(items) > 20:
+            cleaned.append(f"…(+{len(items) - 20} items)")
+        return cleaned
+    return value
+
+class ScrubFilter(logging.Filter):
+    """Redacts, truncates and tags records in the caller's thread, before they are queued"""
+
+    def filter(self, record):
+        if record.args:
+            if isinstance(record.args, dict):
+                record.args = scrub(record.args)
+            else:
+                record.args = tuple(scrub(a) for a in record.args)
+        for name in fields_of(record):
+            setattr(record, name, scrub(getattr(record, name), name))
+        record.correlation = correlation_ids()
+        return True
+
+def fields_of(record) -> list:
+    return [k for k in vars(record) if k not in _RECORD_ATTRS and not k.startswith("_")]
+
+# === Output ===
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Resolve the message and traceback here so the listener gets plain
+        # data, but keep fields and exc_text apart for the formatters
+        record = logging.makeLogRecord(vars(record))
+        record.message = truncate(record.getMessage(), LOG_MAX_MESSAGE_CHARS)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+class TextFormatter(logging.Formatter):
+    """`HH:MM:SS LEVEL [job_id=..] message key=value`"""
+
+    def format(self, record):
+        parts = [self.formatTime(record, "%H:%M:%S"), f"{record.levelname:<7}"]
+        ids = getattr(record, "correlation", None) or {}
+        if ids:
+            parts.append("[" + " ".join(f"{k}={v}" for k, v in ids.items()) + "]")
+        parts.append(record.getMessage())
+        parts.extend(f"{k}={_dumps(getattr(record, k))}" for k in fields_of(record))
+        line = " ".join(parts)
+        return f"{line}\n{record.exc_text}" if record.exc_text else line
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "correlation", None) or {})
+        for k in fields_of(record):
+            entry[k] = getattr(record, k)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return _dumps(entry)
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+_listener = None
+
+def setup_logging():
+    """Route the app loggers through the queue; safe to call more than once"""
+    global _listener
+    if _listener is not None:
+        return
+    records = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    handler.addFilter(ScrubFilter())
+    out = logging.StreamHandler(sys.stdout)
+    out.setFormatter(JSONFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    for name in LOGGER_ROOTS:
+        logger = logging.getLogger(name)
+        logger.handlers = [handler]
+        logger.setLevel(LOG_LEVEL)
+        logger.propagate = False
+    _listener = logging.handlers.QueueListener(records, out, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Write out queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def get_logger(name: str) -> logging.Logger:
+    setup_logging()
+    return logging.getLogger(name)
@@ -1,31 +1,93 @@
-from fastapi import FastAPI, Request, BackgroundTasks
-import os, json, base64
-from dotenv import load_dotenv
-from app.llm_generator import generate_app_code, decode_attachments
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, JSONResponse
+import os, time, asyncio
+from app import config  # noqa: F401  (loads .env)
+from app.task_request import FastJSONResponse, RequestRejected, read_task_request
+from app.llm_generator import (
+    generate_app_code,
+    generate_app_code_async,
+    decode_attachments,
+    create_workspace,
+    cleanup_workspace,
+    gc_workspaces,
+)
 from app.github_utils import (
     create_repo,
-    create_or_update_file,
+    create_repo_async,
+    attachment_files,
+    commit_files,
+    commit_files_async,
     enable_pages,
+    enable_pages_async,
     generate_mit_license,
 )
-from app.notify import notify_evaluation_server
-from app.github_utils import create_or_update_binary_file
+from app.repo_context import load_previous_context, load_previous_context_async
+from app.outbox import (
+    init_outbox,
+    enqueue_notification,
+    release_notification,
+    notifications_for_job,
+    NotificationDispatcher,
+    dead_letters,
+    requeue_dead,
+)
+from app.pages_tracker import PAGES_NOTIFY_MODE, PAGES_READY_TIMEOUT, wait_for_pages, wait_for_pages_async, pages_stats
+from app.http_clients import aclose_clients
+from app.job_queue import init_queue, enqueue_job, get_job, list_jobs, latest_job_id, WorkerPool, QueueFull, final_attempt
+from app.admission import ADMIT_MAX_IN_FLIGHT, ADMIT_MAX_PER_EMAIL, reject, eta_seconds, capacity
+from app.job_timeline import record_result, current_job_id
+from app.generation_cache import generation_cache
+from app.llm_backends import backends_stats
+from app.fast_path import fast_path_stats
+from app.github_rate import github_scheduler
+from app.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    render_metrics,
+    stage_timer,
+    stage_seconds,
+    timed,
+    duplicates_total,
+    errors_total,
+    jobs_in_flight,
+)
+from app.processed_store import init_processed_store, processed_key, get_processed, save_processed
+from app.logs import get_logger
+
+log = get_logger(__name__)
 
-load_dotenv()
 USER_SECRET = os.getenv("USER_SECRET")
 USERNAME = os.getenv("GITHUB_USERNAME")
-# Use system temp directory for cross-platform compatibility
-import tempfile
-PROCESSED_PATH = os.path.join(tempfile.gettempdir(), "processed_requests.json")
+# Run the pipeline on the event loop (AsyncOpenAI + httpx) instead of the threadpool
+ASYNC_PIPELINE = os.getenv("ASYNC_PIPELINE", "1") == "1"
 
 app = FastAPI(
     title="LLM Code Deployment API", 
     version="1.0.0",
     description="AI-powered code generation and GitHub deployment service",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse
 )
 
+@app.on_event("startup")
+async def startup_event():
+    """Open the state store and start the worker pool"""
+    global _app_loop
+    _app_loop = asyncio.get_running_loop()
+    init_processed_store()
+    init_queue()
+    init_outbox()
+    gc_workspaces()
+    await dispatcher.start()
+    await worker_pool.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop workers and release pooled HTTP connections"""
+    await worker_pool.stop()
+    await dispatcher.stop()
+    await aclose_clients()
+
 @app.get("/")
 async def root():
     return {"message": "LLM Code Deployment API is running", "version": "1.0.0"}
@@ -44,104 +106,134 @@ async def health_check():
     
     return {
         "status": "healthy" if all_configured else "configuration_incomplete",
-        "configuration": config_status
+        "configuration": config_status,
+        "queue": worker_pool.stats(),
+        "outbox": dispatcher.stats(),
+        "generation_cache": generation_cache.stats(),
+        "llm_backends": backends_stats(),
+        "fast_path": fast_path_stats(),
+        "github_rate_limit": github_scheduler.snapshot(),
+        "pages": pages_stats()
     }
 
-# === Persistence for processed requests ===
-def load_processed():
-    if os.path.exists(PROCESSED_PATH):
-        try:
-            return json.load(open(PROCESSED_PATH))
-        except json.JSONDecodeError:
-            return {}
-    return {}
+@app.get("/queue")
+async def queue_status():
+    """Queue depth and worker utilisation"""
+    return worker_pool.stats()
+
+@app.get("/capacity")
+async def capacity_status(email: str = None):
+    """Admission limits, jobs in flight and remaining room (overall and for ?email=)"""
+    return await asyncio.to_thread(capacity, worker_pool, email)
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Current stage, stage timeline, retries and final payload of one job"""
+    job = await asyncio.to_thread(get_job, job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    job["notifications"] = await asyncio.to_thread(notifications_for_job, job_id)
+    return job
+
+@app.get("/jobs")
+async def jobs_list(email: str = None, task: str = None, status: str = None, limit: int = 50):
+    """Recent jobs with per-stage durations, filtered by email/task/status"""
+    return await asyncio.to_thread(list_jobs, email, task, status, min(limit, 500))
+
+@app.get("/metrics")
+async def metrics():
+    """Pipeline metrics in the Prometheus text format"""
+    return PlainTextResponse(await asyncio.to_thread(render_metrics), media_type=PROMETHEUS_CONTENT_TYPE)
 
-def save_processed(data):
-    json.dump(data, open(PROCESSED_PATH, "w"), indent=2)
+@app.get("/outbox")
+async def outbox_status():
+    """Notification outbox counts and in-flight deliveries per host"""
+    return await asyncio.to_thread(dispatcher.stats)
+
+@app.get("/outbox/dead")
+async def outbox_dead_letters(limit: int = 100):
+    """Notifications that exhausted their retries"""
+    return await asyncio.to_thread(dead_letters, limit)
+
+@app.post("/outbox/{entry_id}/retry")
+async def outbox_retry(entry_id: str):
+    """Put a dead letter back in the delivery queue"""
+    if not await asyncio.to_thread(requeue_dead, entry_id):
+        return {"error": "No dead letter with that id"}
+    dispatcher.notify()
+    return {"status": "requeued", "id": entry_id}
 
 # === Background task ===
 def process_request(data):
     round_num = data.get("round", 1)
     task_id = data["task"]
-    print(f"⚙ Starting background process for task {task_id} (round {round_num})")
+    log.info(f"⚙ Starting background process for task {task_id} (round {round_num})")
+    workspace = create_workspace()
+    jobs_in_flight.inc()
+    started = time.perf_counter()
     
     try:
         attachments = data.get("attachments", [])
-        saved_attachments = decode_attachments(attachments)
-        print("Attachments saved:", saved_attachments)
+        with stage_timer("decode"):
+            saved_attachments = decode_attachments(attachments, workspace)
+        log.info(f"📎 Saved {len(saved_attachments)} attachments", extra={"attachments": saved_attachments})
 
-        # Optional: fetch previous README for round 2
-        prev_readme = None
+        # Optional: load previous code and README for round 2
+        prev_context = None
         if round_num == 2:
             try:
-                # Get repo first to fetch previous README
                 repo = create_repo(task_id, description=f"Auto-generated app for task: {data['brief']}")
-                readme = repo.get_contents("README.md")
-                prev_readme = readme.decoded_content.decode("utf-8", errors="ignore")
-                print("📖 Loaded previous README for round 2 context.")
-            except Exception:
-                prev_readme = None
-
-        gen = generate_app_code(
-            data["brief"],
-            attachments=attachments,
-            checks=data.get("checks", []),
-            round_num=round_num,
-            prev_readme=prev_readme
-        )
+                with stage_timer("context"):
+                    prev_context = load_previous_context(repo)
+            except Exception as e:
+                log.warning("⚠ Could not load round 2 context", extra={"error": str(e)})
+        prev_files = prev_context["files"] if prev_context else {}
+
+        with stage_timer("generate"):
+            gen = generate_app_code(
+                data["brief"],
+                saved_attachments=saved_attachments,
+                checks=data.get("checks", []),
+                round_num=round_num,
+                prev_readme=prev_files.get("README.md"),
+                prev_code=prev_files.get("index.html"),
+                use_cache=not data.get("no_cache", False)
+            )
 
         files = gen.get("files", {})
         saved_info = gen.get("attachments", [])
 
         # Step 1: Get or create repo
-        repo = create_repo(task_id, description=f"Auto-generated app for task: {data['brief']}")
+        with stage_timer("repo_create"):
+            repo = create_repo(task_id, description=f"Auto-generated app for task: {data['brief']}")
 
-        # Step 2: Round-specific logic
+        # Step 2: Assemble the full file map for this round
+        repo_files = {}
         if round_num == 1:
-            print("🏗 Round 1: Building fresh repo...")
-            # Add attachments
-            for att in saved_info:
-                path = att["name"]
-                try:
-                    with open(att["path"], "rb") as f:
-                        content_bytes = f.read()
-                    if att["mime"].startswith("text") or att["name"].endswith((".md", ".csv", ".json", ".txt")):
-                        text = content_bytes.decode("utf-8", errors="ignore")
-                        create_or_update_file(repo, path, text, f"Add attachment {path}")
-                    else:
-                        create_or_update_binary_file(repo, path, content_bytes, f"Add binary {path}")
-                        b64 = base64.b64encode(content_bytes).decode("utf-8")
-                        create_or_update_file(repo, f"attachments/{att['name']}.b64", b64, f"Backup {att['name']}.b64")
-                except Exception as e:
-                    print("⚠ Attachment commit failed:", e)
+            log.info("🏗 Round 1: Building fresh repo...")
+            repo_files.update(attachment_files(saved_info))
         else:
-            print("🔁 Round 2: Revising existing repo...")
-            # For round 2, update existing code and README
-            # Commit new files on top of existing repo
-            for fname, content in files.items():
-                create_or_update_file(repo, fname, content, f"Update {fname} for round 2")
-
-        # Step 3: Common steps for both rounds
-        for fname, content in files.items():
-            create_or_update_file(repo, fname, content, f"Add/Update {fname}")
+            log.info("🔁 Round 2: Revising existing repo...")
+        repo_files.update(files)
+        repo_files["LICENSE"] = generate_mit_license()
 
-        mit_text = generate_mit_license()
-        create_or_update_file(repo, "LICENSE", mit_text, "Add MIT license")
+        # Step 3: Push everything as a single commit
+        commit_stats = {}
+        with stage_timer("commit"):
+            commit_sha = commit_files(repo, repo_files, f"Round {round_num}: deploy {task_id}", stats=commit_stats)
+        committed_at = time.time()
+        log.info(f"📦 Pushed {commit_stats.get('pushed', 0)} files, skipped {commit_stats.get('skipped', 0)} unchanged")
 
-        # Step 6: Handle GitHub Pages enablement or reuse existing
+        # Step 4: Handle GitHub Pages enablement or reuse existing
         if data["round"] == 1:
-            pages_ok = enable_pages(task_id)
+            with stage_timer("pages_enable"):
+                pages_ok = enable_pages(task_id)
             pages_url = f"https://{USERNAME}.github.io/{task_id}/" if pages_ok else None
         else:
             # For round 2 or later, Pages already exist
             pages_ok = True
             pages_url = f"https://{USERNAME}.github.io/{task_id}/"
 
-        try:
-            commit_sha = repo.get_commits()[0].sha
-        except Exception:
-            commit_sha = None
-
         payload = {
             "email": data["email"],
             "task": data["task"],
@@ -152,17 +244,19 @@ def process_request(data):
             "pages_url": pages_url,
         }
 
-        notify_evaluation_server(data["evaluation_url"], payload)
-
-        processed = load_processed()
-        key = f"{data['email']}::{data['task']}::round{round_num}::nonce{data['nonce']}"
-        processed[key] = payload
-        save_processed(processed)
+        # Step 5: Queue the notification; Pages readiness is tracked off the worker
+        save_processed(processed_key(data["email"], data["task"], round_num, data["nonce"]), payload)
+        record_result(payload)
+        notify_with_pages(data["evaluation_url"], payload, repo.full_name, committed_at)
 
-        print(f"✅ Finished round {round_num} for {task_id}")
+        log.info(f"✅ Finished round {round_num} for {task_id}")
         
     except Exception as e:
-        print(f"❌ Error processing request for task {task_id}: {e}")
+        log.error(f"❌ Error processing request for task {task_id}", extra={"error": str(e)})
+        errors_total.inc()
+        if not final_attempt():
+            # The worker pool requeues the job; only the last failure is reported
+            raise
         # Still try to notify with error status
         try:
             error_payload = {
@@ -175,49 +269,278 @@ def process_request(data):
                 "commit_sha": None,
                 "pages_url": None,
             }
-            notify_evaluation_server(data["evaluation_url"], error_payload)
+            record_result(error_payload)
+            queue_notification(data["evaluation_url"], error_payload)
         except Exception as notify_error:
-            print(f"❌ Failed to notify evaluation server about error: {notify_error}")
+            log.error("❌ Failed to notify evaluation server about error", extra={"error": str(notify_error)})
+        # Let finish_job record the job as failed
+        raise
+    finally:
+        jobs_in_flight.dec()
+        stage_seconds.observe(time.perf_counter() - started, stage="total")
+        cleanup_workspace(workspace)
 
 
-# === Main endpoint ===
-@app.post("/api-endpoint")
-async def receive_request(request: Request, background_tasks: BackgroundTasks):
+async def process_request_async(data):
+    """
+    Event-loop version of process_request. Every network call is awaited, so
+    hundreds of in-flight tasks share one loop instead of one thread each.
+    """
+    round_num = data.get("round", 1)
+    task_id = data["task"]
+    description = f"Auto-generated app for task: {data['brief']}"
+    log.info(f"⚙ Starting async process for task {task_id} (round {round_num})")
+    workspace = create_workspace()
+    jobs_in_flight.inc()
+    started = time.perf_counter()
+
     try:
-        data = await request.json()
-        print("📩 Received request:", data)
+        with stage_timer("decode"):
+            saved_attachments = await asyncio.to_thread(decode_attachments, data.get("attachments", []), workspace)
+
+        # Optional: load previous code and README for round 2
+        prev_context = None
+        if round_num == 2:
+            try:
+                repo = await create_repo_async(task_id, description=description)
+                with stage_timer("context"):
+                    prev_context = await load_previous_context_async(repo["full_name"])
+            except Exception as e:
+                log.warning("⚠ Could not load round 2 context", extra={"error": str(e)})
+        prev_files = prev_context["files"] if prev_context else {}
+
+        # Resolve the repo as soon as index.html has streamed, while the
+        # README is still being generated. The html itself is committed with
+        # the other files in the single commit below, not pushed early.
+        repo_task = None
+
+        def start_repo_stage(_html):
+            nonlocal repo_task
+            if repo_task is None:
+                repo_task = asyncio.create_task(timed("repo_create", create_repo_async(task_id, description=description)))
+
+        try:
+            with stage_timer("generate"):
+                gen = await generate_app_code_async(
+                    data["brief"],
+                    saved_attachments=saved_attachments,
+                    checks=data.get("checks", []),
+                    round_num=round_num,
+                    prev_readme=prev_files.get("README.md"),
+                    prev_code=prev_files.get("index.html"),
+                    use_cache=not data.get("no_cache", False),
+                    on_html=start_repo_stage
+                )
+        except BaseException:
+            # Do not leave the repo stage running (or its error unretrieved)
+            if repo_task is not None:
+                repo_task.cancel()
+                await asyncio.gather(repo_task, return_exceptions=True)
+            raise
+
+        files = gen.get("files", {})
+        saved_info = gen.get("attachments", [])
+        if gen.get("timings"):
+            log.info(f"⏱ LLM timings for {task_id}", extra={"timings": gen["timings"]})
+
+        # Step 1: Get or create repo
+        if repo_task is not None:
+            repo = await repo_task
+        else:
+            repo = await timed("repo_create", create_repo_async(task_id, description=description))
+
+        # Step 2: Assemble the full file map for this round
+        repo_files = {}
+        if round_num == 1:
+            log.info("🏗 Round 1: Building fresh repo...")
+            repo_files.update(await asyncio.to_thread(attachment_files, saved_info))
+        else:
+            log.info("🔁 Round 2: Revising existing repo...")
+        repo_files.update(files)
+        repo_files["LICENSE"] = generate_mit_license()
+
+        # Step 3: Push everything as a single commit
+        commit_stats = {}
+        with stage_timer("commit"):
+            commit_sha = await commit_files_async(repo["full_name"], repo_files, f"Round {round_num}: deploy {task_id}", stats=commit_stats)
+        committed_at = time.time()
+        log.info(f"📦 Pushed {commit_stats.get('pushed', 0)} files, skipped {commit_stats.get('skipped', 0)} unchanged")
+
+        # Step 4: Handle GitHub Pages enablement or reuse existing
+        if round_num == 1:
+            with stage_timer("pages_enable"):
+                pages_ok = await enable_pages_async(task_id)
+            pages_url = f"https://{USERNAME}.github.io/{task_id}/" if pages_ok else None
+        else:
+            pages_url = f"https://{USERNAME}.github.io/{task_id}/"
+
+        payload = {
+            "email": data["email"],
+            "task": data["task"],
+            "round": round_num,
+            "nonce": data["nonce"],
+            "repo_url": repo["html_url"],
+            "commit_sha": commit_sha,
+            "pages_url": pages_url,
+        }
+
+        # Step 5: Queue the notification; Pages readiness is tracked off the worker
+        await asyncio.to_thread(
+            save_processed, processed_key(data["email"], data["task"], round_num, data["nonce"]), payload
+        )
+        record_result(payload)
+        await asyncio.to_thread(notify_with_pages, data["evaluation_url"], payload, repo["full_name"], committed_at)
+
+        log.info(f"✅ Finished round {round_num} for {task_id}")
+
     except Exception as e:
-        print(f"❌ Failed to parse JSON: {e}")
-        return {"error": "Invalid JSON format"}
+        log.error(f"❌ Error processing request for task {task_id}", extra={"error": str(e)})
+        errors_total.inc()
+        if not final_attempt():
+            # The worker pool requeues the job; only the last failure is reported
+            raise
+        try:
+            error_payload = {
+                "email": data["email"],
+                "task": data["task"],
+                "round": round_num,
+                "nonce": data["nonce"],
+                "error": str(e),
+                "repo_url": None,
+                "commit_sha": None,
+                "pages_url": None,
+            }
+            record_result(error_payload)
+            await asyncio.to_thread(queue_notification, data["evaluation_url"], error_payload)
+        except Exception as notify_error:
+            log.error("❌ Failed to notify evaluation server about error", extra={"error": str(notify_error)})
+        # Let finish_job record the job as failed
+        raise
+    finally:
+        jobs_in_flight.dec()
+        stage_seconds.observe(time.perf_counter() - started, stage="total")
+        await asyncio.to_thread(cleanup_workspace, workspace)
+
+def notify_with_pages(evaluation_url, payload, full_name, committed_at):
+    """
+    Queue the result notification and hand Pages tracking to the event loop,
+    so the job worker is free as soon as the commit is pushed. In hold mode
+    the outbox entry waits until the site is live, or at most until
+    PAGES_READY_TIMEOUT after the commit, which also survives a restart.
+    Callable from the event loop thread or a pipeline thread; without a
+    running app loop (scripts) the tracking runs in the calling thread.
+    """
+    if not payload["pages_url"] or PAGES_NOTIFY_MODE not in ("hold", "follow_up"):
+        queue_notification(evaluation_url, payload)
+        return
+    held = PAGES_NOTIFY_MODE == "hold"
+    entry_id = queue_notification(evaluation_url, payload, not_before=committed_at + PAGES_READY_TIMEOUT if held else None)
+    held_entry = entry_id if held else None
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        spawn_background(notify_when_live(evaluation_url, payload, full_name, committed_at, held_entry))
+        return
+    if _app_loop is not None and _app_loop.is_running():
+        # Pipeline thread: the task must live on the app loop
+        coro = notify_when_live(evaluation_url, payload, full_name, committed_at, held_entry)
+        _app_loop.call_soon_threadsafe(spawn_background, coro)
+        return
+    result = wait_for_pages(full_name, payload["pages_url"], payload["commit_sha"], committed_at)
+    pages_settled(evaluation_url, payload, result, held_entry)
+
+async def notify_when_live(evaluation_url, payload, full_name, committed_at, held_entry=None):
+    """Wait for the Pages site to serve the commit, then settle the notification"""
+    result = await wait_for_pages_async(full_name, payload["pages_url"], payload["commit_sha"], committed_at)
+    await asyncio.to_thread(pages_settled, evaluation_url, payload, result, held_entry)
+
+def pages_settled(evaluation_url, payload, result, held_entry=None):
+    """Release the held notification (hold) or send a follow-up one if the site went live (follow_up)"""
+    if held_entry is not None:
+        if release_notification(held_entry):
+            dispatcher.notify()
+    elif result["live"]:
+        queue_notification(evaluation_url, payload)
+
+# === Notification outbox ===
+dispatcher = NotificationDispatcher()
+
+def queue_notification(evaluation_url, payload, not_before=None):
+    """Write a result to the outbox and wake the dispatcher (any thread)"""
+    entry_id = enqueue_notification(evaluation_url, payload, job_id=current_job_id(), not_before=not_before)
+    dispatcher.notify()
+    return entry_id
 
-    # Validate required fields
-    required_fields = ["email", "secret", "task", "round", "nonce", "brief", "evaluation_url"]
-    missing_fields = [field for field in required_fields if field not in data]
-    if missing_fields:
-        print(f"❌ Missing required fields: {missing_fields}")
-        return {"error": f"Missing required fields: {missing_fields}"}
+# === Job queue ===
+async def run_job(data):
+    """Worker pool handler: run one queued request through the pipeline"""
+    if ASYNC_PIPELINE:
+        await process_request_async(data)
+    else:
+        await asyncio.to_thread(process_request, data)
+
+worker_pool = WorkerPool(run_job)
+
+# Strong references to fire-and-forget tasks so they are not garbage collected
+_background_tasks = set()
+# The loop serving the app, for pipeline threads that schedule background work
+_app_loop = None
+
+def spawn_background(coro):
+    """Run a coroutine detached from the current request"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+# === Main endpoint ===
+@app.post("/api-endpoint")
+async def receive_request(request: Request):
+    try:
+        task_request = await read_task_request(request)
+    except RequestRejected as e:
+        log.error(f"❌ Rejected request ({e.status_code})", extra={"error": str(e)})
+        return FastJSONResponse(status_code=e.status_code, content={"error": str(e)})
+    data = task_request.to_data()
+    log.info("📩 Received request", extra={"request": task_request.summary()})
 
     # Step 0: Verify secret
     if not USER_SECRET:
-        print("❌ USER_SECRET not configured")
+        log.error("❌ USER_SECRET not configured")
         return {"error": "Server configuration error"}
     
     if data.get("secret") != USER_SECRET:
-        print("❌ Invalid secret received.")
+        log.error("❌ Invalid secret received.")
         return {"error": "Invalid secret"}
 
-    processed = load_processed()
-    key = f"{data['email']}::{data['task']}::round{data['round']}::nonce{data['nonce']}"
+    key = processed_key(data["email"], data["task"], data["round"], data["nonce"])
 
     # Duplicate detection
-    if key in processed:
-        print(f"⚠ Duplicate request detected for {key}. Re-notifying only.")
-        prev = processed[key]
-        notify_evaluation_server(data.get("evaluation_url"), prev)
-        return {"status": "ok", "note": "duplicate handled & re-notified"}
+    prev = await asyncio.to_thread(get_processed, key)
+    if prev is not None:
+        log.warning("⚠ Duplicate request detected. Re-notifying only.", extra={"key": key})
+        duplicates_total.inc()
+        # The outbox dispatcher delivers it; retries never block this handler.
+        await asyncio.to_thread(queue_notification, data.get("evaluation_url"), prev)
+        job_id = await asyncio.to_thread(latest_job_id, key)
+        return {"status": "ok", "job_id": job_id, "note": "duplicate handled, re-notification queued"}
 
-    # Schedule background task (non-blocking)
-    background_tasks.add_task(process_request, data)
+    # Persist the job; the worker pool picks it up (and resumes it after a restart).
+    # Past the in-flight limits the request is refused instead of queued.
+    try:
+        job_id = await asyncio.to_thread(enqueue_job, data, key, ADMIT_MAX_IN_FLIGHT, ADMIT_MAX_PER_EMAIL)
+    except QueueFull as e:
+        rejection = await asyncio.to_thread(reject, e, worker_pool)
+        return JSONResponse(
+            status_code=429, content=rejection["body"], headers={"Retry-After": str(rejection["retry_after"])}
+        )
+    worker_pool.notify()
+    eta = await asyncio.to_thread(eta_seconds, job_id, worker_pool)
 
     # Immediate HTTP 200 acknowledgment
-    return {"status": "accepted", "note": f"processing round {data['round']} started"}
+    return {
+        "status": "accepted", "job_id": job_id, "eta_seconds": eta,
+        "note": f"processing round {data['round']} started"
+    }
@@ -0,0 +1,182 @@
+# app/metrics.py
+"""
+Minimal in-process metrics rendered in the Prometheus text format.
+
+Counters, gauges and histograms with labels, plus the pipeline metrics the
+app records. Values live in the process, so each instance (or warm Vercel
+function) reports its own series.
+"""
+import time
+import threading
+from contextlib import contextmanager
+from app.job_timeline import current_timeline
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+# Seconds; spans fast local stages up to slow LLM calls and Pages builds
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_registry = []
+
+def _label_str(names, values, extra=None) -> str:
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+def _fmt(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, k, None, v) for k, v in self._values.items()]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self._samples():
+            lines.append(f"{name}{_label_str(self.labelnames, key, extra)} {_fmt(value)}")
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        super().__init__(name, help, labelnames)
+        if not self.labelnames:
+            # Unlabelled series are exported as 0 before the first increment
+            self._values[()] = 0
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """Gauge set explicitly, or read from fn() at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames=(), fn=None):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+        if not self.labelnames:
+            self._values[()] = 0
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _samples(self):
+        if self.fn is not None:
+            try:
+                # fn returns a number, or a dict of label value -> number
+                value = self.fn()
+            except Exception as e:
+                log.warning(f"⚠ Metric {self.name} unavailable", extra={"error": str(e)})
+                return []
+            if isinstance(value, dict):
+                return [(self.name, (str(k),), None, v) for k, v in value.items()]
+            return [(self.name, (), None, value)]
+        return super()._samples()
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            items = [(k, list(c), s) for k, (c, s) in self._values.items()]
+        for key, counts, total in items:
+            for bound, n in zip(self.buckets, counts):
+                samples.append((f"{self.name}_bucket", key, [("le", _fmt(float(bound)))], n))
+            samples.append((f"{self.name}_sum", key, None, total))
+            samples.append((f"{self.name}_count", key, None, counts[-1]))
+        return samples
+
+def render_metrics() -> str:
+    """Every registered metric in the Prometheus text exposition format"""
+    return "\n".join(m.render() for m in _registry) + "\n"
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# === Pipeline metrics ===
+stage_seconds = Histogram(
+    "pipeline_stage_seconds", "Time spent in each deployment pipeline stage", ["stage"]
+)
+fallbacks_total = Counter("llm_fallbacks_total", "Generations that fell back to the static page")
+duplicates_total = Counter("duplicate_requests_total", "Requests answered from the processed store")
+errors_total = Counter("pipeline_errors_total", "Pipeline runs that ended with an error")
+notifications_total = Counter(
+    "notifications_total", "Evaluation server delivery attempts by outcome", ["outcome"]
+)
+jobs_in_flight = Gauge("jobs_in_flight", "Requests currently being processed")
+
+@contextmanager
+def stage_timer(stage: str):
+    """
+    Time a pipeline stage into pipeline_stage_seconds{stage=...} and, inside a
+    queued job, into that job's stage timeline.
+    """
+    timeline = current_timeline()
+    entry = timeline.begin(stage) if timeline else None
+    error = None
+    try:
+        with stage_seconds.time(stage=stage):
+            yield
+    except BaseException as e:
+        error = str(e) or type(e).__name__
+        raise
+    finally:
+        if entry is not None:
+            timeline.end(entry, error)
+
+async def timed(stage: str, awaitable):
+    """Await something while timing it as a pipeline stage"""
+    with stage_timer(stage):
+        return await awaitable
@@ -1,33 +1,24 @@
 # app/notify.py
-import httpx
-import os
-from dotenv import load_dotenv
+"""
+Single delivery attempts to the evaluation server.
 
-load_dotenv()
+Retries are not done here: results go through the outbox (app/outbox.py),
+which schedules further attempts with jittered backoff.
+"""
+from app import config  # noqa: F401  (loads .env)
+from app.http_clients import get_client, get_async_client
 
-def notify_evaluation_server(evaluation_url: str, payload: dict) -> bool:
+HEADERS = {"Content-Type": "application/json"}
+
+def send_notification(evaluation_url: str, payload: dict):
     """
-    Send repo details back to the evaluation server.
-    Retries with exponential backoff if needed.
+    POST repo details to the evaluation server once. Returns the httpx.Response.
     """
-    headers = {"Content-Type": "application/json"}
-
-    delay = 1  # start with 1 second
-    for attempt in range(5):  # try up to 5 times
-        try:
-            r = httpx.post(evaluation_url, headers=headers, json=payload)
-            if r.status_code == 200:
-                print("✅ Evaluation server notified successfully.")
-                return True
-            else:
-                print(f"⚠️ Attempt {attempt+1}: Server responded {r.status_code} - {r.text}")
-        except Exception as e:
-            print(f"❌ Attempt {attempt+1} failed: {e}")
+    return get_client(evaluation_url).post(evaluation_url, headers=HEADERS, json=payload)
 
-        # Exponential backoff
-        import time
-        time.sleep(delay)
-        delay *= 2
 
-    print("❌ Failed to notify evaluation server after retries.")
-    return False
+async def send_notification_async(evaluation_url: str, payload: dict):
+    """
+    Async send_notification on the pooled AsyncClient.
+    """
+    return await get_async_client(evaluation_url).post(evaluation_url, headers=HEADERS, json=payload)
@@ -0,0 +1,358 @@
+# app/outbox.py
+"""
+Durable notification outbox.
+
+Results for the evaluation server are written to SQLite first and delivered
+by a dispatcher. Failed attempts are retried with jittered exponential
+backoff until OUTBOX_MAX_ATTEMPTS or OUTBOX_RETRY_HORIZON is exhausted, after
+which the entry is kept as a dead letter. Deliveries to the same host are
+capped at OUTBOX_PER_HOST concurrent requests.
+"""
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+from collections import Counter
+from urllib.parse import urlsplit
+from app import config  # noqa: F401  (loads .env)
+from app.storage import connect
+from app.notify import send_notification, send_notification_async
+from app.metrics import Gauge, stage_timer, notifications_total
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "12"))
+# Seconds after which an undelivered notification is given up on
+OUTBOX_RETRY_HORIZON = float(os.getenv("OUTBOX_RETRY_HORIZON", "86400"))
+OUTBOX_BASE_DELAY = float(os.getenv("OUTBOX_BASE_DELAY", "1"))
+OUTBOX_MAX_DELAY = float(os.getenv("OUTBOX_MAX_DELAY", "600"))
+OUTBOX_PER_HOST = int(os.getenv("OUTBOX_PER_HOST", "4"))
+OUTBOX_BATCH = int(os.getenv("OUTBOX_BATCH", "32"))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1.0"))
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+def init_outbox():
+    """Create the outbox table if needed"""
+    conn = connect()
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                host TEXT NOT NULL,
+                payload TEXT NOT NULL,   -- JSON body for the evaluation server
+                status TEXT NOT NULL,    -- pending | sending | delivered | dead
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_expires REAL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(outbox)").fetchall()}
+        if "job_id" not in columns:
+            conn.execute("ALTER TABLE outbox ADD COLUMN job_id TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_job ON outbox(job_id)")
+    finally:
+        conn.close()
+
+def enqueue_notification(url: str, payload: dict, job_id: str = None, not_before: float = None) -> str:
+    """
+    Persist a notification for delivery and return its id. With not_before
+    the first attempt waits until then unless release_notification makes it
+    due earlier.
+    """
+    now = time.time()
+    entry_id = uuid.uuid4().hex
+    conn = connect()
+    try:
+        conn.execute(
+            "INSERT INTO outbox (id, job_id, url, host, payload, status, next_attempt_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?)",
+            (entry_id, job_id, url, _host(url), json.dumps(payload), max(now, not_before or now), now, now),
+        )
+    finally:
+        conn.close()
+    return entry_id
+
+def release_notification(entry_id: str) -> bool:
+    """Make a held notification due now; False if it was already due or sent"""
+    now = time.time()
+    conn = connect()
+    try:
+        cur = conn.execute(
+            "UPDATE outbox SET next_attempt_at = ?, updated_at = ? "
+            "WHERE id = ? AND status = 'pending' AND attempts = 0 AND next_attempt_at > ?",
+            (now, now, entry_id, now),
+        )
+        return cur.rowcount == 1
+    finally:
+        conn.close()
+
+def claim_due(owner: str, limit: int = OUTBOX_BATCH, in_flight: dict = None) -> list:
+    """
+    Lease up to limit due notifications, at most OUTBOX_PER_HOST per host
+    counting the in_flight deliveries this owner already has.
+    Returns a list of dicts with id, url, host, payload and attempts.
+    """
+    in_flight = Counter(in_flight or {})
+    saturated = [host for host, n in in_flight.items() if n >= OUTBOX_PER_HOST]
+    now = time.time()
+    conn = connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute(f"""
+            SELECT id, url, host, payload, attempts FROM outbox
+            WHERE ((status = 'pending' AND next_attempt_at <= ?)
+               OR (status = 'sending' AND lease_expires < ?))
+              AND host NOT IN ({", ".join("?" * len(saturated))})
+            ORDER BY next_attempt_at
+            LIMIT ?
+        """, (now, now, *saturated, limit * 4)).fetchall()
+        claimed = []
+        for row in rows:
+            if len(claimed) >= limit:
+                break
+            if in_flight[row["host"]] >= OUTBOX_PER_HOST:
+                continue
+            in_flight[row["host"]] += 1
+            conn.execute("""
+                UPDATE outbox
+                SET status = 'sending', attempts = attempts + 1, lease_owner = ?, lease_expires = ?, updated_at = ?
+                WHERE id = ?
+            """, (owner, now + OUTBOX_LEASE_SECONDS, now, row["id"]))
+            claimed.append({
+                "id": row["id"],
+                "url": row["url"],
+                "host": row["host"],
+                "payload": json.loads(row["payload"]),
+                "attempts": row["attempts"] + 1,
+            })
+        conn.execute("COMMIT")
+        return claimed
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def retry_delay(attempts: int) -> float:
+    """Full-jitter exponential backoff for the next attempt"""
+    return random.uniform(0, min(OUTBOX_MAX_DELAY, OUTBOX_BASE_DELAY * 2 ** attempts))
+
+def record_attempt(entry: dict, error: str = None, retriable: bool = True):
+    """
+    Mark a claimed notification delivered, or schedule its next attempt.
+    Entries past the attempt limit or retry horizon become dead letters.
+    """
+    now = time.time()
+    conn = connect()
+    try:
+        if error is None:
+            conn.execute(
+                "UPDATE outbox SET status = 'delivered', lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE id = ?",
+                (now, entry["id"]),
+            )
+            notifications_total.inc(outcome="delivered")
+            return
+        row = conn.execute("SELECT created_at FROM outbox WHERE id = ?", (entry["id"],)).fetchone()
+        next_at = now + retry_delay(entry["attempts"])
+        dead = (
+            not retriable
+            or entry["attempts"] >= OUTBOX_MAX_ATTEMPTS
+            or (row is not None and next_at - row["created_at"] > OUTBOX_RETRY_HORIZON)
+        )
+        conn.execute("""
+            UPDATE outbox
+            SET status = ?, next_attempt_at = ?, lease_owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ?
+            WHERE id = ?
+        """, ("dead" if dead else "pending", next_at, error, now, entry["id"]))
+        notifications_total.inc(outcome="dead" if dead else "retry")
+        if dead:
+            log.error(f"☠ Notification {entry['id']} moved to dead letters", extra={"host": entry["host"], "error": error})
+    finally:
+        conn.close()
+
+def _outcome(response):
+    """(error, retriable) for a delivery response; error is None on success"""
+    if response.status_code == 200:
+        return None, True
+    error = f"HTTP {response.status_code}: {response.text[:200]}"
+    # Other 4xx answers will not change on retry
+    retriable = response.status_code >= 500 or response.status_code in (408, 425, 429)
+    return error, retriable
+
+def deliver(entry: dict):
+    """One synchronous delivery attempt for a claimed entry"""
+    try:
+        with stage_timer("notify"):
+            response = send_notification(entry["url"], entry["payload"])
+        error, retriable = _outcome(response)
+    except Exception as e:
+        error, retriable = str(e), True
+    if error is None:
+        log.info(f"✅ Evaluation server notified ({entry['id']}, attempt {entry['attempts']}).")
+    else:
+        log.warning(f"⚠️ Notification {entry['id']} attempt {entry['attempts']} failed", extra={"error": error})
+    record_attempt(entry, error, retriable)
+    return error is None
+
+def dispatch_once(owner: str = None, limit: int = OUTBOX_BATCH) -> dict:
+    """
+    Deliver whatever is due right now, synchronously, one attempt each.
+    Used where no background dispatcher runs (Vercel).
+    """
+    entries = claim_due(owner or f"sync-{uuid.uuid4().hex[:8]}", limit)
+    delivered = sum(1 for entry in entries if deliver(entry))
+    return {"attempted": len(entries), "delivered": delivered}
+
+def outbox_counts() -> dict:
+    """Number of notifications per status"""
+    conn = connect()
+    try:
+        rows = conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status").fetchall()
+    finally:
+        conn.close()
+    counts = {"pending": 0, "sending": 0, "delivered": 0, "dead": 0}
+    counts.update({r["status"]: r["n"] for r in rows})
+    return counts
+
+def dead_letters(limit: int = 100) -> list:
+    """Most recent notifications that were given up on"""
+    conn = connect()
+    try:
+        rows = conn.execute("""
+            SELECT id, url, payload, attempts, last_error, created_at, updated_at FROM outbox
+            WHERE status = 'dead'
+            ORDER BY updated_at DESC
+            LIMIT ?
+        """, (limit,)).fetchall()
+    finally:
+        conn.close()
+    return [{**dict(r), "payload": json.loads(r["payload"])} for r in rows]
+
+outbox_entries = Gauge("outbox_entries", "Notifications in the outbox by status", ["status"], fn=outbox_counts)
+
+def notifications_for_job(job_id: str) -> list:
+    """Delivery state of every notification a job produced"""
+    conn = connect()
+    try:
+        rows = conn.execute("""
+            SELECT id, status, attempts, last_error, next_attempt_at, created_at, updated_at FROM outbox
+            WHERE job_id = ?
+            ORDER BY created_at
+        """, (job_id,)).fetchall()
+    finally:
+        conn.close()
+    return [dict(r) for r in rows]
+
+def requeue_dead(entry_id: str) -> bool:
+    """Give a dead letter a fresh set of attempts"""
+    now = time.time()
+    conn = connect()
+    try:
+        cur = conn.execute("""
+            UPDATE outbox
+            SET status = 'pending', attempts = 0, next_attempt_at = ?, created_at = ?, updated_at = ?
+            WHERE id = ? AND status = 'dead'
+        """, (now, now, now, entry_id))
+        return cur.rowcount == 1
+    finally:
+        conn.close()
+
+
+class NotificationDispatcher:
+    """
+    Background task draining the outbox on the event loop.
+    Each claimed entry is delivered in its own task; per-host concurrency is
+    enforced at claim time, so no lease waits behind a busy host.
+    """
+
+    def __init__(self):
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.in_flight = Counter()
+        self._task = None
+        self._deliveries = set()
+        self._wakeup = asyncio.Event()
+        self._loop = None
+        self._stopping = False
+
+    async def start(self):
+        self._stopping = False
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._run())
+        log.info("📬 Notification dispatcher started")
+
+    async def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        tasks = [self._task, *self._deliveries] if self._task else list(self._deliveries)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    def notify(self):
+        """Wake the dispatcher after an enqueue; safe to call from any thread"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        try:
+            if asyncio.get_running_loop() is self._loop:
+                self._wakeup.set()
+                return
+        except RuntimeError:
+            pass
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def stats(self) -> dict:
+        return {"in_flight": dict(self.in_flight), **outbox_counts()}
+
+    async def _deliver(self, entry: dict):
+        try:
+            try:
+                with stage_timer("notify"):
+                    response = await send_notification_async(entry["url"], entry["payload"])
+                error, retriable = _outcome(response)
+            except Exception as e:
+                error, retriable = str(e), True
+            if error is None:
+                log.info(f"✅ Evaluation server notified ({entry['id']}, attempt {entry['attempts']}).")
+            else:
+                log.warning(f"⚠️ Notification {entry['id']} attempt {entry['attempts']} failed", extra={"error": error})
+            await asyncio.to_thread(record_attempt, entry, error, retriable)
+        finally:
+            self.in_flight[entry["host"]] -= 1
+            if self.in_flight[entry["host"]] <= 0:
+                del self.in_flight[entry["host"]]
+            # A slot for this host is free again
+            self._wakeup.set()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                entries = await asyncio.to_thread(claim_due, self.owner, OUTBOX_BATCH, dict(self.in_flight))
+            except Exception as e:
+                log.error("❌ Outbox claim failed", extra={"error": str(e)})
+                entries = []
+
+            for entry in entries:
+                self.in_flight[entry["host"]] += 1
+                task = asyncio.create_task(self._deliver(entry))
+                self._deliveries.add(task)
+                task.add_done_callback(self._deliveries.discard)
+
+            if not entries:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=OUTBOX_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
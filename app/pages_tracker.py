@@ -0,0 +1,147 @@
+# app/pages_tracker.py
+"""
+GitHub Pages readiness tracking.
+
+After a commit, the Pages build status endpoint and the live site are polled
+together with backoff until the build for that commit is "built" and the
+site answers 200. The pipelines use the result either to hold the
+evaluation notification until the site is live, or to send a follow-up
+notification once it is. The time from commit to live is recorded for
+/health.
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from app import config  # noqa: F401  (loads .env)
+from app.http_clients import get_client, get_async_client
+from app.github_utils import github_request, github_request_async
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+# hold: notify once the site is live (or the timeout expires)
+# follow_up: notify right away, then again once the site is live
+# off: notify right away, no tracking
+PAGES_NOTIFY_MODE = os.getenv("PAGES_NOTIFY_MODE", "hold")
+PAGES_READY_TIMEOUT = float(os.getenv("PAGES_READY_TIMEOUT", "300"))
+PAGES_POLL_INITIAL = float(os.getenv("PAGES_POLL_INITIAL", "2"))
+PAGES_POLL_MAX = float(os.getenv("PAGES_POLL_MAX", "20"))
+
+_recent = deque(maxlen=100)
+_counts = {"tracked": 0, "live": 0, "errored": 0, "timed_out": 0}
+_lock = threading.Lock()
+
+def _build_state(r) -> tuple:
+    """(status, commit) from a pages/builds/latest response, or (None, None)"""
+    if r.status_code != 200:
+        return None, None
+    body = r.json()
+    return body.get("status"), body.get("commit")
+
+def _site_ok(r) -> bool:
+    return r.status_code == 200
+
+def _record(result: dict):
+    with _lock:
+        _counts["tracked"] += 1
+        _counts[result["state"]] += 1
+        if result["seconds_to_live"] is not None:
+            _recent.append(result["seconds_to_live"])
+
+def _result(state, build_status, committed_at, polls) -> dict:
+    result = {
+        "state": state,
+        "live": state == "live",
+        "build_status": build_status,
+        "seconds_to_live": round(time.time() - committed_at, 2) if state == "live" else None,
+        "polls": polls,
+    }
+    _record(result)
+    return result
+
+def _next_delay(delay: float) -> float:
+    return min(delay * 1.5, PAGES_POLL_MAX)
+
+def _cache_busted(pages_url: str) -> str:
+    # Ask the CDN for a fresh copy rather than a cached 404
+    return f"{pages_url}?_={int(time.time())}"
+
+def wait_for_pages(full_name: str, pages_url: str, commit_sha: str, committed_at: float = None, timeout: float = None) -> dict:
+    """
+    Poll until the Pages build for commit_sha is done and pages_url serves 200.
+    Returns {"state", "live", "build_status", "seconds_to_live", "polls"};
+    state is one of live, errored or timed_out.
+    """
+    committed_at = committed_at or time.time()
+    deadline = time.monotonic() + (PAGES_READY_TIMEOUT if timeout is None else timeout)
+    delay, polls, status = PAGES_POLL_INITIAL, 0, None
+    while True:
+        polls += 1
+        try:
+            status, built_commit = _build_state(github_request("GET", f"/repos/{full_name}/pages/builds/latest"))
+            site_ok = _site_ok(get_client(pages_url).get(_cache_busted(pages_url)))
+        except Exception as e:
+            log.warning(f"⚠ Pages poll failed for {full_name}", extra={"error": str(e)})
+            built_commit, site_ok = None, False
+        if status == "errored" and built_commit == commit_sha:
+            log.error(f"❌ Pages build errored for {full_name}")
+            return _result("errored", status, committed_at, polls)
+        if status == "built" and built_commit == commit_sha and site_ok:
+            result = _result("live", status, committed_at, polls)
+            log.info(f"🌐 Pages site live {result['seconds_to_live']}s after commit", extra={"url": pages_url})
+            return result
+        if time.monotonic() + delay > deadline:
+            log.info(f"⌛ Pages not live for {full_name} after {polls} polls (build status: {status})")
+            return _result("timed_out", status, committed_at, polls)
+        time.sleep(delay)
+        delay = _next_delay(delay)
+
+async def wait_for_pages_async(full_name: str, pages_url: str, commit_sha: str, committed_at: float = None, timeout: float = None) -> dict:
+    """
+    Async wait_for_pages: the build endpoint and the live URL are probed
+    concurrently and the wait between polls never holds a thread.
+    """
+    committed_at = committed_at or time.time()
+    deadline = time.monotonic() + (PAGES_READY_TIMEOUT if timeout is None else timeout)
+    delay, polls, status = PAGES_POLL_INITIAL, 0, None
+    while True:
+        polls += 1
+        try:
+            build_r, site_r = await asyncio.gather(
+                github_request_async("GET", f"/repos/{full_name}/pages/builds/latest"),
+                get_async_client(pages_url).get(_cache_busted(pages_url)),
+            )
+            status, built_commit = _build_state(build_r)
+            site_ok = _site_ok(site_r)
+        except Exception as e:
+            log.warning(f"⚠ Pages poll failed for {full_name}", extra={"error": str(e)})
+            built_commit, site_ok = None, False
+        if status == "errored" and built_commit == commit_sha:
+            log.error(f"❌ Pages build errored for {full_name}")
+            return _result("errored", status, committed_at, polls)
+        if status == "built" and built_commit == commit_sha and site_ok:
+            result = _result("live", status, committed_at, polls)
+            log.info(f"🌐 Pages site live {result['seconds_to_live']}s after commit", extra={"url": pages_url})
+            return result
+        if time.monotonic() + delay > deadline:
+            log.info(f"⌛ Pages not live for {full_name} after {polls} polls (build status: {status})")
+            return _result("timed_out", status, committed_at, polls)
+        await asyncio.sleep(delay)
+        delay = _next_delay(delay)
+
+def pages_stats() -> dict:
+    """Tracking outcomes and commit-to-live times, reported on /health"""
+    with _lock:
+        times = sorted(_recent)
+        last = _recent[-1] if _recent else None
+        counts = dict(_counts)
+    stats = {"mode": PAGES_NOTIFY_MODE, **counts}
+    if times:
+        stats["commit_to_live_seconds"] = {
+            "last": last,
+            "p50": times[len(times) // 2],
+            "max": times[-1],
+        }
+    return stats
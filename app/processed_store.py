@@ -0,0 +1,92 @@
+# app/processed_store.py
+"""
+Indexed store of completed requests, keyed on email::task::roundN::nonceX.
+Lookups are a primary-key read and writes are a single atomic upsert, so
+concurrent uvicorn workers cannot clobber each other's entries.
+"""
+import os
+import json
+import time
+import tempfile
+from app.storage import connect
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+# Legacy flat-file store, imported once by migrate_json_store()
+LEGACY_PROCESSED_PATH = os.path.join(tempfile.gettempdir(), "processed_requests.json")
+
+def processed_key(email, task, round_num, nonce) -> str:
+    return f"{email}::{task}::round{round_num}::nonce{nonce}"
+
+def init_processed_store():
+    """Create the processed table and import the legacy JSON file if present"""
+    conn = connect()
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS processed (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,  -- JSON payload sent to the evaluator
+                updated_at REAL NOT NULL
+            )
+        """)
+    finally:
+        conn.close()
+    migrate_json_store()
+
+def migrate_json_store(path: str = LEGACY_PROCESSED_PATH) -> int:
+    """
+    Import entries from the old processed_requests.json and rename it to
+    <path>.migrated. Existing keys are kept. Returns the number of rows read.
+    """
+    if not os.path.exists(path):
+        return 0
+    try:
+        with open(path) as f:
+            legacy = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        log.warning(f"⚠ Could not read legacy processed file {path}", extra={"error": str(e)})
+        return 0
+
+    now = time.time()
+    conn = connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT OR IGNORE INTO processed (key, payload, updated_at) VALUES (?, ?, ?)",
+            [(key, json.dumps(payload), now) for key, payload in legacy.items()],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    try:
+        os.replace(path, path + ".migrated")
+    except OSError:
+        # Another worker already moved it
+        pass
+    log.info(f"📦 Migrated {len(legacy)} processed entries from {path}")
+    return len(legacy)
+
+def get_processed(key: str):
+    """Return the stored payload for key, or None"""
+    conn = connect()
+    try:
+        row = conn.execute("SELECT payload FROM processed WHERE key = ?", (key,)).fetchone()
+    finally:
+        conn.close()
+    return json.loads(row["payload"]) if row else None
+
+def save_processed(key: str, payload: dict):
+    """Insert or replace the payload for key in one statement"""
+    conn = connect()
+    try:
+        conn.execute("""
+            INSERT INTO processed (key, payload, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET payload = excluded.payload, updated_at = excluded.updated_at
+        """, (key, json.dumps(payload), time.time()))
+    finally:
+        conn.close()
@@ -0,0 +1,39 @@
+# app/providers.py
+"""
+Lazily constructed API clients.
+
+openai and PyGithub take a large share of cold-start time, so they are only
+imported when the first client is built. Modules that need their exception
+or helper classes import them inside the function that uses them.
+"""
+import os
+import threading
+from app import config  # noqa: F401  (loads .env)
+from app.github_rate import github_scheduler
+
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+
+_lock = threading.Lock()
+_github = None
+
+def github_client():
+    """Shared PyGithub client, created (and tracked by the rate scheduler) on first use"""
+    global _github
+    if _github is None:
+        with _lock:
+            if _github is None:
+                from github import Github
+                client = Github(GITHUB_TOKEN)
+                github_scheduler.track_requester(client.requester)
+                _github = client
+    return _github
+
+def openai_client(**kwargs):
+    """A new openai.OpenAI client"""
+    from openai import OpenAI
+    return OpenAI(**kwargs)
+
+def async_openai_client(**kwargs):
+    """A new openai.AsyncOpenAI client"""
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(**kwargs)
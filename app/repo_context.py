@@ -0,0 +1,107 @@
+# app/repo_context.py
+"""
+Round-2 context loader.
+
+Reads the previous round's tree at the branch head in one recursive-tree
+request, then fetches the blobs the generator needs (index.html, README.md)
+in parallel. Results are cached in memory and on disk by commit SHA, so
+repeated round-2 attempts against the same head cost a single ref lookup;
+the disk tier is bounded like the generation cache.
+"""
+import os
+import base64
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from app import config  # noqa: F401  (loads .env)
+from app.github_utils import github_call, github_request_async
+from app.generation_cache import GenerationCache
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+CONTEXT_FILES = ("index.html", "README.md")
+CONTEXT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "llm_repo_context")
+CONTEXT_MEMORY_ITEMS = 64
+CONTEXT_CACHE_DISK_BYTES = int(os.getenv("CONTEXT_CACHE_DISK_BYTES", str(50 * 1024 * 1024)))
+
+# Same two tiers as the generation cache, keyed by commit SHA; the disk tier
+# evicts the least recently used contexts past CONTEXT_CACHE_DISK_BYTES
+_contexts = GenerationCache(CONTEXT_CACHE_DIR, CONTEXT_MEMORY_ITEMS, CONTEXT_CACHE_DISK_BYTES)
+
+def _cache_get(commit_sha: str):
+    return _contexts.get(commit_sha)
+
+def _cache_put(commit_sha: str, context: dict):
+    _contexts.put(commit_sha, context)
+
+def _decode_blob(content: str, encoding: str) -> str:
+    if encoding == "base64":
+        return base64.b64decode(content).decode("utf-8", errors="ignore")
+    return content
+
+def load_previous_context(repo, branch: str = "main"):
+    """
+    Return {"commit_sha", "tree": {path: blob_sha}, "files": {name: text}}
+    for the head of branch, or None if the branch does not exist yet.
+    """
+    from github import GithubException
+    try:
+        ref = github_call(repo.get_git_ref, f"heads/{branch}")
+    except GithubException as e:
+        if e.status in (404, 409):
+            return None
+        raise
+    commit_sha = ref.object.sha
+    cached = _cache_get(commit_sha)
+    if cached is not None:
+        log.info(f"📖 Round 2 context for {commit_sha[:7]} served from cache.")
+        return cached
+
+    tree = github_call(repo.get_git_tree, commit_sha, recursive=True)
+    blobs = {e.path: e.sha for e in tree.tree if e.type == "blob"}
+    wanted = [name for name in CONTEXT_FILES if name in blobs]
+
+    def fetch(name):
+        blob = github_call(repo.get_git_blob, blobs[name])
+        return name, _decode_blob(blob.content, blob.encoding)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(wanted))) as pool:
+        files = dict(pool.map(fetch, wanted))
+
+    context = {"commit_sha": commit_sha, "tree": blobs, "files": files}
+    _cache_put(commit_sha, context)
+    log.info(f"📖 Loaded round 2 context at {commit_sha[:7]} ({len(blobs)} files in tree).")
+    return context
+
+async def load_previous_context_async(full_name: str, branch: str = "main"):
+    """
+    Async load_previous_context using the REST API: one ref lookup, one
+    recursive tree read and the context blobs fetched concurrently.
+    """
+    r = await github_request_async("GET", f"/repos/{full_name}/git/ref/heads/{branch}")
+    if r.status_code in (404, 409):
+        return None
+    r.raise_for_status()
+    commit_sha = r.json()["object"]["sha"]
+    cached = await asyncio.to_thread(_cache_get, commit_sha)
+    if cached is not None:
+        log.info(f"📖 Round 2 context for {commit_sha[:7]} served from cache.")
+        return cached
+
+    r = await github_request_async("GET", f"/repos/{full_name}/git/trees/{commit_sha}", params={"recursive": "1"})
+    r.raise_for_status()
+    blobs = {e["path"]: e["sha"] for e in r.json()["tree"] if e["type"] == "blob"}
+    wanted = [name for name in CONTEXT_FILES if name in blobs]
+
+    async def fetch(name):
+        r = await github_request_async("GET", f"/repos/{full_name}/git/blobs/{blobs[name]}")
+        r.raise_for_status()
+        blob = r.json()
+        return name, _decode_blob(blob["content"], blob["encoding"])
+
+    files = dict(await asyncio.gather(*(fetch(name) for name in wanted)))
+    context = {"commit_sha": commit_sha, "tree": blobs, "files": files}
+    await asyncio.to_thread(_cache_put, commit_sha, context)
+    log.info(f"📖 Loaded round 2 context at {commit_sha[:7]} ({len(blobs)} files in tree).")
+    return context
@@ -0,0 +1,21 @@
+# app/storage.py
+import os
+import sqlite3
+import tempfile
+from app import config  # noqa: F401  (loads .env)
+
+# Single SQLite file for the service's durable state (jobs, processed requests, ...)
+STATE_DB_PATH = os.getenv(
+    "STATE_DB_PATH", os.path.join(tempfile.gettempdir(), "llm_deployment_state.db")
+)
+
+def connect():
+    """
+    Open a connection to the state database.
+    WAL mode lets readers proceed while another process holds the write lock.
+    """
+    conn = sqlite3.connect(STATE_DB_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    conn.row_factory = sqlite3.Row
+    return conn
@@ -0,0 +1,117 @@
+# app/task_request.py
+"""
+Validated /api-endpoint request body.
+
+The body is size-checked from Content-Length before anything is read, then
+read in chunks up to MAX_BODY_BYTES and parsed and validated in one pass by
+pydantic's JSON parser, so oversized or malformed requests never reach
+json.loads or the attachment decoder. Responses use orjson when installed.
+"""
+import os
+from typing import List
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+from app import config  # noqa: F401  (loads .env)
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed"""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", str(8 * 1024 * 1024)))
+MAX_ATTACHMENTS = int(os.getenv("MAX_ATTACHMENTS", "10"))
+MAX_CHECKS = int(os.getenv("MAX_CHECKS", "50"))
+MAX_BRIEF_CHARS = int(os.getenv("MAX_BRIEF_CHARS", "20000"))
+
+class RequestRejected(Exception):
+    """An /api-endpoint body refused before processing; carries the HTTP status"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+class Attachment(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    name: str = Field(min_length=1, max_length=255)
+    url: str = Field(min_length=1)
+
+    @field_validator("name")
+    @classmethod
+    def plain_file_name(cls, name: str) -> str:
+        # Attachments are committed at the repo root under this name
+        if "/" in name or "\\" in name or name in (".", ".."):
+            raise ValueError("must be a plain file name")
+        return name
+
+class TaskRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    email: str = Field(min_length=1, max_length=320)
+    secret: str
+    task: str = Field(min_length=1, max_length=100, pattern=r"^[A-Za-z0-9._-]+$")
+    round: int = Field(ge=1)
+    nonce: str = Field(min_length=1, max_length=200)
+    brief: str = Field(min_length=1, max_length=MAX_BRIEF_CHARS)
+    evaluation_url: str = Field(min_length=1, max_length=2048, pattern=r"^https?://")
+    checks: List[str] = Field(default_factory=list, max_length=MAX_CHECKS)
+    attachments: List[Attachment] = Field(default_factory=list, max_length=MAX_ATTACHMENTS)
+    no_cache: bool = False
+
+    def to_data(self) -> dict:
+        """Plain dict in the shape the pipelines and job queue store"""
+        return self.model_dump()
+
+    def summary(self) -> dict:
+        """Loggable view: no secret and no attachment contents"""
+        return {
+            "email": self.email,
+            "task": self.task,
+            "round": self.round,
+            "nonce": self.nonce,
+            "attachments": [a.name for a in self.attachments],
+        }
+
+def _describe(error: ValidationError) -> str:
+    errors = error.errors()
+    if any(e["type"] == "json_invalid" for e in errors):
+        return "Invalid JSON format"
+    missing = [".".join(map(str, e["loc"])) for e in errors if e["type"] == "missing"]
+    if missing:
+        return f"Missing required fields: {missing}"
+    return "Invalid request: " + "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in errors[:5])
+
+async def read_task_request(request) -> TaskRequest:
+    """
+    Read and validate the request body. Raises RequestRejected with 413 for
+    bodies over MAX_BODY_BYTES and 400 for malformed or invalid ones.
+    """
+    declared = request.headers.get("content-length")
+    if declared is not None:
+        try:
+            too_large = int(declared) > MAX_BODY_BYTES
+        except ValueError:
+            raise RequestRejected(400, "Invalid Content-Length header")
+        if too_large:
+            raise RequestRejected(413, f"Request body exceeds {MAX_BODY_BYTES} bytes")
+
+    # Chunked bodies carry no length, so the limit is enforced while reading too
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_BODY_BYTES:
+            raise RequestRejected(413, f"Request body exceeds {MAX_BODY_BYTES} bytes")
+
+    try:
+        return TaskRequest.model_validate_json(bytes(body))
+    except ValidationError as e:
+        raise RequestRejected(400, _describe(e))
@@ -1,27 +1,74 @@
 #!/usr/bin/env python3
 """
 Vercel-compatible version of the main app
-This version processes requests synchronously to work within Vercel's timeout limits
+Requests are processed as checkpointed stages (app/checkpoints.py). Each
+invocation runs stages until VERCEL_TIME_BUDGET is spent; POST
+/continue/{run_id} resumes from the last finished stage, so a long run spans
+several short invocations without repeating the LLM call.
 """
 
 from fastapi import FastAPI, Request
-import os, json, base64
-from dotenv import load_dotenv
-from app.llm_generator import generate_app_code, decode_attachments
+from fastapi.responses import PlainTextResponse, JSONResponse
+import os, json, time, uuid, asyncio, hashlib
+import httpx
+from app import config  # noqa: F401  (loads .env)
+from app.task_request import FastJSONResponse, RequestRejected, read_task_request
+from app.llm_generator import generate_app_code, decode_attachments, create_workspace, cleanup_workspace
 from app.github_utils import (
     create_repo,
-    create_or_update_file,
+    attachment_files,
+    commit_files,
     enable_pages,
     generate_mit_license,
 )
-from app.notify import notify_evaluation_server
-from app.github_utils import create_or_update_binary_file
+from app.repo_context import load_previous_context
+from app.outbox import init_outbox, enqueue_notification, dispatch_once, outbox_counts, dead_letters
+from app.pages_tracker import PAGES_NOTIFY_MODE, PAGES_READY_TIMEOUT, wait_for_pages, pages_stats
+from app.http_clients import get_client, aclose_clients
+from app.checkpoints import checkpoint_store, checkpoint_backend
+from app.processed_store import processed_key
+from app.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    render_metrics,
+    stage_timer,
+    stage_seconds,
+    errors_total,
+    jobs_in_flight,
+)
+from app.github_rate import github_scheduler
+from app.fast_path import fast_path_stats
+from app.logs import get_logger, bind_correlation, unbind_correlation
+
+log = get_logger(__name__)
 
-load_dotenv()
 USER_SECRET = os.getenv("USER_SECRET")
 USERNAME = os.getenv("GITHUB_USERNAME")
+# Nothing runs after the response on Vercel, so readiness is always held for
+# at most this long within the invocation
+VERCEL_PAGES_TIMEOUT = float(os.getenv("VERCEL_PAGES_TIMEOUT", "20"))
+# Seconds of work per invocation; no new stage starts once they are spent
+VERCEL_TIME_BUDGET = float(os.getenv("VERCEL_TIME_BUDGET", "45"))
+VERCEL_LEASE_MARGIN = float(os.getenv("VERCEL_LEASE_MARGIN", "120"))
+VERCEL_STAGE_MAX_ATTEMPTS = int(os.getenv("VERCEL_STAGE_MAX_ATTEMPTS", "3"))
+# Backoff before a failed stage runs again: base * 2^(attempt - 1), capped
+VERCEL_RETRY_BASE_DELAY = float(os.getenv("VERCEL_RETRY_BASE_DELAY", "5"))
+VERCEL_RETRY_MAX_DELAY = float(os.getenv("VERCEL_RETRY_MAX_DELAY", "60"))
+# Unfinished runs call POST /continue/{run_id} on this deployment themselves
+VERCEL_SELF_CONTINUE = os.getenv("VERCEL_SELF_CONTINUE", "1") == "1"
+CONTINUE_BASE_URL = os.getenv("VERCEL_CONTINUE_URL") or (
+    f"https://{os.getenv('VERCEL_URL')}" if os.getenv("VERCEL_URL") else None
+)
+VERCEL_CONTINUE_TIMEOUT = float(os.getenv("VERCEL_CONTINUE_TIMEOUT", "2"))
+
+app = FastAPI(title="LLM Code Deployment API (Vercel)", version="1.0.0", default_response_class=FastJSONResponse)
 
-app = FastAPI(title="LLM Code Deployment API (Vercel)", version="1.0.0")
+# Lifespan events are not guaranteed on Vercel, so create the table on import
+init_outbox()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled HTTP connections"""
+    await aclose_clients()
 
 @app.get("/")
 async def root():
@@ -42,159 +89,409 @@ async def health_check():
     return {
         "status": "healthy" if all_configured else "configuration_incomplete",
         "configuration": config_status,
+        "github_rate_limit": github_scheduler.snapshot(),
+        "pages": pages_stats(),
+        "fast_path": fast_path_stats(),
+        "outbox": outbox_counts(),
+        "checkpoints": checkpoint_backend(),
         "platform": "vercel"
     }
 
-def process_request_sync(data):
-    """Synchronous version of request processing for Vercel"""
+@app.get("/metrics")
+async def metrics():
+    """Pipeline metrics of this function instance in the Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/outbox/dead")
+async def outbox_dead_letters(limit: int = 100):
+    """Notifications that exhausted their retries"""
+    return dead_letters(limit)
+
+# === Checkpointed stages ===
+# Each stage reads and writes the run state; its outputs are saved before the
+# next one starts, so a later invocation resumes after the last finished stage.
+def _saved_attachments(state, ctx):
+    """Attachments decoded into this invocation's workspace (decoded once per invocation)"""
+    if "saved" not in ctx:
+        with stage_timer("decode"):
+            ctx["saved"] = decode_attachments(state["data"].get("attachments", []), ctx["workspace"])
+        log.info(f"📎 Saved {len(ctx['saved'])} attachments", extra={"attachments": ctx["saved"]})
+    return ctx["saved"]
+
+def _drop_attachment_payloads(state, ctx, stage: str):
+    """
+    Once the last stage that reads them has finished (commit in round 1,
+    generate in round 2) keep only the attachments' names, sizes and hashes,
+    so the checkpoint saved after every stage stays small
+    """
+    last = "commit" if state["data"].get("round", 1) == 1 else "generate"
+    if stage == last and state["data"].get("attachments"):
+        state["data"]["attachments"] = [
+            {k: att[k] for k in ("name", "mime", "size", "sha256")} for att in _saved_attachments(state, ctx)
+        ]
+
+def _repo(state):
+    data = state["data"]
+    return create_repo(data["task"], description=f"Auto-generated app for task: {data['brief']}")
+
+def stage_generate(state, ctx):
+    data = state["data"]
     round_num = data.get("round", 1)
-    task_id = data["task"]
-    print(f"⚙ Processing task {task_id} (round {round_num}) synchronously")
-    
+    saved_attachments = _saved_attachments(state, ctx)
+
+    # Optional: load previous code and README for round 2
+    prev_context = None
+    if round_num == 2:
+        try:
+            with stage_timer("context"):
+                prev_context = load_previous_context(_repo(state))
+        except Exception as e:
+            log.warning("⚠ Could not load round 2 context", extra={"error": str(e)})
+    prev_files = prev_context["files"] if prev_context else {}
+
+    gen = generate_app_code(
+        data["brief"],
+        saved_attachments=saved_attachments,
+        checks=data.get("checks", []),
+        round_num=round_num,
+        prev_readme=prev_files.get("README.md"),
+        prev_code=prev_files.get("index.html"),
+        use_cache=not data.get("no_cache", False)
+    )
+    state["outputs"]["files"] = gen.get("files", {})
+
+def stage_repo_create(state, ctx):
+    repo = _repo(state)
+    state["outputs"].update(repo_url=repo.html_url, full_name=repo.full_name)
+
+def stage_commit(state, ctx):
+    data = state["data"]
+    round_num = data.get("round", 1)
+    repo_files = {}
+    if round_num == 1:
+        log.info("🏗 Round 1: Building fresh repo...")
+        repo_files.update(attachment_files(_saved_attachments(state, ctx)))
+    else:
+        log.info("🔁 Round 2: Revising existing repo...")
+    repo_files.update(state["outputs"]["files"])
+    repo_files["LICENSE"] = generate_mit_license()
+
+    # Unchanged files are skipped, so repeating this stage after a crash is cheap
+    commit_stats = {}
+    commit_sha = commit_files(_repo(state), repo_files, f"Round {round_num}: deploy {data['task']}", stats=commit_stats)
+    log.info(f"📦 Pushed {commit_stats.get('pushed', 0)} files, skipped {commit_stats.get('skipped', 0)} unchanged")
+    state["outputs"].update(commit_sha=commit_sha, committed_at=time.time())
+
+def stage_pages_enable(state, ctx):
+    task_id = state["data"]["task"]
+    if state["data"].get("round", 1) == 1:
+        pages_ok = enable_pages(task_id)
+        pages_url = f"https://{USERNAME}.github.io/{task_id}/" if pages_ok else None
+    else:
+        pages_url = f"https://{USERNAME}.github.io/{task_id}/"
+    state["outputs"]["pages_url"] = pages_url
+
+def stage_pages_wait(state, ctx):
+    """
+    Give the site a chance to serve this commit before notifying: at most
+    VERCEL_PAGES_TIMEOUT per invocation and PAGES_READY_TIMEOUT in total.
+    Returns False while the site is not live and time remains.
+    """
+    out = state["outputs"]
+    if not out.get("pages_url") or PAGES_NOTIFY_MODE == "off":
+        return True
+    window_left = PAGES_READY_TIMEOUT - (time.time() - out["committed_at"])
+    if window_left <= 0:
+        return True
+    timeout = max(1.0, min(window_left, VERCEL_PAGES_TIMEOUT, ctx["remaining"]))
+    result = wait_for_pages(out["full_name"], out["pages_url"], out["commit_sha"], out["committed_at"], timeout=timeout)
+    out["pages_state"] = result["state"]
+    return result["state"] != "timed_out" or timeout >= window_left
+
+def stage_notify(state, ctx):
+    data, out = state["data"], state["outputs"]
+    payload = {
+        "email": data["email"],
+        "task": data["task"],
+        "round": data.get("round", 1),
+        "nonce": data["nonce"],
+        "repo_url": out["repo_url"],
+        "commit_sha": out["commit_sha"],
+        "pages_url": out["pages_url"],
+    }
+    # Write the result to the outbox, then deliver everything due in this
+    # invocation (earlier failures included) since nothing runs afterwards
+    enqueue_notification(data["evaluation_url"], payload)
+    dispatch_once()
+    state["result"] = payload
+
+STAGES = [
+    ("generate", stage_generate),
+    ("repo_create", stage_repo_create),
+    ("commit", stage_commit),
+    ("pages_enable", stage_pages_enable),
+    ("pages_wait", stage_pages_wait),
+    ("notify", stage_notify),
+]
+STAGE_FUNCTIONS = dict(STAGES)
+STAGE_NAMES = [name for name, _ in STAGES]
+
+def run_id_for(data) -> str:
+    """Runs are keyed by the request, so a retried POST resumes the same run"""
+    key = processed_key(data["email"], data["task"], data["round"], data["nonce"])
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+def start_run(data) -> dict:
+    """
+    Existing state for this request, or a new run positioned at the first
+    stage. A failed run is restarted at the stage that failed, with fresh
+    attempts; the stages before it are not repeated.
+    """
+    store = checkpoint_store()
+    run_id = run_id_for(data)
+    state = store.get(run_id)
+    if state is not None and state["status"] == "failed":
+        log.info(f"🔁 Restarting failed run {run_id} at {state['next_stage']}")
+        state["attempts"].pop(state["next_stage"], None)
+        state.update(status="running", errors=[], retry_at=None, updated_at=time.time())
+        store.put(run_id, state)
+    if state is None:
+        now = time.time()
+        state = {
+            "id": run_id,
+            "status": "running",       # running | done | failed
+            "next_stage": STAGE_NAMES[0],
+            "data": {k: v for k, v in data.items() if k != "secret"},
+            "outputs": {},
+            "attempts": {},
+            "errors": [],
+            "retry_at": None,          # earliest time a failed stage runs again
+            "result": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        store.put(run_id, state)
+    return state
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before running a stage that has failed `attempts` times"""
+    return min(VERCEL_RETRY_MAX_DELAY, VERCEL_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+
+def retry_wait(state) -> float:
+    """Seconds until the run's failed stage may run again (0 when it is due)"""
+    return max(0.0, (state.get("retry_at") or 0) - time.time()) if state else 0.0
+
+def _stage_failed(state, stage: str, error: Exception):
+    """
+    Record a stage error and schedule the retry with backoff (retry_at);
+    after VERCEL_STAGE_MAX_ATTEMPTS the run fails and the evaluator is told
+    """
+    data = state["data"]
+    errors_total.inc()
+    state["attempts"][stage] = state["attempts"].get(stage, 0) + 1
+    state["errors"].append({"stage": stage, "error": str(error), "at": time.time()})
+    log.error(f"❌ Stage {stage} failed for task {data['task']} (attempt {state['attempts'][stage]})", extra={"error": str(error)})
+    if state["attempts"][stage] < VERCEL_STAGE_MAX_ATTEMPTS:
+        state["retry_at"] = time.time() + retry_delay(state["attempts"][stage])
+        return
+    state["status"] = "failed"
+    # Still try to notify with error status
+    error_payload = {
+        "email": data["email"],
+        "task": data["task"],
+        "round": data.get("round", 1),
+        "nonce": data["nonce"],
+        "error": str(error),
+        "repo_url": None,
+        "commit_sha": None,
+        "pages_url": None,
+    }
     try:
-        attachments = data.get("attachments", [])
-        saved_attachments = decode_attachments(attachments)
-        print("Attachments saved:", saved_attachments)
+        enqueue_notification(data["evaluation_url"], error_payload)
+        dispatch_once()
+    except Exception as notify_error:
+        log.error("❌ Failed to notify evaluation server about error", extra={"error": str(notify_error)})
 
-        # Optional: fetch previous README for round 2
-        prev_readme = None
-        if round_num == 2:
+def advance_run(run_id: str, budget: float = None):
+    """
+    Run the remaining stages of a run until it finishes, fails or the
+    invocation's time budget is spent; no new stage starts after that.
+    Returns the saved state, or None if another invocation holds the run.
+    """
+    budget = VERCEL_TIME_BUDGET if budget is None else budget
+    store = checkpoint_store()
+    owner = uuid.uuid4().hex
+    # The lease outlives the budget by a margin for the stage still running at the deadline
+    if not store.acquire(run_id, owner, budget + VERCEL_LEASE_MARGIN):
+        return None
+    deadline = time.monotonic() + budget
+    log_token = bind_correlation(run_id=run_id)
+    ctx = {"workspace": create_workspace()}
+    jobs_in_flight.inc()
+    started = time.perf_counter()
+    try:
+        state = store.get(run_id)
+        while state and state["status"] == "running":
+            ctx["remaining"] = deadline - time.monotonic()
+            if ctx["remaining"] <= 0:
+                log.info(f"⏸ Time budget spent, run {run_id} continues at {state['next_stage']}")
+                break
+            if retry_wait(state) > 0:
+                # Backing off after a failure; a continuation picks the stage up at retry_at
+                log.info(f"⏸ Run {run_id} retries {state['next_stage']} in {retry_wait(state):.0f}s")
+                break
+            state["retry_at"] = None
+            stage = state["next_stage"]
             try:
-                repo = create_repo(task_id, description=f"Auto-generated app for task: {data['brief']}")
-                readme = repo.get_contents("README.md")
-                prev_readme = readme.decoded_content.decode("utf-8", errors="ignore")
-                print("📖 Loaded previous README for round 2 context.")
-            except Exception:
-                prev_readme = None
-
-        gen = generate_app_code(
-            data["brief"],
-            attachments=attachments,
-            checks=data.get("checks", []),
-            round_num=round_num,
-            prev_readme=prev_readme
-        )
-
-        files = gen.get("files", {})
-        saved_info = gen.get("attachments", [])
-
-        # Step 1: Get or create repo
-        repo = create_repo(task_id, description=f"Auto-generated app for task: {data['brief']}")
-
-        # Step 2: Round-specific logic
-        if round_num == 1:
-            print("🏗 Round 1: Building fresh repo...")
-            # Add attachments
-            for att in saved_info:
-                path = att["name"]
-                try:
-                    with open(att["path"], "rb") as f:
-                        content_bytes = f.read()
-                    if att["mime"].startswith("text") or att["name"].endswith((".md", ".csv", ".json", ".txt")):
-                        text = content_bytes.decode("utf-8", errors="ignore")
-                        create_or_update_file(repo, path, text, f"Add attachment {path}")
-                    else:
-                        create_or_update_binary_file(repo, path, content_bytes, f"Add binary {path}")
-                        b64 = base64.b64encode(content_bytes).decode("utf-8")
-                        create_or_update_file(repo, f"attachments/{att['name']}.b64", b64, f"Backup {att['name']}.b64")
-                except Exception as e:
-                    print("⚠ Attachment commit failed:", e)
-        else:
-            print("🔁 Round 2: Revising existing repo...")
-
-        # Step 3: Common steps for both rounds
-        for fname, content in files.items():
-            create_or_update_file(repo, fname, content, f"Add/Update {fname}")
-
-        mit_text = generate_mit_license()
-        create_or_update_file(repo, "LICENSE", mit_text, "Add MIT license")
-
-        # Step 6: Handle GitHub Pages enablement
-        if data["round"] == 1:
-            pages_ok = enable_pages(task_id)
-            pages_url = f"https://{USERNAME}.github.io/{task_id}/" if pages_ok else None
-        else:
-            pages_ok = True
-            pages_url = f"https://{USERNAME}.github.io/{task_id}/"
+                with stage_timer(stage):
+                    finished = STAGE_FUNCTIONS[stage](state, ctx) is not False
+            except Exception as e:
+                _stage_failed(state, stage, e)
+                finished = False
+            if finished:
+                _drop_attachment_payloads(state, ctx, stage)
+                index = STAGE_NAMES.index(stage) + 1
+                state["next_stage"] = STAGE_NAMES[index] if index < len(STAGE_NAMES) else None
+                if state["next_stage"] is None:
+                    state["status"] = "done"
+                    log.info(f"✅ Finished round {state['data'].get('round', 1)} for {state['data']['task']}")
+            state["updated_at"] = time.time()
+            store.put(run_id, state)
+            if not finished:
+                # Waiting on Pages or retrying a failed stage: leave it to the next invocation
+                break
+        return state
+    finally:
+        store.release(run_id, owner)
+        unbind_correlation(log_token)
+        jobs_in_flight.dec()
+        stage_seconds.observe(time.perf_counter() - started, stage="total")
+        cleanup_workspace(ctx["workspace"])
 
-        try:
-            commit_sha = repo.get_commits()[0].sha
-        except Exception:
-            commit_sha = None
-
-        payload = {
-            "email": data["email"],
-            "task": data["task"],
-            "round": round_num,
-            "nonce": data["nonce"],
-            "repo_url": repo.html_url,
-            "commit_sha": commit_sha,
-            "pages_url": pages_url,
-        }
+async def resume_run(run_id: str, state):
+    """
+    Advance a run from an async handler. Stages run in a thread so the event
+    loop is never blocked; a stage backing off after a failure is awaited
+    until its retry_at, out of this invocation's time budget. When the retry
+    is not due within the budget the run is returned as is, and run_response
+    schedules the next continuation.
+    """
+    budget, wait = VERCEL_TIME_BUDGET, retry_wait(state)
+    if wait > 0:
+        await asyncio.sleep(min(wait, budget))
+        if wait >= budget:
+            return state
+        budget -= wait
+    return await asyncio.to_thread(advance_run, run_id, budget)
 
-        # Send notification synchronously
-        notify_evaluation_server(data["evaluation_url"], payload)
+def continue_url(run_id: str) -> str:
+    return f"/continue/{run_id}"
 
-        print(f"✅ Finished round {round_num} for {task_id}")
-        return payload
-        
+def schedule_continuation(run_id: str):
+    """
+    Ask this deployment to continue the run in a new invocation. The request is
+    sent without waiting for the answer; the continuation runs on its own.
+    """
+    if not (VERCEL_SELF_CONTINUE and CONTINUE_BASE_URL):
+        return
+    url = CONTINUE_BASE_URL.rstrip("/") + continue_url(run_id)
+    try:
+        get_client(url).post(url, json={"secret": USER_SECRET}, timeout=VERCEL_CONTINUE_TIMEOUT)
+    except httpx.TimeoutException:
+        pass
     except Exception as e:
-        print(f"❌ Error processing request for task {task_id}: {e}")
-        # Still try to notify with error status
-        error_payload = {
-            "email": data["email"],
-            "task": data["task"],
-            "round": round_num,
-            "nonce": data["nonce"],
-            "error": str(e),
-            "repo_url": None,
-            "commit_sha": None,
-            "pages_url": None,
+        log.warning(f"⚠ Could not schedule continuation of run {run_id}", extra={"error": str(e)})
+
+def run_response(state, run_id: str) -> dict:
+    """API response for a run after this invocation's work"""
+    if state is None:
+        return {"status": "in_progress", "run_id": run_id, "continue_url": continue_url(run_id),
+                "note": "another invocation is working on this run"}
+    data = state["data"]
+    if state["status"] == "done":
+        return {
+            "status": "completed",
+            "run_id": run_id,
+            "note": f"processing round {data['round']} completed",
+            "result": state["result"],
         }
-        try:
-            notify_evaluation_server(data["evaluation_url"], error_payload)
-        except Exception as notify_error:
-            print(f"❌ Failed to notify evaluation server about error: {notify_error}")
-        
-        raise e
+    if state["status"] == "failed":
+        return {"status": "error", "run_id": run_id, "error": state["errors"][-1]["error"], "note": "Processing failed"}
+    schedule_continuation(run_id)
+    return {
+        "status": "in_progress",
+        "run_id": run_id,
+        "next_stage": state["next_stage"],
+        "retry_at": state.get("retry_at"),
+        "continue_url": continue_url(run_id),
+        "note": f"processing round {data['round']} continues at stage {state['next_stage']}",
+    }
+
+def run_view(state) -> dict:
+    """Run state without the request body and generated files"""
+    return {
+        "id": state["id"],
+        "status": state["status"],
+        "next_stage": state["next_stage"],
+        "task": state["data"]["task"],
+        "round": state["data"].get("round"),
+        "completed_stages": STAGE_NAMES[:STAGE_NAMES.index(state["next_stage"])] if state["next_stage"] else STAGE_NAMES,
+        "attempts": state["attempts"],
+        "retry_at": state.get("retry_at"),
+        "errors": state["errors"],
+        "outputs": {k: v for k, v in state["outputs"].items() if k != "files"},
+        "result": state["result"],
+        "created_at": state["created_at"],
+        "updated_at": state["updated_at"],
+    }
+
+@app.get("/runs/{run_id}")
+async def run_status(run_id: str):
+    """Stage progress of a checkpointed run"""
+    state = checkpoint_store().get(run_id)
+    if state is None:
+        return JSONResponse(status_code=404, content={"error": "Run not found"})
+    return run_view(state)
+
+@app.post("/continue/{run_id}")
+async def continue_run(run_id: str, request: Request):
+    """Resume a run from its last finished stage within this invocation's budget"""
+    try:
+        data = await request.json()
+    except Exception:
+        data = {}
+    if not USER_SECRET or data.get("secret") != USER_SECRET:
+        log.error("❌ Invalid secret received.")
+        return {"error": "Invalid secret"}
+    state = await asyncio.to_thread(checkpoint_store().get, run_id)
+    if state is None:
+        return JSONResponse(status_code=404, content={"error": "Run not found"})
+    return run_response(await resume_run(run_id, state), run_id)
 
 @app.post("/api-endpoint")
 async def receive_request(request: Request):
     """Synchronous version for Vercel compatibility"""
     try:
-        data = await request.json()
-        print("📩 Received request:", data)
-    except Exception as e:
-        print(f"❌ Failed to parse JSON: {e}")
-        return {"error": "Invalid JSON format"}
-
-    # Validate required fields
-    required_fields = ["email", "secret", "task", "round", "nonce", "brief", "evaluation_url"]
-    missing_fields = [field for field in required_fields if field not in data]
-    if missing_fields:
-        print(f"❌ Missing required fields: {missing_fields}")
-        return {"error": f"Missing required fields: {missing_fields}"}
+        task_request = await read_task_request(request)
+    except RequestRejected as e:
+        log.error(f"❌ Rejected request ({e.status_code})", extra={"error": str(e)})
+        return FastJSONResponse(status_code=e.status_code, content={"error": str(e)})
+    data = task_request.to_data()
+    log.info("📩 Received request", extra={"request": task_request.summary()})
 
     # Verify secret
     if not USER_SECRET:
-        print("❌ USER_SECRET not configured")
+        log.error("❌ USER_SECRET not configured")
         return {"error": "Server configuration error"}
     
     if data.get("secret") != USER_SECRET:
-        print("❌ Invalid secret received.")
+        log.error("❌ Invalid secret received.")
         return {"error": "Invalid secret"}
 
-    try:
-        # Process synchronously for Vercel
-        result = process_request_sync(data)
-        return {
-            "status": "completed", 
-            "note": f"processing round {data['round']} completed",
-            "result": result
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "error": str(e),
-            "note": "Processing failed"
-        }
+    # Run as many stages as fit in this invocation; a retried request for
+    # the same nonce resumes (or returns) the existing run instead of redoing
+    # it, and restarts a failed run at the stage that failed
+    state = await asyncio.to_thread(start_run, data)
+    if state["status"] != "running":
+        return run_response(state, state["id"])
+    return run_response(await resume_run(state["id"], state), state["id"])
@@ -7,6 +7,9 @@ import sqlite3
 import json
 from datetime import datetime
 from pathlib import Path
+from app.logs import get_logger
+
+log = get_logger(__name__)
 
 DB_PATH = Path("evaluation_data.db")
 
@@ -112,7 +115,7 @@ def add_task(email: str, task_data: dict, endpoint: str, status_code: int = None
         conn.commit()
         return True
     except Exception as e:
-        print(f"Error adding task: {e}")
+        log.error("❌ Error adding task", extra={"error": str(e)})
         return False
     finally:
         conn.close()
@@ -140,7 +143,7 @@ def add_repo(repo_data: dict):
         conn.commit()
         return True
     except Exception as e:
-        print(f"Error adding repo: {e}")
+        log.error("❌ Error adding repo", extra={"error": str(e)})
         return False
     finally:
         conn.close()
@@ -173,7 +176,7 @@ def add_result(email: str, task: str, round_num: int, repo_url: str, commit_sha:
         conn.commit()
         return True
     except Exception as e:
-        print(f"Error adding result: {e}")
+        log.error("❌ Error adding result", extra={"error": str(e)})
         return False
     finally:
         conn.close()
@@ -263,7 +266,7 @@ def add_submission(email: str, endpoint: str, secret: str):
         conn.commit()
         return True
     except Exception as e:
-        print(f"Error adding submission: {e}")
+        log.error("❌ Error adding submission", extra={"error": str(e)})
         return False
     finally:
         conn.close()
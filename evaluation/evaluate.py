@@ -3,7 +3,6 @@
 Evaluation script - evaluates submitted repositories
 """
 
-import requests
 import base64
 import json
 import re
@@ -11,13 +10,17 @@ from datetime import datetime
 from playwright.sync_api import sync_playwright
 from evaluation.database import init_database, get_repos, add_result
 from openai import OpenAI
+from app.http_clients import get_client
 import os
 from dotenv import load_dotenv
+from app.logs import get_logger
+
+log = get_logger(__name__)
 
 load_dotenv()
 
 # Initialize OpenAI client
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=get_client("api.openai.com"))
 
 def check_mit_license(repo_url: str, commit_sha: str) -> tuple[float, str]:
     """Check if repository has MIT license"""
@@ -32,7 +35,7 @@ def check_mit_license(repo_url: str, commit_sha: str) -> tuple[float, str]:
         # Check for LICENSE file
         license_url = f"https://api.github.com/repos/{owner}/{repo}/contents/LICENSE"
         
-        response = requests.get(license_url)
+        response = get_client(license_url).get(license_url)
         if response.status_code != 200:
             return 0.0, "No LICENSE file found in repository root"
         
@@ -70,7 +73,7 @@ def evaluate_readme_quality(repo_url: str, commit_sha: str) -> tuple[float, str]
         # Get README content
         readme_url = f"https://api.github.com/repos/{owner}/{repo}/contents/README.md"
         
-        response = requests.get(readme_url)
+        response = get_client(readme_url).get(readme_url)
         if response.status_code != 200:
             return 0.0, "No README.md file found"
         
@@ -135,7 +138,7 @@ def evaluate_code_quality(repo_url: str, commit_sha: str) -> tuple[float, str]:
         
         # Get repository contents
         contents_url = f"https://api.github.com/repos/{owner}/{repo}/contents"
-        response = requests.get(contents_url)
+        response = get_client(contents_url).get(contents_url)
         
         if response.status_code != 200:
             return 0.0, "Could not access repository contents"
@@ -146,7 +149,7 @@ def evaluate_code_quality(repo_url: str, commit_sha: str) -> tuple[float, str]:
         code_files = []
         for item in contents:
             if item['name'].endswith(('.html', '.js', '.css', '.py')) and item['type'] == 'file':
-                file_response = requests.get(item['download_url'])
+                file_response = get_client(item['download_url']).get(item['download_url'])
                 if file_response.status_code == 200:
                     code_files.append({
                         'name': item['name'],
@@ -260,14 +263,12 @@ def evaluate_repository(repo_data: tuple) -> list:
     # repo_data structure: (id, timestamp, email, task, round, nonce, repo_url, commit_sha, pages_url)
     repo_id, timestamp, email, task, round_num, nonce, repo_url, commit_sha, pages_url = repo_data
     
-    print(f"\n🔍 Evaluating {email} - {task} (Round {round_num})")
-    print(f"   Repo: {repo_url}")
-    print(f"   Pages: {pages_url}")
+    log.info(f"🔍 Evaluating {email} - {task} (Round {round_num})", extra={"repo_url": repo_url, "pages_url": pages_url})
     
     results = []
     
     # 1. Check MIT License
-    print("   📄 Checking MIT license...")
+    log.info("   📄 Checking MIT license...")
     license_score, license_reason = check_mit_license(repo_url, commit_sha)
     results.append({
         "check": "mit_license",
@@ -276,7 +277,7 @@ def evaluate_repository(repo_data: tuple) -> list:
     })
     
     # 2. Evaluate README quality
-    print("   📖 Evaluating README quality...")
+    log.info("   📖 Evaluating README quality...")
     readme_score, readme_reason = evaluate_readme_quality(repo_url, commit_sha)
     results.append({
         "check": "readme_quality",
@@ -285,7 +286,7 @@ def evaluate_repository(repo_data: tuple) -> list:
     })
     
     # 3. Evaluate code quality
-    print("   💻 Evaluating code quality...")
+    log.info("   💻 Evaluating code quality...")
     code_score, code_reason = evaluate_code_quality(repo_url, commit_sha)
     results.append({
         "check": "code_quality",
@@ -295,7 +296,7 @@ def evaluate_repository(repo_data: tuple) -> list:
     
     # 4. Run dynamic checks if pages_url is available
     if pages_url:
-        print("   🌐 Running dynamic checks...")
+        log.info("   🌐 Running dynamic checks...")
         
         # For now, we'll run basic page load and structure checks
         # In a real implementation, you'd get the original task checks from the database
@@ -330,15 +331,13 @@ def evaluate_repository(repo_data: tuple) -> list:
     
     # Calculate overall score
     total_score = sum(r["score"] for r in results) / len(results) if results else 0.0
-    print(f"   📊 Overall score: {total_score:.2f}")
+    log.info(f"   📊 Overall score: {total_score:.2f}")
     
     return results
 
 def main():
     """Main evaluation function"""
-    print("=" * 60)
-    print("🔍 LLM Code Deployment - Repository Evaluation")
-    print("=" * 60)
+    log.info("🔍 LLM Code Deployment - Repository Evaluation")
     
     # Initialize database
     init_database()
@@ -347,10 +346,10 @@ def main():
     repos = get_repos()
     
     if not repos:
-        print("📭 No repositories found to evaluate")
+        log.info("📭 No repositories found to evaluate")
         return
     
-    print(f"📋 Found {len(repos)} repositories to evaluate")
+    log.info(f"📋 Found {len(repos)} repositories to evaluate")
     
     evaluated_count = 0
     
@@ -362,14 +361,14 @@ def main():
         except Exception as e:
             email = repo_data[2]
             task = repo_data[3]
-            print(f"❌ Error evaluating {email} - {task}: {e}")
+            log.error(f"❌ Error evaluating {email} - {task}", extra={"error": str(e)})
     
-    print(f"\n📊 Evaluation Summary:")
-    print(f"   Total repositories: {len(repos)}")
-    print(f"   Successfully evaluated: {evaluated_count}")
-    print(f"   Failed evaluations: {len(repos) - evaluated_count}")
+    log.info("📊 Evaluation Summary:")
+    log.info(f"   Total repositories: {len(repos)}")
+    log.info(f"   Successfully evaluated: {evaluated_count}")
+    log.info(f"   Failed evaluations: {len(repos) - evaluated_count}")
     
-    print(f"\n🏁 Evaluation completed!")
+    log.info("🏁 Evaluation completed!")
 
 if __name__ == "__main__":
     main()
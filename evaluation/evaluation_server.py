@@ -7,6 +7,9 @@ from fastapi import FastAPI, Request, HTTPException
 import uvicorn
 from datetime import datetime
 from evaluation.database import init_database, add_repo, get_tasks
+from app.logs import get_logger
+
+log = get_logger(__name__)
 
 app = FastAPI(title="LLM Code Deployment Evaluation Server", version="1.0.0")
 
@@ -79,7 +82,7 @@ async def receive_notification(request: Request):
                 break
         
         if not valid_task:
-            print(f"⚠️ Invalid notification received: {email}, {task}, round {round_num}, nonce {nonce}")
+            log.warning(f"⚠️ Invalid notification received: {email}, {task}, round {round_num}, nonce {nonce}")
             raise HTTPException(
                 status_code=400,
                 detail="Invalid task/nonce combination"
@@ -96,16 +99,12 @@ async def receive_notification(request: Request):
         if "repo_url" in data:
             success = add_repo(data)
             if success:
-                print(f"✅ Added repo to database: {data['repo_url']}")
+                log.info("✅ Added repo to database", extra={"repo_url": data["repo_url"]})
             else:
-                print(f"⚠️ Failed to add repo to database")
+                log.warning("⚠️ Failed to add repo to database")
         
-        print(f"📩 Received valid notification #{len(notifications_log)}:")
-        print(f"   Email: {email}")
-        print(f"   Task: {task}")
-        print(f"   Round: {round_num}")
-        print(f"   Repo: {data.get('repo_url', 'Not provided')}")
-        print(f"   Pages: {data.get('pages_url', 'Not provided')}")
+        log.info(f"📩 Received valid notification #{len(notifications_log)} from {email} for {task} (round {round_num})",
+                 extra={"repo_url": data.get("repo_url"), "pages_url": data.get("pages_url")})
         
         return {
             "status": "received",
@@ -116,7 +115,7 @@ async def receive_notification(request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error processing notification: {e}")
+        log.error("❌ Error processing notification", extra={"error": str(e)})
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @app.delete("/notifications")
@@ -174,14 +173,13 @@ async def get_stats():
     }
 
 if __name__ == "__main__":
-    print("🎯 Starting LLM Code Deployment Evaluation Server...")
-    print("This server receives notifications from student APIs")
-    print("Available endpoints:")
-    print("  GET  /           - Status")
-    print("  GET  /notifications - View all notifications")
-    print("  POST /notify     - Receive notifications (used by student APIs)")
-    print("  GET  /stats      - View evaluation statistics")
-    print("  DELETE /notifications - Clear all notifications")
-    print("=" * 60)
+    log.info("🎯 Starting LLM Code Deployment Evaluation Server...")
+    log.info("This server receives notifications from student APIs")
+    log.info("Available endpoints:")
+    log.info("  GET  /           - Status")
+    log.info("  GET  /notifications - View all notifications")
+    log.info("  POST /notify     - Receive notifications (used by student APIs)")
+    log.info("  GET  /stats      - View evaluation statistics")
+    log.info("  DELETE /notifications - Clear all notifications")
     
     uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -3,11 +3,14 @@
 Round 1 evaluation script - sends initial tasks to students
 """
 
-import requests
 import random
 from datetime import datetime
+from app.http_clients import get_client
 from evaluation.database import init_database, add_task, task_exists, add_submission
 from evaluation.task_templates import TASK_TEMPLATES, create_task_from_template
+from app.logs import get_logger
+
+log = get_logger(__name__)
 
 # Sample submissions for testing
 SAMPLE_SUBMISSIONS = [
@@ -26,14 +29,14 @@ def load_submissions():
 
 def send_round1_tasks(evaluation_url: str = "http://localhost:8001/notify"):
     """Send Round 1 tasks to all student submissions"""
-    print("🚀 Starting Round 1 task distribution...")
+    log.info("🚀 Starting Round 1 task distribution...")
     
     # Initialize database
     init_database()
     
     # Load submissions
     submissions = load_submissions()
-    print(f"📋 Found {len(submissions)} submissions")
+    log.info(f"📋 Found {len(submissions)} submissions")
     
     results = []
     
@@ -42,21 +45,21 @@ def send_round1_tasks(evaluation_url: str = "http://localhost:8001/notify"):
         endpoint = submission["endpoint"]
         secret = submission["secret"]
         
-        print(f"\n👤 Processing submission for {email}")
+        log.info(f"👤 Processing submission for {email}")
         
         # Add submission to database
         add_submission(email, endpoint, secret)
         
         # Check if Round 1 task already sent successfully
         if task_exists(email, "", 1):  # Empty task means any task for round 1
-            print(f"⚠️ Round 1 task already sent successfully for {email}")
+            log.warning(f"⚠️ Round 1 task already sent successfully for {email}")
             continue
         
         # Pick a random template
         template_ids = list(TASK_TEMPLATES.keys())
         template_id = random.choice(template_ids)
         
-        print(f"🎯 Selected template: {template_id}")
+        log.info(f"🎯 Selected template: {template_id}")
         
         try:
             # Create task from template
@@ -67,17 +70,16 @@ def send_round1_tasks(evaluation_url: str = "http://localhost:8001/notify"):
                 evaluation_url=evaluation_url
             )
             
-            print(f"📝 Generated task: {task_data['task']}")
-            print(f"📄 Brief: {task_data['brief'][:100]}...")
+            log.info(f"📝 Generated task: {task_data['task']}", extra={"brief": task_data["brief"]})
             
             # Send task to student endpoint
             headers = {"Content-Type": "application/json"}
             
-            print(f"📤 Sending task to {endpoint}")
-            response = requests.post(endpoint, json=task_data, headers=headers, timeout=30)
+            log.info("📤 Sending task", extra={"url": endpoint})
+            response = get_client(endpoint).post(endpoint, json=task_data, headers=headers, timeout=30)
             
             status_code = response.status_code
-            print(f"📨 Response: {status_code} - {response.text[:200]}")
+            log.info(f"📨 Response: {status_code}", extra={"response": response.text})
             
             # Log task to database
             add_task(email, task_data, endpoint, status_code)
@@ -91,12 +93,12 @@ def send_round1_tasks(evaluation_url: str = "http://localhost:8001/notify"):
             })
             
             if status_code == 200:
-                print(f"✅ Task sent successfully to {email}")
+                log.info(f"✅ Task sent successfully to {email}")
             else:
-                print(f"❌ Failed to send task to {email}: {status_code}")
+                log.error(f"❌ Failed to send task to {email}: {status_code}")
                 
         except Exception as e:
-            print(f"❌ Error processing {email}: {e}")
+            log.error(f"❌ Error processing {email}", extra={"error": str(e)})
             results.append({
                 "email": email,
                 "task": None,
@@ -107,27 +109,25 @@ def send_round1_tasks(evaluation_url: str = "http://localhost:8001/notify"):
             })
     
     # Summary
-    print(f"\n📊 Round 1 Summary:")
-    print(f"   Total submissions: {len(submissions)}")
+    log.info("📊 Round 1 Summary:")
+    log.info(f"   Total submissions: {len(submissions)}")
     successful = sum(1 for r in results if r.get("success", False))
-    print(f"   Successful sends: {successful}")
-    print(f"   Failed sends: {len(results) - successful}")
+    log.info(f"   Successful sends: {successful}")
+    log.info(f"   Failed sends: {len(results) - successful}")
     
     return results
 
 def main():
     """Main function for Round 1 script"""
-    print("=" * 60)
-    print("🎯 LLM Code Deployment - Round 1 Task Distribution")
-    print("=" * 60)
+    log.info("🎯 LLM Code Deployment - Round 1 Task Distribution")
     
     # You can customize the evaluation URL here
     evaluation_url = "http://localhost:8001/notify"
     
     results = send_round1_tasks(evaluation_url)
     
-    print(f"\n🏁 Round 1 distribution completed!")
-    print(f"Check the evaluation database for detailed logs.")
+    log.info("🏁 Round 1 distribution completed!")
+    log.info("Check the evaluation database for detailed logs.")
 
 if __name__ == "__main__":
     main()
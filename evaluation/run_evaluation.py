@@ -10,10 +10,13 @@ from evaluation.round1 import send_round1_tasks
 from evaluation.round2 import send_round2_tasks
 from evaluation.evaluate import main as run_evaluation
 from evaluation.database import init_database, get_repos, get_results
+from app.logs import get_logger
+
+log = get_logger(__name__)
 
 def wait_for_submissions(timeout_minutes: int = 15):
     """Wait for student submissions to come in"""
-    print(f"⏳ Waiting {timeout_minutes} minutes for student submissions...")
+    log.info(f"⏳ Waiting {timeout_minutes} minutes for student submissions...")
     
     start_time = time.time()
     timeout_seconds = timeout_minutes * 60
@@ -21,26 +24,24 @@ def wait_for_submissions(timeout_minutes: int = 15):
     while time.time() - start_time < timeout_seconds:
         repos = get_repos()
         if repos:
-            print(f"📦 Found {len(repos)} submissions so far...")
+            log.info(f"📦 Found {len(repos)} submissions so far...")
         
         time.sleep(30)  # Check every 30 seconds
     
     final_repos = get_repos()
-    print(f"⏰ Timeout reached. Final count: {len(final_repos)} submissions")
+    log.info(f"⏰ Timeout reached. Final count: {len(final_repos)} submissions")
     return final_repos
 
 def print_evaluation_summary():
     """Print a comprehensive evaluation summary"""
-    print("\n" + "=" * 60)
-    print("📊 EVALUATION SUMMARY")
-    print("=" * 60)
+    log.info("📊 EVALUATION SUMMARY")
     
     # Get all data
     repos = get_repos()
     results = get_results()
     
     if not repos:
-        print("📭 No submissions found")
+        log.info("📭 No submissions found")
         return
     
     # Group by student
@@ -74,49 +75,43 @@ def print_evaluation_summary():
     
     # Print summary for each student
     for email, data in students.items():
-        print(f"\n👤 {email}")
-        print("-" * 40)
+        log.info(f"👤 {email}")
         
         # Round 1
         if data["round1"]:
             r1 = data["round1"]
-            print(f"  🚀 Round 1: {r1['task']}")
-            print(f"     Repo: {r1['repo_url']}")
-            print(f"     Pages: {r1['pages_url']}")
+            log.info(f"  🚀 Round 1: {r1['task']}", extra={"repo_url": r1["repo_url"], "pages_url": r1["pages_url"]})
             
             if "round1" in data["scores"]:
                 scores = data["scores"]["round1"]
                 avg_score = sum(scores.values()) / len(scores) if scores else 0
-                print(f"     Score: {avg_score:.2f} ({len(scores)} checks)")
+                log.info(f"     Score: {avg_score:.2f} ({len(scores)} checks)")
                 for check, score in scores.items():
-                    print(f"       {check}: {score:.2f}")
+                    log.info(f"       {check}: {score:.2f}")
         else:
-            print("  ❌ Round 1: Not completed")
+            log.info("  ❌ Round 1: Not completed")
         
         # Round 2
         if data["round2"]:
             r2 = data["round2"]
-            print(f"  🔄 Round 2: {r2['task']}")
-            print(f"     Repo: {r2['repo_url']}")
-            print(f"     Pages: {r2['pages_url']}")
+            log.info(f"  🔄 Round 2: {r2['task']}", extra={"repo_url": r2["repo_url"], "pages_url": r2["pages_url"]})
             
             if "round2" in data["scores"]:
                 scores = data["scores"]["round2"]
                 avg_score = sum(scores.values()) / len(scores) if scores else 0
-                print(f"     Score: {avg_score:.2f} ({len(scores)} checks)")
+                log.info(f"     Score: {avg_score:.2f} ({len(scores)} checks)")
                 for check, score in scores.items():
-                    print(f"       {check}: {score:.2f}")
+                    log.info(f"       {check}: {score:.2f}")
         else:
-            print("  ⚠️ Round 2: Not completed")
+            log.info("  ⚠️ Round 2: Not completed")
     
     # Overall statistics
-    print(f"\n📈 OVERALL STATISTICS")
-    print("-" * 40)
-    print(f"Total students: {len(students)}")
-    print(f"Round 1 completed: {sum(1 for s in students.values() if s['round1'])}")
-    print(f"Round 2 completed: {sum(1 for s in students.values() if s['round2'])}")
-    print(f"Total repositories: {len(repos)}")
-    print(f"Total evaluation results: {len(results)}")
+    log.info("📈 OVERALL STATISTICS")
+    log.info(f"Total students: {len(students)}")
+    log.info(f"Round 1 completed: {sum(1 for s in students.values() if s['round1'])}")
+    log.info(f"Round 2 completed: {sum(1 for s in students.values() if s['round2'])}")
+    log.info(f"Total repositories: {len(repos)}")
+    log.info(f"Total evaluation results: {len(results)}")
 
 def main():
     """Main evaluation orchestrator"""
@@ -134,44 +129,35 @@ def main():
     # Initialize database
     init_database()
     
-    print("🎯 LLM Code Deployment Evaluation System")
-    print("=" * 60)
-    print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    log.info("🎯 LLM Code Deployment Evaluation System")
+    log.info(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     if args.full:
         # Complete evaluation cycle
-        print("\n🚀 Starting complete evaluation cycle...")
+        log.info("🚀 Starting complete evaluation cycle...")
         
         # Round 1
-        print("\n" + "="*40)
-        print("ROUND 1: Initial Task Distribution")
-        print("="*40)
+        log.info("ROUND 1: Initial Task Distribution")
         send_round1_tasks(args.eval_url)
         
         # Wait for submissions
-        print(f"\n⏳ Waiting {args.wait} minutes for Round 1 submissions...")
+        log.info(f"⏳ Waiting {args.wait} minutes for Round 1 submissions...")
         wait_for_submissions(args.wait)
         
         # Evaluate Round 1
-        print("\n" + "="*40)
-        print("EVALUATION: Round 1 Results")
-        print("="*40)
+        log.info("EVALUATION: Round 1 Results")
         run_evaluation()
         
         # Round 2
-        print("\n" + "="*40)
-        print("ROUND 2: Follow-up Task Distribution")
-        print("="*40)
+        log.info("ROUND 2: Follow-up Task Distribution")
         send_round2_tasks(args.eval_url)
         
         # Wait for Round 2 submissions
-        print(f"\n⏳ Waiting {args.wait} minutes for Round 2 submissions...")
+        log.info(f"⏳ Waiting {args.wait} minutes for Round 2 submissions...")
         wait_for_submissions(args.wait)
         
         # Evaluate Round 2
-        print("\n" + "="*40)
-        print("EVALUATION: Round 2 Results")
-        print("="*40)
+        log.info("EVALUATION: Round 2 Results")
         run_evaluation()
         
         # Final summary
@@ -180,27 +166,27 @@ def main():
     else:
         # Individual operations
         if args.round1:
-            print("\n🚀 Running Round 1 task distribution...")
+            log.info("🚀 Running Round 1 task distribution...")
             send_round1_tasks(args.eval_url)
         
         if args.round2:
-            print("\n🔄 Running Round 2 task distribution...")
+            log.info("🔄 Running Round 2 task distribution...")
             send_round2_tasks(args.eval_url)
         
         if args.evaluate:
-            print("\n🔍 Running repository evaluation...")
+            log.info("🔍 Running repository evaluation...")
             run_evaluation()
         
         if args.summary:
             print_evaluation_summary()
         
         if not any([args.round1, args.round2, args.evaluate, args.summary]):
-            print("\nNo action specified. Use --help for options.")
-            print("\nQuick start:")
-            print("  --full          Run complete evaluation cycle")
-            print("  --round1        Send Round 1 tasks")
-            print("  --evaluate      Evaluate submitted repositories")
-            print("  --summary       Show evaluation summary")
+            log.info("No action specified. Use --help for options.")
+            log.info("Quick start:")
+            log.info("  --full          Run complete evaluation cycle")
+            log.info("  --round1        Send Round 1 tasks")
+            log.info("  --evaluate      Evaluate submitted repositories")
+            log.info("  --summary       Show evaluation summary")
 
 if __name__ == "__main__":
     main()
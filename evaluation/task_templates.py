@@ -7,6 +7,9 @@ import base64
 import hashlib
 import json
 from datetime import datetime
+from app.logs import get_logger
+
+log = get_logger(__name__)
 
 # Task templates as defined in the project specification
 TASK_TEMPLATES = {
@@ -279,7 +282,7 @@ def create_task_from_template(template_id: str, email: str, round_num: int = 1,
         checks = [check.format(**format_vars) for check in checks]
     except KeyError as e:
         # If formatting fails, use basic formatting
-        print(f"Warning: Template formatting error for {e}, using basic formatting")
+        log.warning("⚠ Template formatting error, using basic formatting", extra={"error": str(e)})
         brief = brief.replace("{seed}", seed).replace("{result}", str(format_vars["result"]))
         checks = [check.replace("{seed}", seed).replace("{result}", str(format_vars["result"])) for check in checks]
     
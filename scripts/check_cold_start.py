@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for the serverless and container entry points.
+
+Each module is imported in a fresh interpreter several times; the script
+fails if the median import time exceeds the budget, or if a module that is
+meant to load lazily (openai, github) is imported at startup.
+
+    python scripts/check_cold_start.py
+    python scripts/check_cold_start.py --budget-ms 800 --runs 7 app.vercel_main
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+DEFAULT_MODULES = ["app.vercel_main", "app.main"]
+# Imported on first use through app/providers.py
+LAZY_MODULES = ["openai", "github"]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+def measure(module: str) -> dict:
+    """Import module in a new interpreter; returns {"ms", "loaded"}"""
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, lazy=LAZY_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("COLD_START_BUDGET_MS", "1000")))
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        try:
+            results = [measure(module) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print(f"❌ {module}: import failed\n{e.stderr}")
+            failed = True
+            continue
+        median = statistics.median(r["ms"] for r in results)
+        loaded = sorted({m for r in results for m in r["loaded"]})
+        ok = median <= args.budget_ms and not loaded
+        failed |= not ok
+        note = f", eagerly imports {', '.join(loaded)}" if loaded else ""
+        print(f"{'✅' if ok else '❌'} {module}: {median:.0f} ms median over {args.runs} runs "
+              f"(budget {args.budget_ms:.0f} ms){note}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
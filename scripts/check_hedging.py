@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Behavioural check of LLM hedging, cancellation and failover.
+
+Starts stub backends from scripts/stub_llm_server.py on local ports and runs
+hedged_completion and hedged_completion_async against them, streamed and
+not. Fails if a backend that is streaming gets hedged, a late one does not,
+a hedge does not win over a slow backend, or a failing backend does not hand
+over right away.
+
+    python scripts/check_hedging.py
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+from http.server import ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+HEDGE_DELAY = 1.0
+os.environ.update(
+    OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "stub"),
+    LLM_HEDGE_ENABLED="1",
+    LLM_HEDGE_DELAY=str(HEDGE_DELAY),
+    LLM_HEDGE_FIRST_TOKEN_DELAY=str(HEDGE_DELAY),
+    # Keep the delays at their defaults for the whole check
+    LLM_HEDGE_MIN_SAMPLES="1000",
+)
+
+from stub_llm_server import make_handler  # noqa: E402
+from app.llm_backends import LLMBackend, hedged_completion, hedged_completion_async  # noqa: E402
+from app.llm_generator import GenerationStreamParser  # noqa: E402
+
+def start_stub(name: str, delay: float, first_token: float = 0.0, fail: bool = False):
+    """Stub backend on a free port; returns (LLMBackend, request counter)"""
+    args = argparse.Namespace(name=name, delay=delay, first_token=first_token, fail=fail)
+    requests = []
+
+    class Handler(make_handler(args)):
+        def log_message(self, fmt, *a):
+            pass
+
+        def do_POST(self):
+            requests.append(time.time())
+            super().do_POST()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    return LLMBackend(name, base_url, "stub", "stub", timeout=10, max_retries=0), requests
+
+def run(backends, stream: bool, use_async: bool) -> tuple:
+    """One hedged completion; returns (result, seconds)"""
+    started = time.perf_counter()
+    kwargs = {"stream": stream, "make_parser": GenerationStreamParser, "backends": backends}
+    if use_async:
+        result = asyncio.run(hedged_completion_async([{"role": "user", "content": "hi"}], **kwargs))
+    else:
+        result = hedged_completion([{"role": "user", "content": "hi"}], **kwargs)
+    return result, time.perf_counter() - started
+
+def check_streaming_primary_is_not_hedged(use_async: bool):
+    # First token well inside the hedge delay, completion well after it
+    primary, _ = start_stub("primary", delay=2.5, first_token=0.05)
+    backup, backup_requests = start_stub("backup", delay=0.1)
+    result, _ = run([primary, backup], stream=True, use_async=use_async)
+    assert result["backend"] == "primary" and not result["hedged"], result
+    assert not backup_requests, "backup was called while the primary was streaming"
+    assert "Stub app from primary" in result["text"]
+
+def check_late_first_token_is_hedged(use_async: bool):
+    primary, _ = start_stub("primary", delay=4.0, first_token=3.5)
+    backup, backup_requests = start_stub("backup", delay=0.1)
+    result, seconds = run([primary, backup], stream=True, use_async=use_async)
+    assert result["backend"] == "backup" and result["hedged"], result
+    assert len(backup_requests) == 1
+    assert seconds < 2.5, f"waited {seconds:.2f}s for the cancelled primary"
+
+def check_slow_completion_is_hedged(use_async: bool):
+    primary, _ = start_stub("primary", delay=3.5)
+    backup, _ = start_stub("backup", delay=0.1)
+    result, seconds = run([primary, backup], stream=False, use_async=use_async)
+    assert result["backend"] == "backup" and result["hedged"], result
+    if use_async:
+        # Async losers are cancelled; sync non-streamed ones finish unused
+        assert seconds < 2.5, f"waited {seconds:.2f}s for the cancelled primary"
+
+def check_failure_fails_over(use_async: bool):
+    primary, _ = start_stub("primary", delay=0.0, fail=True)
+    backup, _ = start_stub("backup", delay=0.05)
+    for stream in (True, False):
+        result, seconds = run([primary, backup], stream=stream, use_async=use_async)
+        assert result["backend"] == "backup" and not result["hedged"], result
+        assert seconds < HEDGE_DELAY, f"failover took {seconds:.2f}s, longer than the hedge delay"
+
+CHECKS = [
+    check_streaming_primary_is_not_hedged,
+    check_late_first_token_is_hedged,
+    check_slow_completion_is_hedged,
+    check_failure_fails_over,
+]
+
+def main() -> int:
+    # The SDK is imported on first use; do it now so it is not timed as backend latency
+    import openai  # noqa: F401
+    failed = False
+    for check in CHECKS:
+        for use_async in (False, True):
+            label = f"{check.__name__} ({'async' if use_async else 'sync'})"
+            try:
+                check(use_async)
+            except AssertionError as e:
+                print(f"❌ {label}: {e}")
+                failed = True
+            else:
+                print(f"✅ {label}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Stub OpenAI-compatible chat completions server for trying LLM_BACKENDS and
+hedging locally, without API keys.
+
+    python scripts/stub_llm_server.py --port 8081 --delay 5 --name slow
+    python scripts/stub_llm_server.py --port 8082 --delay 0.5 --name fast
+    LLM_BACKENDS='[{"name": "slow", "base_url": "http://127.0.0.1:8081/v1", "api_key": "x"},
+                   {"name": "fast", "base_url": "http://127.0.0.1:8082/v1", "api_key": "x"}]' \\
+    LLM_HEDGE_DELAY=1 uvicorn app.main:app
+
+Both streamed (SSE) and plain responses are supported. --first-token holds a
+stream back before its first chunk; --fail makes every request return 500.
+"""
+import json
+import time
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+def reply_text(name: str) -> str:
+    return (
+        "```html\n<!DOCTYPE html>\n<html><body><h1>Stub app from "
+        f"{name}</h1></body></html>\n```\n---README.md---\n# Stub app\n\nGenerated by the {name} stub backend.\n"
+    )
+
+def make_handler(args):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *a):
+            print(f"[{args.name}] {fmt % a}")
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            if args.fail:
+                self.send_error(500, "stub configured to fail")
+                return
+            text = reply_text(args.name)
+            model = body.get("model", "stub")
+            try:
+                if body.get("stream"):
+                    self._stream(text, model)
+                else:
+                    time.sleep(args.delay)
+                    self._json(text, model)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client cancelled this attempt (it lost the hedge)
+                print(f"[{args.name}] client went away")
+
+        def _json(self, text, model):
+            payload = json.dumps({
+                "id": "stub-1", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _stream(self, text, model):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            pieces = [text[i:i + 16] for i in range(0, len(text), 16)]
+            time.sleep(args.first_token)
+            for piece in pieces:
+                time.sleep(max(0.0, args.delay - args.first_token) / len(pieces))
+                chunk = {
+                    "id": "stub-1", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+    return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--delay", type=float, default=1.0, help="seconds until the completion is finished")
+    parser.add_argument("--first-token", type=float, default=0.0, help="seconds before a stream's first chunk")
+    parser.add_argument("--name", default="stub")
+    parser.add_argument("--fail", action="store_true")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args))
+    print(f"🧪 Stub LLM backend '{args.name}' on http://127.0.0.1:{args.port}/v1 (delay {args.delay}s)")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()